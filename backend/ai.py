@@ -0,0 +1,52 @@
+"""Lazy handle on the AI subsystem.
+
+Importing ai_service pulls in the openai package and builds the generator
+and its caches, which processes that only serve tasks, profiles or the
+leaderboard never need. ``ai_service`` here stands in for it and imports the
+real one on first attribute access.
+
+AI_MODE selects how this process treats AI work:
+  local - load the AI subsystem on first use (default)
+  off   - never load it; AI endpoints answer 503 and AI background jobs are
+          left in the queue for workers running with AI_MODE=local, so a
+          proxy can send AI routes to a separate pool of AI workers
+"""
+import os
+import threading
+
+AI_MODE = os.getenv('AI_MODE', 'local').lower()
+
+
+class AIUnavailable(Exception):
+    """The AI subsystem is disabled in this process"""
+
+
+class LazyAIService:
+    def __init__(self, mode=AI_MODE):
+        self.mode = mode
+        self._service = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    @property
+    def loaded(self):
+        return self._service is not None
+
+    def load(self):
+        if not self.enabled:
+            raise AIUnavailable("AI features are disabled on this server")
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    from ai_service import ai_service
+                    self._service = ai_service
+        return self._service
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
+ai_service = LazyAIService()
@@ -1,8 +1,13 @@
 import openai
 import os
+import asyncio
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 from dotenv import load_dotenv
+from cache import cache_from_env, make_key
+from metrics import LLM_REQUESTS, LLM_LATENCY, LLM_TOKENS
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,14 +21,328 @@ if not openai.api_key:
     print("OPENAI_API_KEY=your_api_key_here")
     print("See .env.example for template")
 
+# LLM response cache: LLM_CACHE=memory|sqlite|off, LLM_CACHE_TTL (s), LLM_CACHE_SIZE, LLM_CACHE_PATH
+LLM_CACHE_DEFAULT_TTL = 24 * 60 * 60
+
+def _normalize_messages(messages: List[Dict]) -> List[List[str]]:
+    """Collapse whitespace so prompt indentation changes don't defeat the cache"""
+    return [[m['role'], ' '.join(m['content'].split())] for m in messages]
+
+# Upper bound on concurrent completions issued from the async path
+AI_MAX_INFLIGHT = int(os.getenv('AI_MAX_INFLIGHT', '256'))
+
+# How submit_answer picks the next question:
+#   speculative - sufficiency check and next question generated concurrently (default)
+#   structured  - one call returning {"done": bool, "next_question": str}
+#   sequential  - check first, then generate the question if needed
+AI_QUESTION_MODE = os.getenv('AI_QUESTION_MODE', 'speculative').lower()
+
+# Keys TaskDB.create_tasks needs on every generated task
+TASK_FIELDS = {'title', 'description', 'difficulty', 'estimated_hours', 'skills'}
+
+# Threads used to overlap completions on the synchronous (Flask) path
+_speculation_pool = ThreadPoolExecutor(max_workers=int(os.getenv('AI_SPECULATION_THREADS', '8')),
+                                       thread_name_prefix='nova-ai')
+
+class LLMCall:
+    """One chat completion and how to turn its text into a result.
+
+    ``parse`` maps the response text to the returned value (errors there fall
+    back like API errors); ``fallback`` receives the exception. A call built
+    with ``LLMCall.done(value)`` needs no completion at all. When streamed,
+    text from ``marker`` onwards is held back from the token events and only
+    reaches ``parse``.
+    """
+
+    def __init__(self, messages=None, temperature=0.7, max_tokens=200, model="gpt-4",
+                 parse=None, fallback=None, value=None, marker=None):
+        self.messages = messages
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.model = model
+        self.parse = parse
+        self.fallback = fallback
+        self.value = value
+        self.marker = marker
+
+    @classmethod
+    def done(cls, value):
+        return cls(value=value)
+
+    def cache_key(self):
+        return make_key(self.model, _normalize_messages(self.messages), round(self.temperature, 1), self.max_tokens)
+
+class StreamSplitter:
+    """Accumulates streamed text and returns the part that is safe to forward.
+
+    Everything before ``marker`` is forwarded; the marker and what follows are
+    held back. Text that could be the start of a split marker waits for the
+    next delta.
+    """
+
+    def __init__(self, marker=None):
+        self.marker = marker
+        self.text = ''
+        self.sent = 0
+        self.held = False
+
+    def feed(self, delta: str) -> str:
+        self.text += delta
+        if self.held:
+            return ''
+        end = len(self.text)
+        if self.marker:
+            index = self.text.find(self.marker, max(0, self.sent - len(self.marker)))
+            if index >= 0:
+                self.held = True
+                end = index
+            else:
+                end = max(self.sent, end - len(self.marker) + 1)
+        piece = self.text[self.sent:end]
+        self.sent = end
+        return piece
+
+    def close(self) -> str:
+        """Remaining forwardable text once the stream has ended"""
+        if self.held:
+            return ''
+        piece = self.text[self.sent:]
+        self.sent = len(self.text)
+        return piece
+
+ASSIST_STREAM_MARKER = '@@NOVA_JSON@@'
+
 class AITaskGenerator:
     def __init__(self):
         self.client_available = True
+        self.cache = cache_from_env('LLM', default_ttl=LLM_CACHE_DEFAULT_TTL, default_path='llm_cache.db')
+        self._inflight = None
+
+    def _complete(self, messages: List[Dict], temperature: float, max_tokens: int,
+                  model: str = "gpt-4", parse=None):
+        """Run a chat completion, serving repeats from the response cache.
+
+        Keyed on model, normalized messages, temperature bucket (0.1 steps) and
+        max_tokens. When ``parse`` is given the parsed value is returned and
+        only responses that parse successfully are cached.
+        """
+        key = LLMCall(messages, temperature, max_tokens, model=model).cache_key()
+        cached = self._cached(key, parse, model)
+        if cached is not None:
+            return cached[0]
+
+        started = time.perf_counter()
+        try:
+            response = openai.ChatCompletion.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        except Exception:
+            self._observe(model, 'sync', started, error=True)
+            raise
+        self._observe(model, 'sync', started, response)
+        return self._finish(key, response, parse)
+
+    async def _acomplete(self, messages: List[Dict], temperature: float, max_tokens: int,
+                         model: str = "gpt-4", parse=None):
+        """Async twin of _complete: awaits the completion instead of blocking a thread"""
+        key = LLMCall(messages, temperature, max_tokens, model=model).cache_key()
+        cached = self._cached(key, parse, model)
+        if cached is not None:
+            return cached[0]
+
+        # Created lazily so the semaphore binds to the serving event loop
+        if self._inflight is None:
+            self._inflight = asyncio.Semaphore(AI_MAX_INFLIGHT)
+        async with self._inflight:
+            started = time.perf_counter()
+            try:
+                response = await openai.ChatCompletion.acreate(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            except Exception:
+                self._observe(model, 'async', started, error=True)
+                raise
+            self._observe(model, 'async', started, response)
+        return self._finish(key, response, parse)
+
+    def _cached(self, key, parse, model):
+        """Return (value,) for a cache hit, None otherwise"""
+        if self.cache is None:
+            return None
+        text = self.cache.get(key)
+        if text is None:
+            return None
+        LLM_REQUESTS.inc(model, 'cache_hit')
+        return (parse(text) if parse else text,)
+
+    @staticmethod
+    def _observe(model, mode, started, response=None, error=False):
+        """Record latency, outcome and token usage of one completion request"""
+        LLM_LATENCY.observe(time.perf_counter() - started, model, mode)
+        LLM_REQUESTS.inc(model, 'error' if error else 'ok')
+        usage = response.get('usage') if response is not None else None
+        if usage:
+            LLM_TOKENS.inc(model, 'prompt', amount=usage.get('prompt_tokens', 0))
+            LLM_TOKENS.inc(model, 'completion', amount=usage.get('completion_tokens', 0))
+
+    def _finish(self, key, response, parse):
+        text = response.choices[0].message.content.strip()
+        value = parse(text) if parse else text
+        if self.cache is not None:
+            self.cache.set(key, text)
+        return value
+
+    def _run(self, call: LLMCall):
+        """Execute a call spec synchronously, applying its fallback on error"""
+        if call.messages is None:
+            return call.value
+        try:
+            return self._complete(call.messages, call.temperature, call.max_tokens,
+                                  model=call.model, parse=call.parse)
+        except Exception as e:
+            if call.fallback is None:
+                raise
+            LLM_REQUESTS.inc(call.model, 'fallback')
+            return call.fallback(e)
+
+    async def _arun(self, call: LLMCall):
+        """Execute a call spec on the event loop, applying its fallback on error"""
+        if call.messages is None:
+            return call.value
+        try:
+            return await self._acomplete(call.messages, call.temperature, call.max_tokens,
+                                         model=call.model, parse=call.parse)
+        except Exception as e:
+            if call.fallback is None:
+                raise
+            LLM_REQUESTS.inc(call.model, 'fallback')
+            return call.fallback(e)
+
+    def _stream(self, call: LLMCall):
+        """Yield {'type': 'token', 'text'} events as the completion arrives, then
+        {'type': 'done', 'value'} with the parsed result (or the fallback)."""
+        if call.messages is None:
+            yield {'type': 'done', 'value': call.value}
+            return
+        splitter = StreamSplitter(call.marker)
+        try:
+            key = call.cache_key()
+            cached = self._cached(key, None, call.model) if self.cache is not None else None
+            cached = cached[0] if cached else None
+            deltas = [cached] if cached is not None else self._stream_deltas(call)
+            for delta in deltas:
+                piece = splitter.feed(delta)
+                if piece:
+                    yield {'type': 'token', 'text': piece}
+            piece = splitter.close()
+            if piece:
+                yield {'type': 'token', 'text': piece}
+            value = self._finish_stream(key, cached, splitter.text, call.parse)
+        except Exception as e:
+            if call.fallback is None:
+                raise
+            LLM_REQUESTS.inc(call.model, 'fallback')
+            value = call.fallback(e)
+        yield {'type': 'done', 'value': value}
+
+    async def _astream(self, call: LLMCall):
+        """Async twin of _stream"""
+        if call.messages is None:
+            yield {'type': 'done', 'value': call.value}
+            return
+        splitter = StreamSplitter(call.marker)
+        try:
+            key = call.cache_key()
+            cached = self._cached(key, None, call.model) if self.cache is not None else None
+            cached = cached[0] if cached else None
+            if cached is not None:
+                piece = splitter.feed(cached)
+                if piece:
+                    yield {'type': 'token', 'text': piece}
+            else:
+                async for delta in self._astream_deltas(call):
+                    piece = splitter.feed(delta)
+                    if piece:
+                        yield {'type': 'token', 'text': piece}
+            piece = splitter.close()
+            if piece:
+                yield {'type': 'token', 'text': piece}
+            value = self._finish_stream(key, cached, splitter.text, call.parse)
+        except Exception as e:
+            if call.fallback is None:
+                raise
+            LLM_REQUESTS.inc(call.model, 'fallback')
+            value = call.fallback(e)
+        yield {'type': 'done', 'value': value}
+
+    def _stream_deltas(self, call: LLMCall):
+        started = time.perf_counter()
+        try:
+            response = openai.ChatCompletion.create(
+                model=call.model,
+                messages=call.messages,
+                temperature=call.temperature,
+                max_tokens=call.max_tokens,
+                stream=True
+            )
+            for chunk in response:
+                delta = chunk.choices[0].delta.get('content')
+                if delta:
+                    yield delta
+        except Exception:
+            self._observe(call.model, 'stream', started, error=True)
+            raise
+        self._observe(call.model, 'stream', started)
+
+    async def _astream_deltas(self, call: LLMCall):
+        if self._inflight is None:
+            self._inflight = asyncio.Semaphore(AI_MAX_INFLIGHT)
+        async with self._inflight:
+            started = time.perf_counter()
+            try:
+                response = await openai.ChatCompletion.acreate(
+                    model=call.model,
+                    messages=call.messages,
+                    temperature=call.temperature,
+                    max_tokens=call.max_tokens,
+                    stream=True
+                )
+                async for chunk in response:
+                    delta = chunk.choices[0].delta.get('content')
+                    if delta:
+                        yield delta
+            except Exception:
+                self._observe(call.model, 'stream', started, error=True)
+                raise
+            self._observe(call.model, 'stream', started)
+
+    def _finish_stream(self, key, cached, text, parse):
+        text = text.strip()
+        value = parse(text) if parse else text
+        if cached is None and self.cache is not None:
+            self.cache.set(key, text)
+        return value
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters for the LLM response cache"""
+        return self.cache.info() if self.cache is not None else {'backend': 'off'}
     
     def generate_initial_question(self, engineering_problem: str) -> str:
         """
         Generate the first question to understand an engineering problem better
         """
+        return self._run(self._initial_question_call(engineering_problem))
+
+    async def agenerate_initial_question(self, engineering_problem: str) -> str:
+        return await self._arun(self._initial_question_call(engineering_problem))
+
+    def _initial_question_call(self, engineering_problem: str) -> LLMCall:
         prompt = f"""
         You are an AI assistant helping to decompose complex engineering problems into actionable tasks.
         
@@ -37,30 +356,36 @@ class AITaskGenerator:
         Make the question specific to this particular engineering problem.
         """
         
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert engineering consultant who asks the most insightful first question to understand complex problems."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=200
-            )
-            
-            question = response.choices[0].message.content.strip()
+        def parse(question):
             print(f"AI generated initial question: {question}")
             return question
-            
-        except Exception as e:
+
+        def fallback(e):
             print(f"Error generating initial question: {e}")
             # Fallback question
             return "What is the primary goal you're trying to achieve with this engineering solution?"
 
+        return LLMCall(
+            messages=[
+                {"role": "system", "content": "You are an expert engineering consultant who asks the most insightful first question to understand complex problems."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=200,
+            parse=parse,
+            fallback=fallback
+        )
+
     def generate_next_question(self, engineering_problem: str, previous_qa: List[Dict]) -> str:
         """
         Generate the next question based on previous questions and answers
         """
+        return self._run(self._next_question_call(engineering_problem, previous_qa))
+
+    async def agenerate_next_question(self, engineering_problem: str, previous_qa: List[Dict]) -> str:
+        return await self._arun(self._next_question_call(engineering_problem, previous_qa))
+
+    def _next_question_call(self, engineering_problem: str, previous_qa: List[Dict]) -> LLMCall:
         qa_history = "\n".join([
             f"Q: {qa['question']}\nA: {qa['answer']}"
             for qa in previous_qa
@@ -84,22 +409,11 @@ class AITaskGenerator:
         Return ONLY the question text, no additional formatting or explanation.
         """
         
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert engineering consultant who asks strategic follow-up questions based on previous answers."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=200
-            )
-            
-            question = response.choices[0].message.content.strip()
+        def parse(question):
             print(f"AI generated follow-up question: {question}")
             return question
-            
-        except Exception as e:
+
+        def fallback(e):
             print(f"Error generating follow-up question: {e}")
             # Fallback questions based on number of previous questions
             fallback_questions = [
@@ -111,15 +425,32 @@ class AITaskGenerator:
             ]
             return fallback_questions[min(len(previous_qa), len(fallback_questions) - 1)]
 
+        return LLMCall(
+            messages=[
+                {"role": "system", "content": "You are an expert engineering consultant who asks strategic follow-up questions based on previous answers."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=200,
+            parse=parse,
+            fallback=fallback
+        )
+
     def should_generate_more_questions(self, engineering_problem: str, previous_qa: List[Dict]) -> bool:
         """
         Determine if more questions are needed or if we have enough context to generate tasks
         """
+        return self._run(self._more_questions_call(engineering_problem, previous_qa))
+
+    async def ashould_generate_more_questions(self, engineering_problem: str, previous_qa: List[Dict]) -> bool:
+        return await self._arun(self._more_questions_call(engineering_problem, previous_qa))
+
+    def _more_questions_call(self, engineering_problem: str, previous_qa: List[Dict]) -> LLMCall:
         if len(previous_qa) >= 6:  # Maximum 6 questions
-            return False
+            return LLMCall.done(False)
         
         if len(previous_qa) < 3:  # Minimum 3 questions
-            return True
+            return LLMCall.done(True)
             
         # For 3-5 questions, use AI to determine if we need more context
         qa_history = "\n".join([
@@ -143,30 +474,145 @@ class AITaskGenerator:
         Respond with only "YES" if you have enough information, or "NO" if you need more context.
         """
         
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert project manager determining if you have enough context to break down engineering problems."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=10
-            )
-            
-            answer = response.choices[0].message.content.strip().upper()
+        def parse(answer):
+            answer = answer.upper()
             print(f"AI assessment of information sufficiency: {answer}")
             return answer == "NO"
-            
-        except Exception as e:
+
+        def fallback(e):
             print(f"Error determining if more questions needed: {e}")
             # Fallback: ask 4-5 questions total
             return len(previous_qa) < 4
+
+        return LLMCall(
+            messages=[
+                {"role": "system", "content": "You are an expert project manager determining if you have enough context to break down engineering problems."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=10,
+            parse=parse,
+            fallback=fallback
+        )
+
+    def plan_next_question(self, engineering_problem: str, previous_qa: List[Dict], mode: str = None):
+        """
+        Decide whether more context is needed and, if so, produce the next question.
+        Returns (need_more, next_question); next_question is None when done.
+        """
+        mode = mode or AI_QUESTION_MODE
+        check = self._more_questions_call(engineering_problem, previous_qa)
+        if check.messages is None:
+            # Below the minimum or at the maximum: no check needed
+            if not check.value:
+                return False, None
+            return True, self.generate_next_question(engineering_problem, previous_qa)
+
+        if mode == 'structured':
+            return self._run(self._structured_next_call(engineering_problem, previous_qa))
+        if mode == 'speculative':
+            # Generate the question while the check runs; drop it if we're done
+            speculative = _speculation_pool.submit(self.generate_next_question, engineering_problem, previous_qa)
+            if not self._run(check):
+                return False, None
+            return True, speculative.result()
+
+        if not self._run(check):
+            return False, None
+        return True, self.generate_next_question(engineering_problem, previous_qa)
+
+    async def aplan_next_question(self, engineering_problem: str, previous_qa: List[Dict], mode: str = None):
+        mode = mode or AI_QUESTION_MODE
+        check = self._more_questions_call(engineering_problem, previous_qa)
+        if check.messages is None:
+            if not check.value:
+                return False, None
+            return True, await self.agenerate_next_question(engineering_problem, previous_qa)
+
+        if mode == 'structured':
+            return await self._arun(self._structured_next_call(engineering_problem, previous_qa))
+        if mode == 'speculative':
+            speculative = asyncio.ensure_future(self.agenerate_next_question(engineering_problem, previous_qa))
+            try:
+                need_more = await self._arun(check)
+            except BaseException:
+                speculative.cancel()
+                raise
+            if not need_more:
+                speculative.cancel()
+                return False, None
+            return True, await speculative
+
+        if not await self._arun(check):
+            return False, None
+        return True, await self.agenerate_next_question(engineering_problem, previous_qa)
+
+    def _structured_next_call(self, engineering_problem: str, previous_qa: List[Dict]) -> LLMCall:
+        qa_history = "\n".join([
+            f"Q: {qa['question']}\nA: {qa['answer']}"
+            for qa in previous_qa
+        ])
+
+        prompt = f"""
+        Engineering problem: "{engineering_problem}"
+
+        Questions and answers so far:
+        {qa_history}
+
+        Decide whether you have enough information to break this engineering problem into 4-6 specific, actionable tasks. Consider if you understand:
+        - The scope and scale
+        - Key constraints and requirements
+        - Target users and success criteria
+        - Available resources
+        - Technical approach needed
+
+        If you do, set "done" to true and "next_question" to null. Otherwise set "done" to false and write ONE follow-up question that builds on what you've learned and explores aspects not yet covered.
+
+        Return ONLY valid JSON: {{"done": bool, "next_question": str | null}}
+        """
+
+        def parse(text):
+            data = json.loads(text)
+            done = bool(data.get('done'))
+            question = (data.get('next_question') or '').strip()
+            if not done and not question:
+                raise ValueError("structured reply has no next_question")
+            print(f"AI structured assessment: done={done}, next_question={question or None}")
+            return (False, None) if done else (True, question)
+
+        def fallback(e):
+            print(f"Error planning next question: {e}")
+            # Same bounds as the two-call fallback: ask 4-5 questions total
+            if len(previous_qa) >= 4:
+                return False, None
+            return True, self._next_question_call(engineering_problem, previous_qa).fallback(e)
+
+        return LLMCall(
+            messages=[
+                {"role": "system", "content": "You are an expert engineering consultant who decides when enough context has been gathered and otherwise asks the next strategic question."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.5,
+            max_tokens=250,
+            parse=parse,
+            fallback=fallback
+        )
     
-    def generate_tasks(self, engineering_problem: str, questions_and_answers: List[Dict]) -> List[Dict]:
+    def generate_tasks(self, engineering_problem: str, questions_and_answers: List[Dict],
+                       fallback: bool = True) -> List[Dict]:
         """
-        Generate actionable tasks based on the engineering problem and Q&A
+        Generate actionable tasks based on the engineering problem and Q&A.
+        With fallback=False an API error or malformed response raises instead
+        of returning the generic tasks, so the caller can retry.
         """
+        return self._run(self._tasks_call(engineering_problem, questions_and_answers, fallback))
+
+    async def agenerate_tasks(self, engineering_problem: str, questions_and_answers: List[Dict],
+                              fallback: bool = True) -> List[Dict]:
+        return await self._arun(self._tasks_call(engineering_problem, questions_and_answers, fallback))
+
+    def _tasks_call(self, engineering_problem: str, questions_and_answers: List[Dict],
+                    use_fallback: bool = True) -> LLMCall:
         qa_text = "\n".join([
             f"Q: {qa['question']}\nA: {qa['answer']}"
             for qa in questions_and_answers
@@ -211,53 +657,54 @@ class AITaskGenerator:
         - Suitable for different skill levels
         """
         
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert project manager who breaks down complex engineering projects into manageable tasks."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            tasks_text = response.choices[0].message.content.strip()
-            tasks = json.loads(tasks_text)
+        def parse(text):
+            tasks = json.loads(text)
+            if not isinstance(tasks, list) or not tasks or not all(
+                    isinstance(task, dict) and TASK_FIELDS <= task.keys() for task in tasks):
+                raise ValueError("AI response is not a list of tasks")
             print(f"AI generated {len(tasks)} tasks")
             return tasks
-            
-        except Exception as e:
+
+        def fallback(e):
             print(f"Error generating tasks: {e}")
-            # Fall through to fallback tasks
-        
-        # Fallback tasks
-        return [
-            {
-                "title": f"Research Phase: {engineering_problem.split(' ')[:3]}",
-                "description": "Conduct comprehensive research on existing solutions, technologies, and methodologies.",
-                "difficulty": "Beginner",
-                "estimated_hours": "8-12 hours",
-                "skills": ["Research", "Analysis", "Documentation"],
-                "reward_credits": 150
-            },
-            {
-                "title": "Design & Planning: System Architecture",
-                "description": "Create detailed system design, specifications, and implementation roadmap.",
-                "difficulty": "Intermediate", 
-                "estimated_hours": "15-20 hours",
-                "skills": ["System Design", "Planning", "Technical Writing"],
-                "reward_credits": 250
-            },
-            {
-                "title": "Prototype Development",
-                "description": "Build initial prototype or proof-of-concept based on research and design.",
-                "difficulty": "Advanced",
-                "estimated_hours": "20-30 hours", 
-                "skills": ["Programming", "Engineering", "Problem Solving"],
-                "reward_credits": 400
-            }
-        ]
+            # Fallback tasks
+            return [
+                {
+                    "title": f"Research Phase: {engineering_problem.split(' ')[:3]}",
+                    "description": "Conduct comprehensive research on existing solutions, technologies, and methodologies.",
+                    "difficulty": "Beginner",
+                    "estimated_hours": "8-12 hours",
+                    "skills": ["Research", "Analysis", "Documentation"],
+                    "reward_credits": 150
+                },
+                {
+                    "title": "Design & Planning: System Architecture",
+                    "description": "Create detailed system design, specifications, and implementation roadmap.",
+                    "difficulty": "Intermediate", 
+                    "estimated_hours": "15-20 hours",
+                    "skills": ["System Design", "Planning", "Technical Writing"],
+                    "reward_credits": 250
+                },
+                {
+                    "title": "Prototype Development",
+                    "description": "Build initial prototype or proof-of-concept based on research and design.",
+                    "difficulty": "Advanced",
+                    "estimated_hours": "20-30 hours", 
+                    "skills": ["Programming", "Engineering", "Problem Solving"],
+                    "reward_credits": 400
+                }
+            ]
+
+        return LLMCall(
+            messages=[
+                {"role": "system", "content": "You are an expert project manager who breaks down complex engineering projects into manageable tasks."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=2000,
+            parse=parse,
+            fallback=fallback if use_fallback else None
+        )
 
     # --- Workspace Assistance (Code Assistant) ---
     def workspace_assist(self, message: str, tier: str, files: Dict[str, str]) -> Dict:
@@ -266,6 +713,20 @@ class AITaskGenerator:
         Returns a dict: { 'tips': [...], 'explanation': str, 'patch': {'path': str, 'content': str} | None }
         Uses OpenAI if API key is available; otherwise returns a heuristic fallback.
         """
+        return self._run(self._assist_call(message, tier, files))
+
+    async def aworkspace_assist(self, message: str, tier: str, files: Dict[str, str]) -> Dict:
+        return await self._arun(self._assist_call(message, tier, files))
+
+    def stream_workspace_assist(self, message: str, tier: str, files: Dict[str, str]):
+        """Streaming workspace_assist: token events carry the explanation as it is
+        written; the final done event carries the same dict as workspace_assist."""
+        return self._stream(self._assist_call(message, tier, files, stream=True))
+
+    def astream_workspace_assist(self, message: str, tier: str, files: Dict[str, str]):
+        return self._astream(self._assist_call(message, tier, files, stream=True))
+
+    def _assist_call(self, message: str, tier: str, files: Dict[str, str], stream: bool = False) -> LLMCall:
         # Fallback (no API key or client error)
         def fallback():
             tips = []
@@ -286,46 +747,53 @@ class AITaskGenerator:
             return {'tips': tips, 'explanation': explanation, 'patch': patch}
 
         if not openai.api_key:
-            return fallback()
+            return LLMCall.done(fallback())
 
-        try:
-            # Build a compact representation of files (cap size)
-            MAX_CHARS = 12000
-            parts = []
-            total = 0
-            for path, content in files.items():
-                snippet = content[:4000]
-                blob = f"FILE: {path}\n" + snippet
-                if total + len(blob) > MAX_CHARS:
-                    break
-                parts.append(blob)
-                total += len(blob)
-            files_context = "\n\n".join(parts) if parts else "(no files)"
+        # Build a compact representation of files (cap size)
+        MAX_CHARS = 12000
+        parts = []
+        total = 0
+        for path, content in files.items():
+            snippet = content[:4000]
+            blob = f"FILE: {path}\n" + snippet
+            if total + len(blob) > MAX_CHARS:
+                break
+            parts.append(blob)
+            total += len(blob)
+        files_context = "\n\n".join(parts) if parts else "(no files)"
 
+        if stream:
+            # Prose first so it can be forwarded token by token, structured part last
             sys = (
                 "You are a precise coding assistant inside a constrained IDE. "
-                "Respond with JSON: {\"explanation\": str, \"tips\": [str], \"patch\": {\"path\": str, \"content\": str} | null}. "
+                "First write a short plain-text explanation for the user. Then, on its own line, write "
+                f"{ASSIST_STREAM_MARKER} followed by JSON: {{\"tips\": [str], \"patch\": {{\"path\": str, \"content\": str}} | null}}. "
                 "Patch must be a full file content replacement (no diffs). "
                 "Only include a patch if confident."
             )
-            usr = (
-                f"Tier: {tier}\n\n"
-                f"User message:\n{message}\n\n"
-                f"Current files (truncated):\n{files_context}\n\n"
-                "Return JSON only, no prose. Include explanation summarizing the change."
+        else:
+            sys = (
+                "You are a precise coding assistant inside a constrained IDE. "
+                "Respond with JSON: {\"explanation\": str, \"tips\": [str], \"patch\": {\"path\": str, \"content\": str} | null}. "
+                "Patch must be a full file content replacement (no diffs). "
+                "Only include a patch if confident."
             )
+        usr = (
+            f"Tier: {tier}\n\n"
+            f"User message:\n{message}\n\n"
+            f"Current files (truncated):\n{files_context}\n\n"
+            + ("Follow the response format exactly." if stream else
+               "Return JSON only, no prose. Include explanation summarizing the change.")
+        )
 
-            resp = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": sys},
-                    {"role": "user", "content": usr}
-                ],
-                temperature=0.2,
-                max_tokens=800
-            )
-            text = resp.choices[0].message.content.strip()
-            data = json.loads(text)
+        def parse(text):
+            if stream:
+                explanation, _, trailer = text.partition(ASSIST_STREAM_MARKER)
+                data = json.loads(trailer) if trailer.strip() else {}
+                if isinstance(data, dict):
+                    data['explanation'] = explanation.strip()
+            else:
+                data = json.loads(text)
             tips = data.get('tips', []) if isinstance(data, dict) else []
             explanation = data.get('explanation') if isinstance(data, dict) else ''
             patch = data.get('patch') if isinstance(data, dict) else None
@@ -333,10 +801,23 @@ class AITaskGenerator:
             if patch and not (isinstance(patch, dict) and 'path' in patch and 'content' in patch):
                 patch = None
             return {'tips': tips, 'explanation': explanation or '', 'patch': patch}
-        except Exception as e:
+
+        def on_error(e):
             print(f"workspace_assist error: {e}")
             return fallback()
 
+        return LLMCall(
+            messages=[
+                {"role": "system", "content": sys},
+                {"role": "user", "content": usr}
+            ],
+            temperature=0.2,
+            max_tokens=800,
+            parse=parse,
+            fallback=on_error,
+            marker=ASSIST_STREAM_MARKER if stream else None
+        )
+
     def generate_learning_plan(self, inputs: Dict) -> Dict:
         """Generate a structured, step-by-step learning plan.
 
@@ -348,6 +829,12 @@ class AITaskGenerator:
           - starting_level: str (beginner/intermediate/advanced)
           - modality: str (video/text/project/mixed)
         """
+        return self._run(self._learning_plan_call(inputs))
+
+    async def agenerate_learning_plan(self, inputs: Dict) -> Dict:
+        return await self._arun(self._learning_plan_call(inputs))
+
+    def _learning_plan_call(self, inputs: Dict) -> LLMCall:
         # Normalize inputs
         interests = inputs.get('interests', '')
         target_skills = inputs.get('target_skills', [])
@@ -406,20 +893,7 @@ class AITaskGenerator:
         }}
         """
 
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a world-class curriculum designer who creates explicit, step-by-step plans."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.6,
-                max_tokens=2500
-            )
-            raw = response.choices[0].message.content.strip()
-            plan = json.loads(raw)
-            return plan
-        except Exception as e:
+        def fallback(e):
             print(f"Error generating learning plan: {e}")
             # Minimal fallback
             return {
@@ -450,8 +924,32 @@ class AITaskGenerator:
                 "capstone": {"title": "Capstone", "description": "Integrate everything.", "acceptance_criteria": ["Meets brief", "Deployed/demoable"]}
             }
 
+        return LLMCall(
+            messages=[
+                {"role": "system", "content": "You are a world-class curriculum designer who creates explicit, step-by-step plans."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.6,
+            max_tokens=2500,
+            parse=json.loads,
+            fallback=fallback
+        )
+
     def generate_chat_response(self, user_message: str, context: Dict) -> str:
         """Generate contextual AI chat response for learning assistance"""
+        return self._run(self._chat_call(user_message, context))
+
+    async def agenerate_chat_response(self, user_message: str, context: Dict) -> str:
+        return await self._arun(self._chat_call(user_message, context))
+
+    def stream_chat_response(self, user_message: str, context: Dict):
+        """Streaming generate_chat_response: token events, then done with the full reply"""
+        return self._stream(self._chat_call(user_message, context))
+
+    def astream_chat_response(self, user_message: str, context: Dict):
+        return self._astream(self._chat_call(user_message, context))
+
+    def _chat_call(self, user_message: str, context: Dict) -> LLMCall:
         
         # Extract context information
         current_project = context.get('project', {})
@@ -492,20 +990,7 @@ class AITaskGenerator:
         Respond as a helpful tutor:
         """
 
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a patient, encouraging coding tutor who explains things simply and keeps learners motivated."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=200
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
+        def fallback(e):
             print(f"Error generating chat response: {e}")
             # Friendly fallback responses
             fallback_responses = [
@@ -518,12 +1003,28 @@ class AITaskGenerator:
             import random
             return random.choice(fallback_responses)
 
+        return LLMCall(
+            messages=[
+                {"role": "system", "content": "You are a patient, encouraging coding tutor who explains things simply and keeps learners motivated."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=200,
+            fallback=fallback
+        )
+
     def generate_character_report(self, profile: Dict, inputs: Dict) -> Dict:
         """Generate a concise character/skills report to help pairing.
 
         profile: current user profile stored in DB (username, full_name, bio, skills, etc.)
         inputs: additional free-text + survey answers from the UI
         """
+        return self._run(self._character_report_call(profile, inputs))
+
+    async def agenerate_character_report(self, profile: Dict, inputs: Dict) -> Dict:
+        return await self._arun(self._character_report_call(profile, inputs))
+
+    def _character_report_call(self, profile: Dict, inputs: Dict) -> LLMCall:
         # Compose a compact context
         summary = {
             'name': profile.get('full_name') or profile.get('username'),
@@ -563,19 +1064,7 @@ class AITaskGenerator:
         Return ONLY valid JSON matching the schema.
         """
 
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You create pragmatic, compact talent snapshots for team formation and learning paths."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=900
-            )
-            raw = response.choices[0].message.content.strip()
-            return json.loads(raw)
-        except Exception as e:
+        def fallback(e):
             print(f"Error generating character report: {e}")
             # Fallback lightweight report
             skills = summary.get('skills') or []
@@ -598,5 +1087,16 @@ class AITaskGenerator:
                 "confidence": 0.35
             }
 
+        return LLMCall(
+            messages=[
+                {"role": "system", "content": "You create pragmatic, compact talent snapshots for team formation and learning paths."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.5,
+            max_tokens=900,
+            parse=json.loads,
+            fallback=fallback
+        )
+
 # Initialize the AI service
 ai_service = AITaskGenerator()
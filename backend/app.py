@@ -1,17 +1,25 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from database import init_database, ProjectDB, QuestionDB, AnswerDB, TaskDB, UserDB, LearningPlanDB, EnvTemplateDB
-from ai_service import ai_service
+from database import init_database, seed_demo_data, begin_request, end_request, add_statement_hook, Page, DashboardDB, ProjectDB, QuestionDB, AnswerDB, TaskDB, UserDB, LearningPlanDB, EnvTemplateDB
+from ai import ai_service
+from jobs import job_queue
+from sandbox import sandbox_pool, SandboxBusy, SANDBOX_BATCH_MAX
+from impact import impact_tracker, is_test_file
+from leaderboard import leaderboard
+from cache import MemoryCache
+from passwords import password_hasher, PasswordBusy
+import metrics
+from querylog import QUERY_TRACE, query_tracer
+import profiler
 import traceback
+import json
+import secrets
 import os
 import jwt
 import datetime
 from functools import wraps
 from dotenv import load_dotenv
 import time
-import tempfile
-import subprocess
-import shutil
 
 # Load environment variables
 load_dotenv()
@@ -22,40 +30,200 @@ CORS(app)
 # JWT Secret Key (in production, this should be a secure random key)
 JWT_SECRET = os.getenv('JWT_SECRET', 'nova-secret-key-change-in-production')
 
+# Fork the password hashing workers before any background threads exist
+password_hasher.start()
+
 # Initialize database on startup
 init_database()
 
+# Each request checks out at most one pooled DB connection, shared by all helpers.
+# Routes marked with db_per_call (LLM calls, sandbox runs) are left unbound so a
+# slow upstream can't hold connections and starve the pool.
+@app.before_request
+def _bind_db_connection():
+    view = app.view_functions.get(request.endpoint)
+    if getattr(view, 'db_request_scope', True):
+        begin_request()
+
+@app.teardown_request
+def _release_db_connection(exc):
+    end_request()
+
+# Prometheus metrics on GET /metrics: per-route request timings, SQL statements,
+# LLM calls and sandbox runs (see metrics.py)
+metrics.init_app(app)
+if metrics.METRICS:
+    # A hook makes every statement pay for timing, so only add it when it is scraped
+    add_statement_hook(metrics.observe_sql)
+metrics.Gauge('nova_sandbox_workers', 'Sandbox workers by state',
+              lambda: {(state,): sandbox_pool.stats()[state] for state in ('idle', 'busy')}, ('state',))
+metrics.Gauge('nova_sandbox_queue_depth', 'Evaluations waiting for a sandbox worker',
+              lambda: sandbox_pool.stats()['waiting'])
+
+# Opt-in statement tracing and slow-query log (QUERY_TRACE=1, see querylog.py)
+if QUERY_TRACE:
+    query_tracer.install()
+
+# On-demand sampling profiles for one request or a time window (PROFILE_KEY, see profiler.py)
+profiler.init_app(app)
+
+# Decoded JWT claims keyed by token string, so repeat requests skip signature checks
+token_cache = MemoryCache(max_entries=int(os.getenv('TOKEN_CACHE_SIZE', '4096')),
+                          ttl=float(os.getenv('TOKEN_CACHE_TTL', '300')))
+
+def decode_token(token):
+    """Verified claims for a token, from the cache when it was seen recently"""
+    data = token_cache.get(token)
+    if data is not None:
+        # Cached entries may outlive the token itself
+        if data.get('exp') is not None and data['exp'] <= time.time():
+            token_cache.delete(token)
+            raise jwt.ExpiredSignatureError('Signature has expired')
+        return data
+    data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    token_cache.set(token, data)
+    return data
+
+def authenticate(token):
+    """Resolve an Authorization header value to (user, None) or (None, error message)"""
+    if not token:
+        return None, 'Token is missing'
+    
+    try:
+        if token.startswith('Bearer '):
+            token = token[7:]
+        data = decode_token(token)
+        current_user_id = data['user_id']
+        current_user = UserDB.get_user(current_user_id)
+        if not current_user:
+            return None, 'User not found'
+    except jwt.ExpiredSignatureError:
+        return None, 'Token has expired'
+    except jwt.InvalidTokenError:
+        return None, 'Token is invalid'
+    return current_user, None
+
 # Authentication decorator
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        
-        try:
-            if token.startswith('Bearer '):
-                token = token[7:]
-            data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-            current_user_id = data['user_id']
-            current_user = UserDB.get_user(current_user_id)
-            if not current_user:
-                return jsonify({'message': 'User not found'}), 401
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token is invalid'}), 401
+        current_user, error = authenticate(request.headers.get('Authorization'))
+        if error:
+            return jsonify({'message': error}), 401
         
         return f(current_user, *args, **kwargs)
     return decorated
 
+def db_per_call(f):
+    """Don't bind a pooled connection to the whole request: each DB helper
+    checks one out and returns it, so none is held while the route waits"""
+    f.db_request_scope = False
+    return f
+
+def ai_required(f):
+    """Answer 503 instead of running an AI endpoint when AI_MODE=off"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not ai_service.enabled:
+            return jsonify(error="AI features are not available on this server"), 503
+        return f(*args, **kwargs)
+    # AI routes spend seconds waiting on the LLM
+    return db_per_call(decorated)
+
+def project_qa(project_id):
+    """Project row, its answers and the Q&A history in the shape the AI expects"""
+    project = ProjectDB.get_project(project_id)
+    answers = AnswerDB.get_answers(project_id)
+    qa_history = []
+    for answer in answers:
+        qa_history.append({
+            'question': answer['question_text'],
+            'answer': answer['answer_text']
+        })
+    return project, answers, qa_history
+
+def page_args():
+    """Parse ?limit=, ?cursor= and ?fields= list parameters.
+
+    Returns (page, fields); page is None when the client asked for neither a
+    limit nor a cursor, which keeps the full, unpaginated response.
+    """
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    fields = request.args.get('fields')
+    page = Page(limit or 20, cursor) if (limit or cursor) else None
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+    return page, fields
+
+def sectioned_listing(sections, user_id):
+    """Serve a multi-section list endpoint (my-tasks, my-applications).
+
+    With ?section=name only that section is returned, with its next_cursor.
+    Otherwise every section is returned; when paginated each section gets its
+    own first page and the cursors are reported under next_cursors. The plain
+    unpaginated listing is read in a single statement (DashboardDB).
+    """
+    page, fields = page_args()
+    section = request.args.get('section')
+    if not section and page is None and fields is None:
+        return DashboardDB.get_sections(user_id, list(sections))
+    if section:
+        if section not in sections:
+            raise ValueError(f"Unknown section: {section}")
+        items = sections[section](user_id, fields=fields, page=page)
+        return {section: items, 'next_cursor': page.next_cursor if page else None}
+    if page and page.cursor:
+        raise ValueError("cursor requires a section parameter")
+    result = {}
+    next_cursors = {}
+    for name, fetch in sections.items():
+        section_page = Page(page.limit) if page else None
+        result[name] = fetch(user_id, fields=fields, page=section_page)
+        if section_page:
+            next_cursors[name] = section_page.next_cursor
+    if page:
+        result['next_cursors'] = next_cursors
+    return result
+
+def chat_payload(response):
+    return {'response': response, 'timestamp': datetime.datetime.utcnow().isoformat()}
+
+def assist_payload(result, message):
+    return {
+        'response': {
+            'tips': result.get('tips', []),
+            'explanation': result.get('explanation', ''),
+            'echo': message
+        },
+        'patch': result.get('patch')
+    }
+
+def ai_event_stream(events, payload, error_message):
+    """SSE response relaying an ai_service stream: token {text} events, then
+    done with payload(value). A client disconnect closes the completion."""
+    def generate():
+        try:
+            for event in events:
+                if event['type'] == 'token':
+                    yield sse('token', {'text': event['text']})
+                else:
+                    yield sse('done', payload(event['value']))
+        except Exception as e:
+            print(f"{error_message}: {e}")
+            traceback.print_exc()
+            yield sse('error', {'error': error_message})
+        finally:
+            events.close()
+
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
 @app.get("/api/hello")
 def hello():
     return jsonify(message="Hello from Nova API!")
 
 # Character report for profile
 @app.post("/api/profile/character-report")
+@ai_required
 @token_required
 def character_report(current_user):
     try:
@@ -89,7 +257,10 @@ def register():
         if len(password) < 6:
             return jsonify(error="Password must be at least 6 characters long"), 400
         
-        user_id, error = UserDB.create_user(username, email, password, full_name)
+        try:
+            user_id, error = UserDB.create_user(username, email, password, full_name)
+        except PasswordBusy as e:
+            return jsonify(error=f"{e}, please retry shortly"), 429
         
         if error:
             return jsonify(error=error), 400
@@ -129,7 +300,10 @@ def login():
         if not all([username_or_email, password]):
             return jsonify(error="Username/email and password are required"), 400
         
-        user = UserDB.authenticate_user(username_or_email, password)
+        try:
+            user = UserDB.authenticate_user(username_or_email, password)
+        except PasswordBusy as e:
+            return jsonify(error=f"{e}, please retry shortly"), 429
         
         if not user:
             return jsonify(error="Invalid credentials"), 401
@@ -203,7 +377,7 @@ def grant_supernode(current_user):
     try:
         # Ensure massive credits and leadership stats
         target_credits = 10_000_000
-        existing = UserDB.get_user(current_user['id'])
+        existing = current_user
         have = int(existing.get('credits') or 0)
         if have < target_credits:
             UserDB.add_credits(current_user['id'], target_credits - have)
@@ -223,17 +397,38 @@ def grant_supernode(current_user):
 
 @app.get("/api/leaderboard")
 def get_leaderboard():
+    """Top users. Query: ?limit= (max LEADERBOARD_MAX_LIMIT), ?offset=, ?window=all|week|month"""
     try:
-        limit = int(request.args.get('limit', 50))
-        users = UserDB.leaderboard(limit=limit)
-        return jsonify(users=users)
+        board = leaderboard.top(limit=request.args.get('limit', 50, type=int),
+                                offset=request.args.get('offset', 0, type=int),
+                                window=request.args.get('window', 'all'))
+        return jsonify(board)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
     except Exception as e:
         print(f"Leaderboard error: {e}")
         traceback.print_exc()
         return jsonify(error="Failed to load leaderboard"), 500
 
+@app.get("/api/leaderboard/me")
+@token_required
+def get_my_rank(current_user):
+    """The caller's rank and neighbours. Query: ?window=all|week|month, ?radius= (default 5)"""
+    try:
+        board = leaderboard.me(current_user['id'],
+                               window=request.args.get('window', 'all'),
+                               radius=request.args.get('radius', 5, type=int))
+        return jsonify(board)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except Exception as e:
+        print(f"Leaderboard rank error: {e}")
+        traceback.print_exc()
+        return jsonify(error="Failed to load rank"), 500
+
 # Education: generate learning plan
 @app.post("/api/education/plan")
+@ai_required
 def generate_learning_plan():
     """Generate a spoon-fed learning plan based on user inputs"""
     try:
@@ -282,8 +477,11 @@ def save_learning_plan(current_user):
 def get_my_learning_plans(current_user):
     """Get all learning plans for the current user"""
     try:
-        plans = LearningPlanDB.get_user_plans(current_user['id'])
-        return jsonify(plans=plans)
+        page, fields = page_args()
+        plans = LearningPlanDB.get_user_plans(current_user['id'], fields=fields, page=page)
+        return jsonify(plans=plans, next_cursor=page.next_cursor if page else None)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
     except Exception as e:
         print(f"Get plans error: {e}")
         print(traceback.format_exc())
@@ -330,6 +528,7 @@ def update_plan_progress(current_user, plan_id):
 
 # Education: chatbot for IDE help
 @app.post("/api/education/chat")
+@ai_required
 @token_required
 def education_chat(current_user):
     """Chat with AI assistant for learning help"""
@@ -344,17 +543,29 @@ def education_chat(current_user):
         # Generate contextual AI response
         response = ai_service.generate_chat_response(user_message, context)
         
-        return jsonify({
-            'response': response,
-            'timestamp': datetime.datetime.utcnow().isoformat()
-        })
+        return jsonify(chat_payload(response))
         
     except Exception as e:
         print(f"Chat error: {e}")
         print(traceback.format_exc())
         return jsonify(error="Failed to get chat response"), 500
 
+@app.post("/api/education/chat/stream")
+@ai_required
+@token_required
+def education_chat_stream(current_user):
+    """Streaming chat over server-sent events.
+    Body as /api/education/chat. Events: token {text} as the reply is written,
+    then done {response, timestamp} with the complete reply (or error {error}).
+    """
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return jsonify(error="Message is required"), 400
+    events = ai_service.stream_chat_response(data['message'], data.get('context', {}))
+    return ai_event_stream(events, chat_payload, "Failed to get chat response")
+
 @app.post("/api/projects/create")
+@ai_required
 @token_required
 def create_project(current_user):
     """Create a new engineering project and generate first AI question"""
@@ -391,6 +602,7 @@ def create_project(current_user):
         return jsonify(error="Failed to create project"), 500
 
 @app.post("/api/projects/<int:project_id>/answer")
+@ai_required
 def submit_answer(project_id):
     """Submit an answer and get next adaptive question or move to task generation"""
     try:
@@ -406,24 +618,12 @@ def submit_answer(project_id):
         AnswerDB.add_answer(project_id, question_id, answer_text)
         
         # Get project and Q&A history
-        project = ProjectDB.get_project(project_id)
-        answers = AnswerDB.get_answers(project_id)
+        project, answers, qa_history = project_qa(project_id)
         
-        # Format Q&A history for AI
-        qa_history = []
-        for answer in answers:
-            qa_history.append({
-                'question': answer['question_text'],
-                'answer': answer['answer_text']
-            })
-        
-        # Check if we need more questions
-        need_more_questions = ai_service.should_generate_more_questions(project['description'], qa_history)
+        # Check if we need more questions (and draft the next one concurrently)
+        need_more_questions, next_question_text = ai_service.plan_next_question(project['description'], qa_history)
         
         if need_more_questions:
-            # Generate next adaptive question
-            next_question_text = ai_service.generate_next_question(project['description'], qa_history)
-            
             # Store new question in database
             QuestionDB.add_questions(project_id, [next_question_text])
             
@@ -451,50 +651,74 @@ def submit_answer(project_id):
         traceback.print_exc()
         return jsonify(error="Failed to submit answer"), 500
 
+@job_queue.handler('generate_tasks', run_here=ai_service.enabled)
+def run_generate_tasks(payload):
+    """Background job: generate tasks from the project's Q&A and store them"""
+    project_id = payload['project_id']
+    project, _, qa_pairs = project_qa(project_id)
+    if not project:
+        raise ValueError(f"Project {project_id} not found")
+    
+    # Raise on API errors and malformed output so the job queue retries with backoff
+    ai_tasks = ai_service.generate_tasks(project['description'], qa_pairs, fallback=False)
+    
+    # Store tasks in database and read them back with IDs in one query
+    task_ids = TaskDB.create_tasks(project_id, ai_tasks)
+    return {
+        'tasks': TaskDB.get_tasks(task_ids),
+        'project_id': project_id
+    }
+
+def job_response(job):
+    return {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'result': job['result'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    }
+
 @app.post("/api/projects/<int:project_id>/generate-tasks")
-def generate_tasks(project_id):
-    """Generate tasks based on project questions and answers"""
+@token_required
+def generate_tasks(current_user, project_id):
+    """Queue task generation and return the job; poll /api/jobs/<job_id> for tasks.
+    While a generation for the project is queued or running, further calls
+    (duplicate clicks) return that job; once it has finished a call queues a
+    new one. A retried request carrying the same Idempotency-Key header
+    returns the job it already queued.
+    """
     try:
-        # Get project details
         project = ProjectDB.get_project(project_id)
-        if not project:
+        if not project or project['user_id'] != current_user['id']:
             return jsonify(error="Project not found"), 404
         
-        # Get all questions and answers
-        questions = QuestionDB.get_questions(project_id)
-        answers = AnswerDB.get_answers(project_id)
-        
-        # Format Q&A for AI
-        qa_pairs = []
-        for answer in answers:
-            qa_pairs.append({
-                'question': answer['question_text'],
-                'answer': answer['answer_text']
-            })
-        
-        # Generate tasks using AI
-        ai_tasks = ai_service.generate_tasks(project['description'], qa_pairs)
-        
-        # Store tasks in database
-        task_ids = TaskDB.create_tasks(project_id, ai_tasks)
-        
-        # Get tasks back with IDs
-        tasks = []
-        for task_id in task_ids:
-            task = TaskDB.get_task(task_id)
-            if task:
-                tasks.append(task)
-        
-        return jsonify({
-            'tasks': tasks,
-            'project_id': project_id
-        })
+        key = request.headers.get('Idempotency-Key')
+        job = job_queue.enqueue('generate_tasks', {'project_id': project_id},
+                                idempotency_key=f'generate_tasks:{project_id}:{key}' if key else None,
+                                user_id=current_user['id'], unique_active=True)
+        return jsonify(job_response(job)), 202
         
     except Exception as e:
         print(f"Error generating tasks: {e}")
         traceback.print_exc()
         return jsonify(error="Failed to generate tasks"), 500
 
+@app.get("/api/jobs/<int:job_id>")
+@token_required
+def get_job(current_user, job_id):
+    """Status of one of the user's background jobs, with its result once succeeded"""
+    try:
+        job = job_queue.get(job_id)
+        if not job or job['user_id'] != current_user['id']:
+            return jsonify(error="Job not found"), 404
+        return jsonify(job_response(job))
+    except Exception as e:
+        print(f"Get job error: {e}")
+        return jsonify(error="Failed to load job"), 500
+
 @app.get("/api/projects/<int:project_id>")
 def get_project(project_id):
     """Get project details including questions, answers, and tasks"""
@@ -526,16 +750,22 @@ def get_all_tasks():
         skills = request.args.get('skills')  # comma-separated
         min_credits = request.args.get('min_credits', type=int)
         max_credits = request.args.get('max_credits', type=int)
+        # Optional keyset pagination (?limit=&cursor=) and projection (?fields=)
+        page, fields = page_args()
         
         tasks = TaskDB.get_filtered_tasks(
             difficulty=difficulty,
             skills=skills.split(',') if skills else None,
             min_credits=min_credits,
-            max_credits=max_credits
+            max_credits=max_credits,
+            fields=fields,
+            page=page
         )
         
-        return jsonify(tasks=tasks)
+        return jsonify(tasks=tasks, next_cursor=page.next_cursor if page else None)
         
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
     except Exception as e:
         print(f"Error getting tasks: {e}")
         traceback.print_exc()
@@ -584,23 +814,16 @@ def apply_to_task(current_user, task_id):
 def get_my_tasks(current_user):
     """Get tasks assigned to or created by the current user"""
     try:
-        user_id = current_user['id']
-        
-        # Get assigned tasks (tasks user has applied for and been assigned)
-        assigned_tasks = TaskDB.get_user_assigned_tasks(user_id)
-        
-        # Get completed tasks
-        completed_tasks = TaskDB.get_user_completed_tasks(user_id)
-        
-        # Get created tasks (tasks from projects created by user)
-        created_tasks = TaskDB.get_user_created_tasks(user_id)
-        
-        return jsonify({
-            'assigned': assigned_tasks,
-            'completed': completed_tasks,
-            'created': created_tasks
-        })
-        
+        return jsonify(sectioned_listing({
+            # Tasks user has applied for and been assigned
+            'assigned': TaskDB.get_user_assigned_tasks,
+            'completed': TaskDB.get_user_completed_tasks,
+            # Tasks from projects created by user
+            'created': TaskDB.get_user_created_tasks
+        }, current_user['id']))
+        
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
     except Exception as e:
         print(f"Error fetching user tasks: {e}")
         print(traceback.format_exc())
@@ -641,24 +864,42 @@ def update_task_status(current_user, task_id):
 def get_my_applications(current_user):
     """Get applications sent by and received by the current user"""
     try:
-        user_id = current_user['id']
-        
-        # Get applications sent by this user
-        sent_applications = TaskDB.get_user_sent_applications(user_id)
-        
-        # Get applications received for tasks created by this user
-        received_applications = TaskDB.get_user_received_applications(user_id)
-        
-        return jsonify({
-            'sent': sent_applications,
-            'received': received_applications
-        })
-        
+        return jsonify(sectioned_listing({
+            # Applications sent by this user
+            'sent': TaskDB.get_user_sent_applications,
+            # Applications received for tasks created by this user
+            'received': TaskDB.get_user_received_applications
+        }, current_user['id']))
+        
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
     except Exception as e:
         print(f"Get my applications error: {e}")
         traceback.print_exc()
         return jsonify(error="Failed to get applications"), 500
 
+@app.get("/api/dashboard")
+@token_required
+def get_dashboard(current_user):
+    """My tasks and my applications in one response, read in one statement.
+    Optional ?sections=assigned,received limits the sections returned.
+    """
+    try:
+        names = request.args.get('sections')
+        names = [n.strip() for n in names.split(',') if n.strip()] if names else None
+        sections = DashboardDB.get_sections(current_user['id'], names)
+        return jsonify({
+            'tasks': {name: sections[name] for name in ('assigned', 'completed', 'created') if name in sections},
+            'applications': {name: sections[name] for name in ('sent', 'received') if name in sections}
+        })
+
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except Exception as e:
+        print(f"Get dashboard error: {e}")
+        traceback.print_exc()
+        return jsonify(error="Failed to get dashboard"), 500
+
 @app.put("/api/applications/<int:application_id>/status")
 @token_required
 def update_application_status(current_user, application_id):
@@ -818,6 +1059,7 @@ def create_workspace(current_user, task_id):
         return jsonify(error="Failed to create workspace"), 500
 
 @app.post("/api/workspaces/<int:task_id>/assist")
+@ai_required
 @token_required
 def workspace_assist(current_user, task_id):
     """Lightweight code assistant stub. Returns guidance and optional file patch.
@@ -830,82 +1072,240 @@ def workspace_assist(current_user, task_id):
         files = data.get('files') or {}
 
         result = ai_service.workspace_assist(message, tier, files)
-        return jsonify({
-            'response': {
-                'tips': result.get('tips', []),
-                'explanation': result.get('explanation', ''),
-                'echo': message
-            },
-            'patch': result.get('patch')
-        })
+        return jsonify(assist_payload(result, message))
     except Exception as e:
         print(f"Workspace assist error: {e}")
         return jsonify(error="Assistant failed"), 500
 
+@app.post("/api/workspaces/<int:task_id>/assist/stream")
+@ai_required
+@token_required
+def workspace_assist_stream(current_user, task_id):
+    """Streaming assist over server-sent events.
+    Body as /assist. Events: token {text} with the explanation as it is
+    written, then done {response, patch} shaped like /assist (or error {error}).
+    """
+    data = request.get_json() or {}
+    message = (data.get('message') or '').strip()
+    tier = (data.get('tier') or 'medium').lower()
+    events = ai_service.stream_workspace_assist(message, tier, data.get('files') or {})
+    return ai_event_stream(events, lambda result: assist_payload(result, message), "Assistant failed")
+
+def evaluation_request(current_user, task_id):
+    """Validate an evaluate request body and the caller's access to the task.
+    Returns (files, runtime, None) or (None, None, error response).
+    """
+    data = request.get_json() or {}
+    files = data.get('files') or {}
+    runtime = data.get('runtime') or 'python3.11'
+
+    # Authorization: same as open workspace (assignee or owner)
+    task = TaskDB.get_task(task_id)
+    if not task:
+        return None, None, (jsonify(error="Task not found"), 404)
+    is_assignee = TaskDB.user_can_update_task(task_id, current_user['id'])
+    project = ProjectDB.get_project(task['project_id']) if task else None
+    is_owner = project and project.get('user_id') == current_user['id']
+    if not (is_assignee or is_owner):
+        return None, None, (jsonify(error="Unauthorized to evaluate"), 403)
+
+    # Only support Python for now
+    if not str(runtime).lower().startswith('python'):
+        return None, None, (jsonify(error="Only Python runtime supported in MVP"), 400)
+    return files, str(runtime).lower(), None
+
+def sse(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
 @app.post("/api/workspaces/<int:task_id>/evaluate")
+@db_per_call
 @token_required
 def workspace_evaluate(current_user, task_id):
     """Run evaluation for the given files in a temporary sandbox.
-    Body: { files: {path: content}, runtime: 'python3.11' }
-    NOTE: This MVP uses a local subprocess and assumes pytest is available.
-    It writes files to a temp directory, runs pytest with a timeout, and returns output.
+    Body: { files: {path: content}, runtime: 'python3.11', full: false }
+    Files are written to a per-run temp directory and pytest runs there with a
+    timeout on a pre-warmed worker process (see sandbox.py); returns output.
+    Re-evaluations only run the test files affected by the change unless
+    full is set; see impact.py and the 'selection' field of the response.
+    """
+    try:
+        files, runtime, error = evaluation_request(current_user, task_id)
+        if error:
+            return error
+        full = bool((request.get_json() or {}).get('full'))
+        selection = impact_tracker.plan(task_id, current_user['id'], files, full=full)
+
+        # Run pytest on a warm sandbox worker (cold subprocess if the pool is off)
+        if selection.mode == 'none':
+            result = impact_tracker.skipped_result(selection)
+        else:
+            try:
+                result = sandbox_pool.evaluate(files, runtime=runtime, args=selection.args)
+            except SandboxBusy:
+                return jsonify(error="Evaluation queue is full, please retry shortly"), 429
+            result = impact_tracker.merge(selection, result)
+        impact_tracker.record(task_id, current_user['id'], files, result)
+        return jsonify(result)
+    except Exception as e:
+        print(f"Workspace evaluate error: {e}")
+        traceback.print_exc()
+        return jsonify(error="Evaluation failed"), 500
+
+@app.post("/api/workspaces/<int:task_id>/evaluate/stream")
+@db_per_call
+@token_required
+def workspace_evaluate_stream(current_user, task_id):
+    """Streaming evaluate over server-sent events.
+    Body as /evaluate. Events: start {run_id, selection}, collected {count},
+    test {nodeid, when, outcome, duration}, stdout/stderr {line}, and a final
+    result {success, exit_code, stdout, stderr, cached} (or error {error}).
+    Disconnecting, or POST .../evaluate/<run_id>/cancel, stops the run.
+    """
+    try:
+        files, runtime, error = evaluation_request(current_user, task_id)
+        if error:
+            return error
+    except Exception as e:
+        print(f"Workspace evaluate error: {e}")
+        traceback.print_exc()
+        return jsonify(error="Evaluation failed"), 500
+
+    run_id = secrets.token_urlsafe(12)
+    user_id = current_user['id']
+    full = bool((request.get_json() or {}).get('full'))
+    selection = impact_tracker.plan(task_id, user_id, files, full=full)
+
+    def generate():
+        yield sse('start', {'run_id': run_id, 'selection': selection.as_dict()})
+        if selection.mode == 'none':
+            result = impact_tracker.skipped_result(selection)
+            impact_tracker.record(task_id, user_id, files, result)
+            yield sse('result', result)
+            return
+        events = sandbox_pool.evaluate_stream(files, runtime=runtime, run_id=run_id, args=selection.args)
+        try:
+            for event in events:
+                if event['type'] == 'result':
+                    event = impact_tracker.merge(selection, event)
+                    impact_tracker.record(task_id, user_id, files, event)
+                yield sse(event.pop('type'), event)
+        except SandboxBusy:
+            yield sse('error', {'error': "Evaluation queue is full, please retry shortly"})
+        except Exception as e:
+            print(f"Workspace evaluate stream error: {e}")
+            traceback.print_exc()
+            yield sse('error', {'error': "Evaluation failed"})
+        finally:
+            # Client disconnects close this generator; closing ours cancels the run
+            events.close()
+
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@app.post("/api/workspaces/<int:task_id>/evaluate/<run_id>/cancel")
+@token_required
+def workspace_evaluate_cancel(current_user, task_id, run_id):
+    """Stop a streaming evaluation early"""
+    return jsonify(cancelled=sandbox_pool.cancel(run_id))
+
+@job_queue.handler('evaluate_batch')
+def run_evaluate_batch(payload):
+    """Background job: grade a batch of submissions on the sandbox pool"""
+    batch = sandbox_pool.evaluate_batch(payload['submissions'], base_files=payload['base_files'],
+                                        runtime=payload['runtime'])
+    return dict(task_id=payload['task_id'], **batch)
+
+@app.post("/api/workspaces/<int:task_id>/evaluate/batch")
+@token_required
+def workspace_evaluate_batch(current_user, task_id):
+    """Queue grading of many submissions for one task; poll /api/jobs/<job_id>
+    for {task_id, results, summary}.
+    Body: { submissions: [{id, files}], base_files: {path: content} | template_id, runtime }
+    Shared base files (explicit, or the template scaffold's tests) win over
+    submission files at the same path and are written once per sandbox worker;
+    submissions fan out across the warm pool. Only the task's project owner may grade.
+    A retried request with the same Idempotency-Key returns the same job.
     """
     try:
         data = request.get_json() or {}
-        files = data.get('files') or {}
-        runtime = data.get('runtime') or 'python3.11'
+        submissions = data.get('submissions') or []
+        runtime = str(data.get('runtime') or 'python3.11').lower()
 
-        # Authorization: same as open workspace (assignee or owner)
         task = TaskDB.get_task(task_id)
         if not task:
             return jsonify(error="Task not found"), 404
-        is_assignee = TaskDB.user_can_update_task(task_id, current_user['id'])
-        project = ProjectDB.get_project(task['project_id']) if task else None
-        is_owner = project and project.get('user_id') == current_user['id']
-        if not (is_assignee or is_owner):
-            return jsonify(error="Unauthorized to evaluate"), 403
-
-        # Only support Python for now
-        if not str(runtime).lower().startswith('python'):
+        project = ProjectDB.get_project(task['project_id'])
+        if not project or project.get('user_id') != current_user['id']:
+            return jsonify(error="Unauthorized to grade this task"), 403
+        if not runtime.startswith('python'):
             return jsonify(error="Only Python runtime supported in MVP"), 400
+        if not submissions or not all(isinstance(s, dict) and isinstance(s.get('files'), dict) for s in submissions):
+            return jsonify(error="submissions must be a non-empty list of {id, files}"), 400
+        if len(submissions) > SANDBOX_BATCH_MAX:
+            return jsonify(error=f"At most {SANDBOX_BATCH_MAX} submissions per batch"), 400
 
-        # Create temp workspace
-        tempdir = tempfile.mkdtemp(prefix=f"nova_ws_{task_id}_")
-        try:
-            # Write files
-            for relpath, content in files.items():
-                safe_rel = relpath.strip().lstrip('/').replace('..', '')
-                abspath = os.path.join(tempdir, safe_rel)
-                os.makedirs(os.path.dirname(abspath), exist_ok=True)
-                with open(abspath, 'w', encoding='utf-8') as f:
-                    f.write(content)
-
-            # Run pytest
-            cmd = ["python", "-m", "pytest", "-q"]
-            proc = subprocess.Popen(
-                cmd,
-                cwd=tempdir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            try:
-                stdout, stderr = proc.communicate(timeout=25)
-            except subprocess.TimeoutExpired:
-                proc.kill()
-                stdout, stderr = proc.communicate()
-                return jsonify(success=False, exit_code=124, stdout=stdout, stderr=stderr + "\nTIMEOUT: evaluation exceeded 25s"), 200
+        base_files = data.get('base_files')
+        if base_files is None and 'template_id' in data:
+            template = EnvTemplateDB.get_template(data['template_id'])
+            if not template:
+                return jsonify(error="Template not found"), 404
+            # Grade against the template's tests; its stubs are the submission's to replace
+            base_files = {path: content for path, content in template['scaffold'].items() if is_test_file(path)}
 
-            return jsonify(success=(proc.returncode == 0), exit_code=proc.returncode, stdout=stdout, stderr=stderr)
-        finally:
-            try:
-                shutil.rmtree(tempdir)
-            except Exception:
-                pass
+        key = request.headers.get('Idempotency-Key')
+        # Grading outcomes are results, not errors; a failed attempt would fail the same way again
+        job = job_queue.enqueue('evaluate_batch', {
+            'task_id': task_id,
+            'submissions': submissions,
+            'base_files': base_files or {},
+            'runtime': runtime
+        }, idempotency_key=f'evaluate_batch:{task_id}:{key}' if key else None, max_attempts=1,
+            user_id=current_user['id'])
+        return jsonify(job_response(job)), 202
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
     except Exception as e:
-        print(f"Workspace evaluate error: {e}")
+        print(f"Batch evaluate error: {e}")
         traceback.print_exc()
-        return jsonify(error="Evaluation failed"), 500
+        return jsonify(error="Batch evaluation failed"), 500
+
+@app.get("/api/workspaces/eval-stats")
+@token_required
+def workspace_eval_stats(current_user):
+    """Sandbox pool occupancy and evaluation cache hit rate"""
+    return jsonify(sandbox_pool.stats())
+
+@app.get("/api/debug/queries")
+def traced_queries():
+    """Statements with the most total time since startup, by calling *DB method
+    (QUERY_TRACE=1; send the PROFILE_KEY as X-Profile-Key)"""
+    if not QUERY_TRACE:
+        return jsonify(error="Query tracing is off (set QUERY_TRACE=1)"), 404
+    if not profiler.key_matches(request.headers.get('X-Profile-Key', '')):
+        return jsonify(error="Invalid profile key"), 403
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 200))
+    except ValueError:
+        return jsonify(error="limit must be an integer"), 400
+    return jsonify(queries=query_tracer.summary(limit), slow_ms=query_tracer.slow_seconds * 1000,
+                   log_path=query_tracer.log_path)
+
+@job_queue.handler('seed_demo_data')
+def run_seed_demo_data(payload):
+    """Background job: insert the demo Builder accounts"""
+    return {'created': seed_demo_data(payload.get('users', 20))}
+
+# Start background job workers once every handler is registered
+job_queue.start()
+
+# Demo accounts are opt-in and seeded off the startup path (once per database)
+if os.getenv('NOVA_SEED_ON_STARTUP', '0') == '1':
+    job_queue.enqueue('seed_demo_data', {'users': 20}, idempotency_key='seed_demo_data')
+
+# Spawn the sandbox workers now so they are warm by the first evaluation
+sandbox_pool.start()
 
 if __name__ == "__main__":
     # Default dev server on http://127.0.0.1:5001 (avoiding AirPlay conflict on 5000)
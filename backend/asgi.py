@@ -0,0 +1,266 @@
+"""ASGI entry point that keeps slow LLM calls off the worker threads.
+
+The AI-backed POST endpoints are served by async handlers that await the
+completion on the event loop, so a single process can hold thousands of
+in-flight GPT calls; their short database reads/writes run in the default
+thread pool. Handlers may return an async generator of (event, data) pairs
+instead of a JSON payload to answer with server-sent events. Every other
+route is forwarded unchanged to the Flask app.
+
+Run with:  uvicorn asgi:application --host 127.0.0.1 --port 5001
+"""
+import asyncio
+import inspect
+import json
+import re
+import time
+import traceback
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app, authenticate, project_qa, sse, chat_payload, assist_payload
+from ai import ai_service
+import metrics
+from database import ProjectDB, QuestionDB, AnswerDB
+
+flask_app = WsgiToAsgi(app)
+
+ROUTES = []
+
+def route(path, auth=False):
+    """Register an async POST handler; <int:name> segments become int kwargs"""
+    pattern = re.compile('^' + re.sub(r'<int:(\w+)>', r'(?P<\1>\\d+)', path) + '$')
+
+    def register(handler):
+        ROUTES.append((path, pattern, auth, handler))
+        return handler
+    return register
+
+def match_route(method, path):
+    if method != 'POST':
+        return None
+    for rule, pattern, auth, handler in ROUTES:
+        m = pattern.match(path)
+        if m:
+            return rule, handler, auth, {k: int(v) for k, v in m.groupdict().items()}
+    return None
+
+async def read_json(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def send_events(receive, send, events):
+    """Stream (event, data) pairs as server-sent events until the generator
+    ends or the client goes away"""
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        async for event, data in events:
+            if disconnected.done():
+                break
+            await send({'type': 'http.response.body', 'body': sse(event, data).encode('utf-8'), 'more_body': True})
+    finally:
+        disconnected.cancel()
+        await events.aclose()
+    await send({'type': 'http.response.body', 'body': b''})
+
+async def ai_events(events, payload, error_message):
+    """(event, data) pairs for an ai_service stream: token {text}, then done"""
+    try:
+        async for event in events:
+            if event['type'] == 'token':
+                yield 'token', {'text': event['text']}
+            else:
+                yield 'done', payload(event['value'])
+    except Exception as e:
+        print(f"{error_message}: {e}")
+        traceback.print_exc()
+        yield 'error', {'error': error_message}
+    finally:
+        await events.aclose()
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    # With AI_MODE=off the Flask app answers these routes with 503
+    matched = (match_route(scope.get('method'), scope.get('path', ''))
+               if scope['type'] == 'http' and ai_service.enabled else None)
+    if matched is None:
+        return await flask_app(scope, receive, send)
+
+    # Flask times the routes it serves; these are recorded under the same labels
+    started = time.perf_counter()
+    rule, handler, auth, params = matched
+    if auth:
+        headers = dict(scope.get('headers') or [])
+        token = headers.get(b'authorization', b'').decode('latin-1')
+        current_user, error = await asyncio.to_thread(authenticate, token)
+        if error:
+            metrics.observe_request('POST', rule, 401, time.perf_counter() - started)
+            return await send_json(send, {'message': error}, 401)
+        params['current_user'] = current_user
+    data = await read_json(receive)
+    payload, status = await handler(data, **params)
+    if inspect.isasyncgen(payload):
+        metrics.observe_request('POST', rule, 200, time.perf_counter() - started)
+        return await send_events(receive, send, payload)
+    metrics.observe_request('POST', rule, status, time.perf_counter() - started)
+    await send_json(send, payload, status)
+
+@route('/api/profile/character-report', auth=True)
+async def character_report(data, current_user):
+    try:
+        report = await ai_service.agenerate_character_report(current_user, data or {})
+        return report, 200
+    except Exception as e:
+        print(f"Character report error: {e}")
+        traceback.print_exc()
+        return {'error': "Failed to generate character report"}, 500
+
+@route('/api/education/plan')
+async def generate_learning_plan(data):
+    try:
+        plan = await ai_service.agenerate_learning_plan(data or {})
+        return plan, 200
+    except Exception as e:
+        print(f"Education plan error: {e}")
+        print(traceback.format_exc())
+        return {'error': "Failed to generate learning plan"}, 500
+
+@route('/api/education/chat', auth=True)
+async def education_chat(data, current_user):
+    try:
+        if not data or 'message' not in data:
+            return {'error': "Message is required"}, 400
+        response = await ai_service.agenerate_chat_response(data['message'], data.get('context', {}))
+        return chat_payload(response), 200
+    except Exception as e:
+        print(f"Chat error: {e}")
+        print(traceback.format_exc())
+        return {'error': "Failed to get chat response"}, 500
+
+@route('/api/education/chat/stream', auth=True)
+async def education_chat_stream(data, current_user):
+    if not data or 'message' not in data:
+        return {'error': "Message is required"}, 400
+    events = ai_service.astream_chat_response(data['message'], data.get('context', {}))
+    return ai_events(events, chat_payload, "Failed to get chat response"), 200
+
+@route('/api/workspaces/<int:task_id>/assist', auth=True)
+async def workspace_assist(data, current_user, task_id):
+    try:
+        data = data or {}
+        message = (data.get('message') or '').strip()
+        tier = (data.get('tier') or 'medium').lower()
+        files = data.get('files') or {}
+
+        result = await ai_service.aworkspace_assist(message, tier, files)
+        return assist_payload(result, message), 200
+    except Exception as e:
+        print(f"Workspace assist error: {e}")
+        return {'error': "Assistant failed"}, 500
+
+@route('/api/workspaces/<int:task_id>/assist/stream', auth=True)
+async def workspace_assist_stream(data, current_user, task_id):
+    data = data or {}
+    message = (data.get('message') or '').strip()
+    tier = (data.get('tier') or 'medium').lower()
+    events = ai_service.astream_workspace_assist(message, tier, data.get('files') or {})
+    return ai_events(events, lambda result: assist_payload(result, message), "Assistant failed"), 200
+
+@route('/api/projects/create', auth=True)
+async def create_project(data, current_user):
+    try:
+        if not data or 'description' not in data:
+            return {'error': "Project description is required"}, 400
+
+        engineering_problem = data['description']
+        title = data.get('title', engineering_problem[:100] + "..." if len(engineering_problem) > 100 else engineering_problem)
+        project_id = await asyncio.to_thread(ProjectDB.create_project, title, engineering_problem, current_user['id'])
+
+        first_question = await ai_service.agenerate_initial_question(engineering_problem)
+        await asyncio.to_thread(QuestionDB.add_questions, project_id, [first_question])
+        questions = await asyncio.to_thread(QuestionDB.get_questions, project_id)
+        return {
+            'project_id': project_id,
+            'current_question': questions[0],
+            'total_questions_so_far': 1
+        }, 200
+    except Exception as e:
+        print(f"Error creating project: {e}")
+        traceback.print_exc()
+        return {'error': "Failed to create project"}, 500
+
+@route('/api/projects/<int:project_id>/answer')
+async def submit_answer(data, project_id):
+    try:
+        if not data or 'question_id' not in data or 'answer' not in data:
+            return {'error': "Question ID and answer are required"}, 400
+
+        await asyncio.to_thread(AnswerDB.add_answer, project_id, data['question_id'], data['answer'])
+        project, answers, qa_history = await asyncio.to_thread(project_qa, project_id)
+
+        need_more_questions, next_question_text = await ai_service.aplan_next_question(project['description'], qa_history)
+        if not need_more_questions:
+            return {
+                'all_answered': True,
+                'message': 'Sufficient context gathered. Ready to generate tasks...',
+                'total_questions': len(answers),
+                'total_answers': len(answers)
+            }, 200
+
+        await asyncio.to_thread(QuestionDB.add_questions, project_id, [next_question_text])
+        all_questions = await asyncio.to_thread(QuestionDB.get_questions, project_id)
+        return {
+            'all_answered': False,
+            'next_question': all_questions[-1],
+            'answers_so_far': len(answers),
+            'total_questions_so_far': len(all_questions)
+        }, 200
+    except Exception as e:
+        print(f"Error submitting answer: {e}")
+        traceback.print_exc()
+        return {'error': "Failed to submit answer"}, 500
@@ -0,0 +1,77 @@
+"""Benchmark: connect-per-call vs pooled SQLite connections.
+
+Drives /api/my-tasks (token lookup + three task queries) through the Flask
+test client against a throwaway database, once with pooling disabled and once
+with the pool enabled, and prints requests/sec for each.
+
+Usage: python benchmarks/bench_db_pool.py [--requests 2000] [--threads 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def run(client, headers, total, threads):
+    per_thread = total // threads
+
+    def worker():
+        for _ in range(per_thread):
+            resp = client.get('/api/my-tasks', headers=headers)
+            assert resp.status_code == 200, resp.status_code
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return (per_thread * threads) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=8)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='nova_bench_')
+    os.environ['DATABASE_PATH'] = os.path.join(tmpdir, 'bench.db')
+
+    import database
+    from app import app, JWT_SECRET
+    import jwt
+
+    user_id, _ = database.UserDB.create_user('bench', 'bench@example.com', 'password123')
+    project_id = database.ProjectDB.create_project('Bench', 'Benchmark project', user_id)
+    database.TaskDB.create_tasks(project_id, [
+        {'title': f'Task {i}', 'description': 'x' * 200, 'difficulty': 'Beginner',
+         'estimated_hours': '1-2 hours', 'skills': ['Python', 'SQL']}
+        for i in range(20)
+    ])
+    token = jwt.encode({'user_id': user_id}, JWT_SECRET, algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    results = {}
+    for label, size in (('connect-per-call', 0), (f'pooled (size={args.pool_size})', args.pool_size)):
+        database.configure_pool(size=size, path=os.environ['DATABASE_PATH'])
+        run(client, headers, min(200, args.requests), args.threads)  # warm-up
+        results[label] = run(client, headers, args.requests, args.threads)
+
+    print(f"/api/my-tasks, {args.requests} requests, {args.threads} threads")
+    for label, rps in results.items():
+        print(f"  {label:<24} {rps:10.1f} req/s")
+    base, pooled = list(results.values())
+    print(f"  speedup                  {pooled / base:10.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: import time and memory of an API worker with and without the AI subsystem.
+
+Starts a fresh interpreter per run and reports the wall time of `import app`
+and the process's peak RSS afterwards for:
+  lazy    - default; openai/ai_service are not imported until an AI endpoint runs
+  eager   - app plus ai_service imported up front (the previous behaviour)
+  off     - AI_MODE=off
+
+Usage: python benchmarks/bench_import.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+{extra}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'openai_loaded': 'openai' in sys.modules}}))
+'''
+
+VARIANTS = [
+    ('lazy', {}, ''),
+    ('eager', {}, 'import ai_service'),
+    ('off', {'AI_MODE': 'off'}, ''),
+]
+
+
+def probe(env, extra):
+    out = subprocess.run([sys.executable, '-c', PROBE.format(extra=extra)], cwd=BACKEND_DIR, env=env,
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='nova_bench_')
+    base_env = dict(os.environ, DATABASE_PATH=os.path.join(tmpdir, 'bench.db'),
+                    JOB_WORKERS='0', SANDBOX_WORKERS='0', PASSWORD_WORKERS='0')
+    probe(base_env, '')  # migrate the throwaway database once
+
+    for name, env, extra in VARIANTS:
+        samples = [probe(dict(base_env, **env), extra) for _ in range(args.runs)]
+        seconds = statistics.median(s['seconds'] for s in samples)
+        rss_mb = statistics.median(s['rss_kb'] for s in samples) / 1024
+        print(f"{name:<6} import app {seconds * 1000:8.1f} ms   peak RSS {rss_mb:6.1f} MB   "
+              f"openai loaded: {samples[0]['openai_loaded']}")
+
+
+if __name__ == '__main__':
+    main()
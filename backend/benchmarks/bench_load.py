@@ -0,0 +1,318 @@
+"""Benchmark: mixed-endpoint load test with a local OpenAI stand-in.
+
+Seeds a throwaway database with users, projects, tasks and applications,
+replaces openai.ChatCompletion.create/acreate with a fake that sleeps for a
+configurable latency and returns canned replies, then drives a weighted mix
+of user flows through the Flask test client from several threads:
+
+  browse    marketplace listings and filters, a project page, the leaderboard,
+            my applications
+  apply     apply to a random task
+  answer    create a project and answer its questions until the AI is done
+  evaluate  run a workspace test suite in the sandbox pool
+
+Prints throughput plus p50/p95/p99 latency per route (URL rule; task listing
+variants are split by query string), so regressions show up without network
+access or an API key.
+
+Usage: python benchmarks/bench_load.py [--duration 20] [--threads 8]
+           [--mix browse=70,apply=15,answer=10,evaluate=5]
+           [--users 500] [--projects 100] [--tasks-per-project 10] [--applications 2000]
+           [--llm-latency-ms 300] [--llm-jitter-ms 100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DIFFICULTIES = ('Beginner', 'Intermediate', 'Advanced')
+SKILLS = ('Python', 'SQL', 'React', 'Docker', 'Research', 'Testing', 'Design', 'Go')
+
+CANNED_TASKS = [
+    {'title': f'Benchmark task {i}', 'description': 'Canned task from the fake model. ' * 5,
+     'difficulty': DIFFICULTIES[i % 3], 'estimated_hours': '4-8 hours',
+     'skills': list(SKILLS[i % 4:i % 4 + 3]), 'reward_credits': 100 + 50 * i}
+    for i in range(5)
+]
+
+EVAL_TEST = 'from main import solve\n\n\ndef test_solve():\n    assert solve({n}) == {n}\n'
+EVAL_MAIN = 'def solve(x):\n    return x  # run {n}\n'
+
+
+class _Obj(dict):
+    """Attribute access over a dict, like openai's response objects"""
+    __getattr__ = dict.__getitem__
+
+
+class FakeChatCompletion:
+    """Stand-in for openai.ChatCompletion with canned replies per prompt type"""
+
+    def __init__(self, latency=0.3, jitter=0.1):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        with self._lock:
+            self.calls += 1
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    @staticmethod
+    def reply(messages):
+        prompt = messages[-1]['content']
+        if 'Respond with only "YES"' in prompt:
+            # Ask a fourth question, then finish
+            return 'NO' if prompt.count('Q: ') < 4 else 'YES'
+        if '"next_question"' in prompt:
+            done = prompt.count('Q: ') >= 4
+            return json.dumps({'done': done, 'next_question': None if done else 'What are the main constraints?'})
+        if 'JSON array of task objects' in prompt:
+            return json.dumps(CANNED_TASKS)
+        if 'tips' in prompt and 'patch' in prompt:
+            return json.dumps({'tips': ['Check the edge cases'], 'patch': None})
+        return 'Who are the target users, and how will you measure success?'
+
+    def _response(self, messages):
+        text = self.reply(messages)
+        return _Obj(choices=[_Obj(message=_Obj(role='assistant', content=text))],
+                    usage=_Obj(prompt_tokens=sum(len(m['content']) // 4 for m in messages),
+                               completion_tokens=len(text) // 4))
+
+    @staticmethod
+    def _chunks(text):
+        for i in range(0, len(text), 16):
+            yield _Obj(choices=[_Obj(delta=_Obj(content=text[i:i + 16]))])
+
+    def create(self, messages=None, stream=False, **kwargs):
+        time.sleep(self._delay())
+        if stream:
+            return self._chunks(self.reply(messages))
+        return self._response(messages)
+
+    async def acreate(self, messages=None, stream=False, **kwargs):
+        await asyncio.sleep(self._delay())
+        if stream:
+            async def chunks():
+                for chunk in self._chunks(self.reply(messages)):
+                    yield chunk
+            return chunks()
+        return self._response(messages)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)   # route -> seconds
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, route, status, seconds):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            self.statuses[route][status // 100] += 1
+
+    def report(self, elapsed):
+        total = sum(len(v) for v in self.latencies.values())
+        print(f"{'route':<48} {'reqs':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'4xx':>5} {'5xx':>5}")
+        for route in sorted(self.latencies, key=lambda r: -len(self.latencies[r])):
+            values = sorted(self.latencies[route])
+            statuses = self.statuses[route]
+            print(f"{route:<48} {len(values):>7} {len(values) / elapsed:>8.1f} "
+                  f"{percentile(values, 50) * 1000:>8.1f} {percentile(values, 95) * 1000:>8.1f} "
+                  f"{percentile(values, 99) * 1000:>8.1f} {statuses[4]:>5} {statuses[5]:>5}")
+        print(f"{'total':<48} {total:>7} {total / elapsed:>8.1f}")
+
+
+def seed(args, database):
+    """Users, projects owned by the first users, tasks, and applications"""
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    users = []
+    for i in range(args.users):
+        user_id, _ = database.UserDB.create_user(f'bench{i}', f'bench{i}@example.com', 'password123')
+        users.append(user_id)
+    owners = users[:max(1, args.users // 10)]
+    projects = {}   # project_id -> owner
+    tasks = {}      # task_id -> owner
+    for i in range(args.projects):
+        owner = owners[i % len(owners)]
+        project_id = database.ProjectDB.create_project(f'Project {i}', 'Benchmark project. ' * 10, owner)
+        projects[project_id] = owner
+        task_ids = database.TaskDB.create_tasks(project_id, [{
+            'title': f'Task {i}.{j}', 'description': 'Benchmark task description. ' * 8,
+            'difficulty': rng.choice(DIFFICULTIES), 'estimated_hours': '2-4 hours',
+            'skills': rng.sample(SKILLS, 3), 'reward_credits': rng.randint(50, 500)}
+            for j in range(args.tasks_per_project)])
+        tasks.update((task_id, owner) for task_id in task_ids)
+    applied = set()
+    task_list = list(tasks)
+    for _ in range(min(args.applications, len(task_list) * len(users))):
+        task_id, user_id = rng.choice(task_list), rng.choice(users)
+        if (task_id, user_id) in applied or tasks[task_id] == user_id:
+            continue
+        applied.add((task_id, user_id))
+        database.TaskDB.create_application(task_id, user_id, f'bench{user_id}', f'bench{user_id}@example.com', 'Seeded')
+    print(f"Seeded {len(users)} users, {len(projects)} projects, {len(tasks)} tasks, "
+          f"{len(applied)} applications in {time.perf_counter() - started:.1f}s")
+    return users, projects, tasks
+
+
+class Flows:
+    def __init__(self, client, recorder, tokens, users, projects, tasks):
+        self.client = client
+        self.recorder = recorder
+        self.tokens = tokens
+        self.users = users
+        self.projects = list(projects)
+        self.tasks = tasks
+        self.task_list = list(tasks)
+
+    def request(self, method, url, route, user_id=None, body=None):
+        headers = {'Authorization': f'Bearer {self.tokens[user_id]}'} if user_id else {}
+        started = time.perf_counter()
+        resp = self.client.open(url, method=method, headers=headers, json=body)
+        self.recorder.record(route, resp.status_code, time.perf_counter() - started)
+        return resp
+
+    def browse(self, rng):
+        choice = rng.randrange(7)
+        if choice == 0:
+            self.request('GET', '/api/tasks', '/api/tasks')
+        elif choice == 1:
+            self.request('GET', '/api/tasks?limit=20', '/api/tasks?limit')
+        elif choice == 2:
+            self.request('GET', f'/api/tasks?difficulty={rng.choice(DIFFICULTIES)}&limit=20', '/api/tasks?difficulty')
+        elif choice == 3:
+            self.request('GET', f'/api/tasks?skills={rng.choice(SKILLS)}&limit=20', '/api/tasks?skills')
+        elif choice == 4:
+            self.request('GET', f'/api/projects/{rng.choice(self.projects)}', '/api/projects/<project_id>')
+        elif choice == 5:
+            self.request('GET', '/api/leaderboard?limit=20', '/api/leaderboard')
+        else:
+            self.request('GET', '/api/my-applications', '/api/my-applications', rng.choice(self.users))
+
+    def apply(self, rng):
+        task_id = rng.choice(self.task_list)
+        self.request('POST', f'/api/tasks/{task_id}/apply', '/api/tasks/<task_id>/apply',
+                     rng.choice(self.users), {'message': 'I would like to work on this.'})
+
+    def answer(self, rng):
+        user_id = rng.choice(self.users)
+        resp = self.request('POST', '/api/projects/create', '/api/projects/create', user_id,
+                            {'title': 'Load test project', 'description': f'Build a thing #{rng.random()}'})
+        if resp.status_code != 200:
+            return
+        project_id, question = resp.json['project_id'], resp.json['current_question']
+        for _ in range(8):
+            resp = self.request('POST', f'/api/projects/{project_id}/answer', '/api/projects/<project_id>/answer',
+                                body={'question_id': question['id'], 'answer': 'About a hundred users, one month.'})
+            if resp.status_code != 200 or resp.json['all_answered']:
+                break
+            question = resp.json['next_question']
+
+    def evaluate(self, rng):
+        task_id = rng.choice(self.task_list)
+        # Unique content per run so the evaluation cache does not answer it
+        n = rng.randrange(10 ** 9)
+        files = {'main.py': EVAL_MAIN.format(n=n), 'test_main.py': EVAL_TEST.format(n=n)}
+        self.request('POST', f'/api/workspaces/{task_id}/evaluate', '/api/workspaces/<task_id>/evaluate',
+                     self.tasks[task_id], {'files': files, 'full': True})
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {'browse', 'apply', 'answer', 'evaluate'}
+    if unknown:
+        raise SystemExit(f"Unknown flows in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=20, help='seconds of load after warm-up')
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--mix', default='browse=70,apply=15,answer=10,evaluate=5')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--projects', type=int, default=100)
+    parser.add_argument('--tasks-per-project', type=int, default=10)
+    parser.add_argument('--applications', type=int, default=2000)
+    parser.add_argument('--llm-latency-ms', type=float, default=300)
+    parser.add_argument('--llm-jitter-ms', type=float, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    tmpdir = tempfile.mkdtemp(prefix='nova_bench_')
+    os.environ['DATABASE_PATH'] = os.path.join(tmpdir, 'bench.db')
+    os.environ.setdefault('OPENAI_API_KEY', 'bench-fake-key')
+    # Measure the request paths, not seeding-time password hashing or cached LLM replies
+    os.environ.setdefault('PASSWORD_ITERATIONS', '1000')
+    os.environ.setdefault('LLM_CACHE', 'off')
+    os.environ.setdefault('JOB_WORKERS', '0')
+    os.environ.setdefault('NOVA_SEED_ON_STARTUP', '0')
+    if 'evaluate' not in mix:
+        os.environ.setdefault('SANDBOX_WORKERS', '0')
+
+    import openai
+    fake = FakeChatCompletion(args.llm_latency_ms / 1000, args.llm_jitter_ms / 1000)
+    openai.ChatCompletion.create = fake.create
+    openai.ChatCompletion.acreate = fake.acreate
+
+    import database
+    import jwt
+    from app import app, JWT_SECRET
+
+    users, projects, tasks = seed(args, database)
+    tokens = {user_id: jwt.encode({'user_id': user_id}, JWT_SECRET, algorithm='HS256') for user_id in users}
+    recorder = Recorder()
+    flows = Flows(app.test_client(), recorder, tokens, users, projects, tasks)
+    names, weights = list(mix), list(mix.values())
+
+    stop = threading.Event()
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        while not stop.is_set():
+            getattr(flows, rng.choices(names, weights)[0])(rng)
+
+    flows.recorder = Recorder()  # warm-up results are discarded
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    time.sleep(args.warmup)
+    flows.recorder = recorder
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"\nmix {args.mix}, {args.threads} threads, {elapsed:.1f}s, "
+          f"fake LLM {args.llm_latency_ms:g}±{args.llm_jitter_ms:g} ms ({fake.calls} calls)")
+    recorder.report(elapsed)
+
+
+if __name__ == '__main__':
+    main()
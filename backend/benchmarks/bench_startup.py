@@ -0,0 +1,51 @@
+"""Benchmark: backend cold start.
+
+Times `import app` in a fresh interpreter (what every server process and test
+run pays) against a throwaway database: first on an empty database, which
+runs every migration, then repeatedly on the migrated one, which should only
+read PRAGMA user_version. Background workers are disabled so only the import
+and database setup are measured. Also times seeding the demo users, which is
+no longer part of startup.
+
+Usage: python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(code, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='nova_bench_')
+    env = dict(os.environ, DATABASE_PATH=os.path.join(tmpdir, 'bench.db'),
+               JOB_WORKERS='0', SANDBOX_WORKERS='0', PASSWORD_WORKERS='0', NOVA_SEED_ON_STARTUP='0')
+
+    baseline = statistics.median(timed('import flask, openai', env) for _ in range(args.runs))
+    first = timed('import app', env)
+    warm = [timed('import app', env) for _ in range(args.runs)]
+    seed = timed('import database; database.seed_demo_data(20)', env)
+
+    print(f"{'third-party imports only':<28} {baseline * 1000:8.1f} ms")
+    print(f"{'import app, empty database':<28} {first * 1000:8.1f} ms")
+    print(f"{'import app, migrated (p50)':<28} {statistics.median(warm) * 1000:8.1f} ms")
+    print(f"{'seed 20 demo users':<28} {seed * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
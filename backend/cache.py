@@ -0,0 +1,199 @@
+"""Small response caches shared by the AI and workspace services.
+
+Two backends with the same interface (get/set/delete/clear/stats):
+  - MemoryCache: thread-safe LRU with per-entry TTL, bounded by entry count
+  - SQLiteCache: on-disk store with TTL, bounded by total value size
+
+Values must be JSON-serializable. Keys are arbitrary strings; callers
+usually pass a hash from make_key().
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(*parts):
+    """Stable SHA-256 key for a JSON-serializable tuple of parts"""
+    raw = json.dumps(parts, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def evicted(self, count=1):
+        with self._lock:
+            self.evictions += count
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class MemoryCache:
+    """In-process LRU cache with a default TTL (seconds, None = no expiry)"""
+
+    def __init__(self, max_entries=1024, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self.stats.record(entry is not None)
+        return entry[1] if entry is not None else default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.stats.evicted(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def info(self):
+        return dict(self.stats.as_dict(), backend='memory', entries=len(self), max_entries=self.max_entries)
+
+
+class SQLiteCache:
+    """On-disk cache in its own SQLite file, evicting least-recently-used
+    entries once the stored values exceed ``max_bytes``."""
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (accessed_at)')
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM cache_entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and row[1] is not None and row[1] <= now:
+                self._conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+                row = None
+            if row is not None:
+                self._conn.execute('UPDATE cache_entries SET accessed_at = ? WHERE key = ?', (now, key))
+        self.stats.record(row is not None)
+        return json.loads(row[0]) if row is not None else default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        blob = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                '''INSERT OR REPLACE INTO cache_entries (key, value, size, expires_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (key, blob, len(blob), now + ttl if ttl is not None else None, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        self._conn.execute('DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?', (time.time(),))
+        evicted = 0
+        rows = self._conn.execute('SELECT key, size FROM cache_entries ORDER BY accessed_at').fetchall()
+        total = sum(size for _, size in rows)
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        if evicted:
+            self.stats.evicted(evicted)
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache_entries')
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(1) FROM cache_entries').fetchone()[0]
+
+    def info(self):
+        return dict(self.stats.as_dict(), backend='sqlite', entries=len(self), max_bytes=self.max_bytes)
+
+
+def cache_from_env(prefix, default_backend='memory', default_ttl=None, default_path=None):
+    """Build a cache from <PREFIX>_CACHE, _CACHE_TTL, _CACHE_SIZE and _CACHE_PATH.
+
+    <PREFIX>_CACHE is 'memory', 'sqlite' or 'off' (returns None). _CACHE_SIZE
+    is an entry count for memory and a byte budget for sqlite.
+    """
+    backend = os.getenv(f'{prefix}_CACHE', default_backend).lower()
+    ttl = os.getenv(f'{prefix}_CACHE_TTL')
+    ttl = float(ttl) if ttl else default_ttl
+    size = os.getenv(f'{prefix}_CACHE_SIZE')
+    if backend == 'memory':
+        return MemoryCache(max_entries=int(size) if size else 1024, ttl=ttl)
+    if backend == 'sqlite':
+        path = os.getenv(f'{prefix}_CACHE_PATH', default_path or f'{prefix.lower()}_cache.db')
+        return SQLiteCache(path, max_bytes=int(size) if size else 64 * 1024 * 1024, ttl=ttl)
+    return None
@@ -1,221 +1,729 @@
 import sqlite3
 import json
 import os
-import hashlib
-import secrets
+import base64
 from datetime import datetime
 from dotenv import load_dotenv
 import random
+import queue
+import threading
+import time
+import atexit
+from concurrent.futures import Future
+from migrations import run_migrations, schema_is_current
+from cache import MemoryCache
+from passwords import password_hasher
 
 # Load environment variables
 load_dotenv()
 
 DATABASE_PATH = os.getenv('DATABASE_PATH', 'nova.db')
+# Connection pool sizing; DB_POOL_SIZE=0 falls back to connect-per-call
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# Storage mode: 'wal' (default) or 'rollback' for SQLite's legacy journal
+DB_STORAGE_MODE = os.getenv('DB_STORAGE_MODE', 'wal').lower()
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL').upper()
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', '8192'))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(128 * 1024 * 1024)))
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+# Single-writer queue that group-commits small writes (WAL mode only by default)
+DB_WRITE_QUEUE = os.getenv('DB_WRITE_QUEUE', '1' if DB_STORAGE_MODE == 'wal' else '0') == '1'
+DB_WRITE_BATCH = int(os.getenv('DB_WRITE_BATCH', '64'))
+# Serve marketplace skill filters from an in-memory skill -> task ids index
+SKILL_INDEX = os.getenv('SKILL_INDEX', '0') == '1'
+# In-process cache of UserDB.get_user rows (seconds; 0 disables). Writes made by
+# this process invalidate it; changes from other processes show up within the TTL.
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '30'))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '4096'))
+
+def configure_connection(conn):
+    """Apply journal mode and performance pragmas to a new connection"""
+    if DB_STORAGE_MODE == 'wal':
+        conn.execute('PRAGMA journal_mode=WAL')
+    if DB_SYNCHRONOUS in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+        conn.execute(f'PRAGMA synchronous={DB_SYNCHRONOUS}')
+    conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+    conn.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+# Callables fn(sql, params, seconds, rows, error) run after every statement on
+# this module's connections (metrics.py, query tracing). rows is None when
+# unknown, e.g. for results consumed by iterating the cursor.
+_statement_hooks = []
+
+def add_statement_hook(fn):
+    _statement_hooks.append(fn)
+
+def _notify(sql, params, seconds, rows, error=None):
+    for hook in _statement_hooks:
+        try:
+            hook(sql, params, seconds, rows, error)
+        except Exception as e:
+            print(f"Statement hook error: {e}")
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement to the statement hooks.
+
+    Statements returning rows are reported on their first fetch (or when the
+    cursor is reused or collected), so their time includes stepping through
+    the result. Without hooks it behaves exactly like sqlite3.Cursor.
+    """
+
+    _pending = None  # (sql, params, seconds so far) of an unfetched result
+
+    def execute(self, sql, parameters=()):
+        if not _statement_hooks:
+            return super().execute(sql, parameters)
+        self._flush()
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except Exception as e:
+            _notify(sql, parameters, time.perf_counter() - started, 0, e)
+            raise
+        elapsed = time.perf_counter() - started
+        if self.description is None:
+            _notify(sql, parameters, elapsed, max(self.rowcount, 0))
+        else:
+            self._pending = (sql, parameters, elapsed)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if not _statement_hooks:
+            return super().executemany(sql, seq_of_parameters)
+        self._flush()
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except Exception as e:
+            _notify(sql, seq_of_parameters, time.perf_counter() - started, 0, e)
+            raise
+        _notify(sql, seq_of_parameters, time.perf_counter() - started, max(self.rowcount, 0))
+        return self
+
+    def _fetched(self, started, rows):
+        if self._pending is not None:
+            sql, params, elapsed = self._pending
+            self._pending = None
+            _notify(sql, params, elapsed + time.perf_counter() - started, rows)
+
+    def _flush(self):
+        if self._pending is not None:
+            sql, params, elapsed = self._pending
+            self._pending = None
+            _notify(sql, params, elapsed, None)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3.Connection whose cursors (including conn.execute's) are TracedCursors"""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
 
 def init_database():
-    """Initialize the database with required tables"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    # Ensure we can access rows by column name during init
+    """Create or upgrade the schema. Once the database is at the latest
+    migration this is a single PRAGMA read; seeding demo users is separate
+    (see seed_demo_data)."""
+    conn = sqlite3.connect(DATABASE_PATH, factory=TracedConnection)
+    try:
+        if DB_STORAGE_MODE != 'wal':
+            # Switching back from WAL is persistent, so undo it explicitly
+            conn.execute('PRAGMA journal_mode=DELETE')
+        configure_connection(conn)
+        if schema_is_current(conn):
+            return
+        # Create or upgrade the schema (tables, columns, indexes, default templates)
+        run_migrations(conn)
+        print("Database initialized successfully!")
+    finally:
+        conn.close()
+
+def seed_demo_data(users=20):
+    """Insert the demo Builder accounts; safe to run repeatedly"""
+    created = UserDB.seed_mock_users(users)
+    print(f"Seeded {created} demo user(s)")
+    return created
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection frees up within the pool timeout"""
+
+
+class PooledConnection:
+    """Thin proxy over a pooled sqlite3 connection.
+
+    Behaves like the connection itself, except that close() hands the
+    connection back to the pool instead of closing it. Connections bound to
+    the current request stay checked out until the request ends.
+    """
+
+    def __init__(self, pool, conn, request_scoped=False):
+        self._pool = pool
+        self._conn = conn
+        self._request_scoped = request_scoped
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._request_scoped:
+            # Match sqlite3 close() semantics: drop anything left uncommitted
+            if self._conn.in_transaction:
+                self._conn.rollback()
+        else:
+            self._pool.release(self._conn)
+
+    def __del__(self):
+        # Helpers that raise before close() must not leak pool capacity
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Thread-aware pool of long-lived SQLite connections.
+
+    Connections are created lazily up to ``size`` and health-checked on
+    checkout. Inside a request scope (see begin_request/end_request) every
+    get_db_connection() call on that thread shares one checked-out connection.
+    """
+
+    def __init__(self, path, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, factory=TracedConnection)
+        conn.row_factory = sqlite3.Row
+        return configure_connection(conn)
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def _checkout(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._connect()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def acquire(self):
+        """Check out a connection (or reuse the one bound to this request)"""
+        if getattr(self._local, 'scoped', False):
+            if getattr(self._local, 'conn', None) is None:
+                self._local.conn = self._checkout()
+            return PooledConnection(self, self._local.conn, request_scoped=True)
+        return PooledConnection(self, self._checkout())
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back any open transaction"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def begin_request(self):
+        """Start a request scope on this thread; the connection is checked out lazily"""
+        self._local.scoped = True
+
+    def end_request(self):
+        """End the request scope and return its connection, if any, to the pool"""
+        conn = getattr(self._local, 'conn', None)
+        self._local.scoped = False
+        self._local.conn = None
+        if conn is not None:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on release)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+db_pool = ConnectionPool(DATABASE_PATH) if DB_POOL_SIZE > 0 else None
+
+
+def configure_pool(size=None, path=None, timeout=None):
+    """Rebuild the global connection pool; size=0 disables pooling"""
+    global db_pool
+    if db_pool is not None:
+        db_pool.close_all()
+    size = DB_POOL_SIZE if size is None else size
+    path = path or (db_pool.path if db_pool is not None else DATABASE_PATH)
+    timeout = DB_POOL_TIMEOUT if timeout is None else timeout
+    db_pool = ConnectionPool(path, size, timeout) if size > 0 else None
+    return db_pool
+
+
+def begin_request():
+    """Bind one pooled connection to the current request (lazily)"""
+    if db_pool is not None:
+        db_pool.begin_request()
+
+
+def end_request():
+    """Release the connection bound to the current request"""
+    if db_pool is not None:
+        db_pool.end_request()
+
+
+def get_db_connection():
+    """Get a database connection (pooled unless DB_POOL_SIZE=0)"""
+    if db_pool is not None:
+        return db_pool.acquire()
+    conn = sqlite3.connect(DATABASE_PATH, factory=TracedConnection)
     conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Projects table - stores engineering problems
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            user_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            status TEXT DEFAULT 'active',
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    
-    # Questions table - stores AI-generated questions for projects
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS questions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER,
-            question_text TEXT NOT NULL,
-            question_order INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects (id)
-        )
-    ''')
-    
-    # Answers table - stores user answers to questions
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS answers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER,
-            question_id INTEGER,
-            answer_text TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects (id),
-            FOREIGN KEY (question_id) REFERENCES questions (id)
-        )
-    ''')
-    
-    # Tasks table - stores generated tasks
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id INTEGER,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            difficulty TEXT NOT NULL,
-            estimated_hours TEXT NOT NULL,
-            skills TEXT NOT NULL, -- JSON array of skills
-            reward_credits INTEGER DEFAULT 0,
-            status TEXT DEFAULT 'available',
-            applicants_count INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects (id)
-        )
-    ''')
-    
-    # Users table - stores user accounts
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            full_name TEXT,
-            bio TEXT,
-            skills TEXT, -- JSON array of skills
-            credits INTEGER DEFAULT 0,
-            avatar_url TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP
-        )
-    ''')
+    return configure_connection(conn)
 
-    # Backfill columns for user status and leaderboard metrics if missing
-    try:
-        cursor.execute('ALTER TABLE users ADD COLUMN status TEXT')
-    except Exception:
-        pass
+
+class WriteQueue:
+    """Single writer thread that batches queued writes into group commits.
+
+    Each job is a callable taking a connection; it runs inside its own
+    SAVEPOINT so one failing job does not roll back the rest of its batch.
+    Jobs must not call commit() themselves.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, max_batch=DB_WRITE_BATCH):
+        self.path = path
+        self.max_batch = max_batch
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name='nova-db-writer', daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def submit(self, fn, wait=True):
+        """Queue a write job; returns its result, or a Future when wait=False"""
+        self._ensure_started()
+        future = Future()
+        self._jobs.put((fn, future))
+        if wait:
+            return future.result()
+        future.add_done_callback(_log_write_failure)
+        return future
+
+    def stop(self, timeout=5):
+        """Flush pending jobs and stop the writer thread"""
+        if self._thread is None:
+            return
+        self._jobs.put(self._STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        # Autocommit mode: transactions are managed explicitly per batch
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                               factory=TracedConnection)
+        conn.row_factory = sqlite3.Row
+        configure_connection(conn)
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is self._STOP:
+                    return
+                batch = [job]
+                stopping = False
+                while len(batch) < self.max_batch:
+                    try:
+                        job = self._jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(job)
+                self._commit_batch(conn, batch)
+                if stopping:
+                    return
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for fn, future in batch:
+                conn.execute('SAVEPOINT write_job')
+                try:
+                    result = fn(conn)
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write_job')
+                    conn.execute('RELEASE write_job')
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute('RELEASE write_job')
+                    outcomes.append((future, result, None))
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def _log_write_failure(future):
+    error = future.exception()
+    if error is not None:
+        print(f"Background write failed: {error}")
+
+
+db_writer = WriteQueue(DATABASE_PATH) if DB_WRITE_QUEUE else None
+if db_writer is not None:
+    atexit.register(db_writer.stop)
+
+
+def run_write(fn, wait=True, after_commit=None):
+    """Run a write job, through the group-commit queue when it is enabled.
+
+    ``fn(conn)`` performs the statements and returns a value (e.g. lastrowid).
+    With wait=False the call returns immediately (queue mode only).
+    ``after_commit()`` runs once the write has committed (or failed), e.g. to
+    invalidate a cache without letting a read in between refill it stale.
+    """
+    if db_writer is not None:
+        if after_commit is None:
+            return db_writer.submit(fn, wait=wait)
+        future = db_writer.submit(fn, wait=False)
+        future.add_done_callback(lambda _: after_commit())
+        return future.result() if wait else future
+    conn = get_db_connection()
     try:
-        cursor.execute('ALTER TABLE users ADD COLUMN missions_completed INTEGER DEFAULT 0')
-    except Exception:
-        pass
+        result = fn(conn)
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+        if after_commit is not None:
+            after_commit()
+
+def normalize_skill(skill):
+    """Case-folded, trimmed skill token as stored in task_skills/user_skills"""
+    return skill.strip().casefold()
+
+
+def _skill_tokens(skills):
+    return sorted({normalize_skill(s) for s in skills or [] if isinstance(s, str)} - {''})
+
+
+class SkillIndex:
+    """In-memory inverted index of skill token -> task ids.
+
+    Loaded lazily from task_skills and topped up incrementally: task skills
+    are written only when tasks are created, so reading rows with a task id
+    above the last one seen keeps the index current (also across processes).
+    """
+
+    def __init__(self):
+        self._tasks_by_skill = {}
+        self._max_task_id = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self, conn):
+        # Caller holds self._lock
+        latest = conn.execute('SELECT MAX(task_id) FROM task_skills').fetchone()[0] or 0
+        if latest <= self._max_task_id:
+            return
+        rows = conn.execute(
+            'SELECT task_id, skill FROM task_skills WHERE task_id > ?',
+            (self._max_task_id,)
+        ).fetchall()
+        for task_id, skill in rows:
+            self._tasks_by_skill.setdefault(skill, set()).add(task_id)
+        self._max_task_id = max(self._max_task_id, latest)
+
+    def task_ids(self, conn, tokens):
+        """Ids of tasks having any of the given (normalized) skill tokens"""
+        # Refresh and union under one lock: a concurrent refresh adds to these sets
+        with self._lock:
+            self._refresh(conn)
+            result = set()
+            for token in tokens:
+                result |= self._tasks_by_skill.get(token, set())
+        return result
+
+
+skill_index = SkillIndex() if SKILL_INDEX else None
+
+
+# Keyset pagination and field projection for list queries
+MAX_PAGE_SIZE = 100
+
+
+class Page:
+    """Keyset page request (newest first). The query helper fills in next_cursor."""
+
+    def __init__(self, limit, cursor=None):
+        self.limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        self.cursor = cursor
+        self.next_cursor = None
+
+
+def encode_cursor(*values):
+    """Opaque cursor for the sort key of the last row on a page"""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
     try:
-        cursor.execute('ALTER TABLE users ADD COLUMN squads_led INTEGER DEFAULT 0')
-    except Exception:
-        pass
-    
-    # Task applications table - stores who applied for what tasks
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS task_applications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_id INTEGER,
-            user_id INTEGER,
-            applicant_name TEXT,
-            applicant_email TEXT,
-            application_message TEXT,
-            status TEXT DEFAULT 'pending',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (task_id) REFERENCES tasks (id),
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-
-    # Learning plans table - stores user's saved learning plans
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS learning_plans (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            title TEXT NOT NULL,
-            plan_data TEXT NOT NULL,
-            inputs TEXT NOT NULL,
-            is_active BOOLEAN DEFAULT TRUE,
-            progress TEXT DEFAULT '{}',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-
-    # Environment templates - pre-saved development environments
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS env_templates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            category TEXT NOT NULL, -- e.g., software, hardware, logistics
-            tier TEXT NOT NULL,     -- low, medium, high
-            runtime TEXT NOT NULL,  -- e.g., python3.11, node18
-            deps TEXT NOT NULL,     -- JSON array
-            scaffold TEXT NOT NULL, -- JSON map path->content
-            eval_config TEXT NOT NULL, -- JSON, e.g., {command}
-            ui_config TEXT DEFAULT '{}', -- JSON for frontend hints
-            version TEXT DEFAULT '1.0.0',
-            status TEXT DEFAULT 'active',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    conn.commit()
-    
-    # Seed software templates if table is empty
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def _select_list(columns, fields, required=()):
+    """SELECT list for the requested output fields (None = every column).
+
+    ``columns`` maps output name -> SQL expression; ``required`` names are
+    always included because pagination depends on them.
+    """
+    if fields is None:
+        names = list(columns)
+    else:
+        unknown = [f for f in fields if f not in columns]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        names = list(dict.fromkeys(list(required) + list(fields)))
+    return ', '.join(
+        columns[name] if columns[name] == name or columns[name].endswith(f'.{name}')
+        else f'{columns[name]} AS {name}'
+        for name in names
+    )
+
+
+def _paged_fetch(conn, query, params, sort_columns, cursor_keys, page=None):
+    """Run ``query`` newest-first on ``sort_columns``, one keyset page at a time.
+
+    ``query`` must end with its WHERE clause. ``cursor_keys`` are the output
+    names of the sort columns, used to build page.next_cursor.
+    """
+    params = list(params)
+    if page is not None and page.cursor:
+        values = decode_cursor(page.cursor)
+        if len(values) != len(sort_columns):
+            raise ValueError('Invalid cursor')
+        query += f" AND ({', '.join(sort_columns)}) < ({', '.join('?' * len(sort_columns))})"
+        params.extend(values)
+    query += ' ORDER BY ' + ', '.join(f'{col} DESC' for col in sort_columns)
+    if page is not None:
+        query += ' LIMIT ?'
+        params.append(page.limit + 1)
+    rows = conn.execute(query, params).fetchall()
+    if page is not None and len(rows) > page.limit:
+        rows = rows[:page.limit]
+        page.next_cursor = encode_cursor(*(rows[-1][key] for key in cursor_keys))
+    return rows
+
+
+def _task_dict(row):
+    task_dict = dict(row)
+    if 'skills' in task_dict:
+        task_dict['skills'] = json.loads(task_dict['skills'])
+    return task_dict
+
+
+TASK_COLUMNS = {name: f't.{name}' for name in (
+    'id', 'project_id', 'title', 'description', 'difficulty', 'estimated_hours',
+    'skills', 'reward_credits', 'status', 'applicants_count', 'created_at'
+)}
+ASSIGNED_TASK_COLUMNS = dict(TASK_COLUMNS, application_status='ta.status',
+                             applied_at='ta.created_at', application_id='ta.id')
+APPLICATION_COLUMNS = {name: f'ta.{name}' for name in (
+    'id', 'task_id', 'user_id', 'applicant_name', 'applicant_email',
+    'application_message', 'status', 'created_at'
+)}
+SENT_APPLICATION_COLUMNS = dict(APPLICATION_COLUMNS, task_title='t.title', task_description='t.description',
+                                reward_credits='t.reward_credits', task_creator='u.username')
+RECEIVED_APPLICATION_COLUMNS = dict(APPLICATION_COLUMNS, task_title='t.title', task_description='t.description',
+                                    applicant_username='u.username')
+
+# The per-user listings behind /api/my-tasks, /api/my-applications and
+# /api/dashboard: output columns, FROM/WHERE with one user_id parameter,
+# newest-first sort columns and the output names used for their cursors.
+USER_SECTIONS = {
+    'assigned': {
+        'columns': ASSIGNED_TASK_COLUMNS,
+        'source': '''FROM tasks t
+                     JOIN task_applications ta ON t.id = ta.task_id
+                     WHERE ta.user_id = ? AND ta.status IN ('accepted', 'pending')''',
+        'sort': ('ta.created_at', 'ta.id'),
+        'cursor': ('applied_at', 'application_id'),
+    },
+    'completed': {
+        'columns': ASSIGNED_TASK_COLUMNS,
+        'source': """FROM tasks t
+                     JOIN task_applications ta ON t.id = ta.task_id
+                     WHERE ta.user_id = ? AND t.status = 'completed'""",
+        'sort': ('t.created_at', 't.id'),
+        'cursor': ('created_at', 'id'),
+    },
+    'created': {
+        'columns': TASK_COLUMNS,
+        'source': '''FROM tasks t
+                     JOIN projects p ON t.project_id = p.id
+                     WHERE p.user_id = ?''',
+        'sort': ('t.created_at', 't.id'),
+        'cursor': ('created_at', 'id'),
+    },
+    'sent': {
+        'columns': SENT_APPLICATION_COLUMNS,
+        'source': '''FROM task_applications ta
+                     JOIN tasks t ON ta.task_id = t.id
+                     JOIN projects p ON t.project_id = p.id
+                     JOIN users u ON p.user_id = u.id
+                     WHERE ta.user_id = ?''',
+        'sort': ('ta.created_at', 'ta.id'),
+        'cursor': ('created_at', 'id'),
+    },
+    'received': {
+        'columns': RECEIVED_APPLICATION_COLUMNS,
+        'source': '''FROM task_applications ta
+                     JOIN tasks t ON ta.task_id = t.id
+                     JOIN projects p ON t.project_id = p.id
+                     JOIN users u ON ta.user_id = u.id
+                     WHERE p.user_id = ?''',
+        'sort': ('ta.created_at', 'ta.id'),
+        'cursor': ('created_at', 'id'),
+    },
+}
+
+
+def _fetch_section(name, user_id, fields=None, page=None):
+    """One USER_SECTIONS listing, with projection and keyset pagination"""
+    section = USER_SECTIONS[name]
+    select = _select_list(section['columns'], fields, required=('id',) + section['cursor'])
+    conn = get_db_connection()
     try:
-        existing = cursor.execute('SELECT COUNT(1) as c FROM env_templates').fetchone()
-        # Row factory may not always be set; support both tuple and Row
-        count = (existing['c'] if isinstance(existing, sqlite3.Row) else existing[0]) if existing else 0
-        if count == 0:
-            templates = (
-                EnvTemplateDB.default_software_templates()
-                + EnvTemplateDB.default_hardware_templates()
-                + EnvTemplateDB.default_logistics_templates()
-            )
-            for tpl in templates:
-                cursor.execute(
-                    '''INSERT INTO env_templates
-                       (name, category, tier, runtime, deps, scaffold, eval_config, ui_config, version, status)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                    (
-                        tpl['name'], tpl['category'], tpl['tier'], tpl['runtime'],
-                        json.dumps(tpl['deps']), json.dumps(tpl['scaffold']),
-                        json.dumps(tpl['eval_config']), json.dumps(tpl.get('ui_config', {})),
-                        tpl.get('version', '1.0.0'), tpl.get('status', 'active')
-                    )
-                )
-            conn.commit()
-            print('Seeded default environment templates: software, hardware, logistics')
-    except Exception as e:
-        print(f"Template seeding skipped due to error: {e}")
+        rows = _paged_fetch(conn, f"SELECT {select} {section['source']}", (user_id,),
+                            section['sort'], section['cursor'], page)
     finally:
         conn.close()
-        print("Database initialized successfully!")
+    return [_task_dict(row) for row in rows]
 
-    # Seed mock users for demo if not present
-    try:
-        UserDB.seed_mock_users(20)
-    except Exception as e:
-        print(f"Mock user seeding skipped: {e}")
 
-def get_db_connection():
-    """Get a database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+PLAN_COLUMNS = {name: name for name in (
+    'id', 'user_id', 'title', 'plan_data', 'inputs', 'is_active', 'progress', 'created_at', 'updated_at'
+)}
 
 # Database helper functions
 class ProjectDB:
     @staticmethod
     def create_project(title, description, user_id=None):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO projects (title, description, user_id) VALUES (?, ?, ?)',
-            (title, description, user_id)
-        )
-        project_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return project_id
+        def write(conn):
+            cursor = conn.execute(
+                'INSERT INTO projects (title, description, user_id) VALUES (?, ?, ?)',
+                (title, description, user_id)
+            )
+            return cursor.lastrowid
+        return run_write(write)
     
     @staticmethod
     def get_project(project_id):
@@ -229,15 +737,12 @@ class ProjectDB:
 class QuestionDB:
     @staticmethod
     def add_questions(project_id, questions):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        for i, question in enumerate(questions):
-            cursor.execute(
+        def write(conn):
+            conn.executemany(
                 'INSERT INTO questions (project_id, question_text, question_order) VALUES (?, ?, ?)',
-                (project_id, question, i + 1)
+                [(project_id, question, i + 1) for i, question in enumerate(questions)]
             )
-        conn.commit()
-        conn.close()
+        run_write(write)
     
     @staticmethod
     def get_questions(project_id):
@@ -252,14 +757,12 @@ class QuestionDB:
 class AnswerDB:
     @staticmethod
     def add_answer(project_id, question_id, answer_text):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO answers (project_id, question_id, answer_text) VALUES (?, ?, ?)',
-            (project_id, question_id, answer_text)
-        )
-        conn.commit()
-        conn.close()
+        def write(conn):
+            conn.execute(
+                'INSERT INTO answers (project_id, question_id, answer_text) VALUES (?, ?, ?)',
+                (project_id, question_id, answer_text)
+            )
+        run_write(write)
     
     @staticmethod
     def get_answers(project_id):
@@ -278,22 +781,26 @@ class AnswerDB:
 class TaskDB:
     @staticmethod
     def create_tasks(project_id, tasks):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        task_ids = []
-        for task in tasks:
-            cursor.execute(
-                '''INSERT INTO tasks 
-                   (project_id, title, description, difficulty, estimated_hours, skills, reward_credits) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                (project_id, task['title'], task['description'], 
-                 task['difficulty'], task['estimated_hours'], 
-                 json.dumps(task['skills']), task.get('reward_credits', 100))
-            )
-            task_ids.append(cursor.lastrowid)
-        conn.commit()
-        conn.close()
-        return task_ids
+        def write(conn):
+            cursor = conn.cursor()
+            task_ids = []
+            for task in tasks:
+                cursor.execute(
+                    '''INSERT INTO tasks 
+                       (project_id, title, description, difficulty, estimated_hours, skills, reward_credits) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                    (project_id, task['title'], task['description'], 
+                     task['difficulty'], task['estimated_hours'], 
+                     json.dumps(task['skills']), task.get('reward_credits', 100))
+                )
+                task_id = cursor.lastrowid
+                task_ids.append(task_id)
+                cursor.executemany(
+                    'INSERT OR IGNORE INTO task_skills (task_id, skill) VALUES (?, ?)',
+                    [(task_id, token) for token in _skill_tokens(task['skills'])]
+                )
+            return task_ids
+        return run_write(write)
     
     @staticmethod
     def get_all_tasks():
@@ -324,12 +831,44 @@ class TaskDB:
         return None
 
     @staticmethod
-    def get_filtered_tasks(difficulty=None, skills=None, min_credits=None, max_credits=None):
+    def get_tasks(task_ids):
+        """Fetch several tasks in one query, in the order of ``task_ids``"""
+        if not task_ids:
+            return []
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(
+                'SELECT * FROM tasks WHERE id IN (SELECT value FROM json_each(?))',
+                (json.dumps(list(task_ids)),)
+            ).fetchall()
+        finally:
+            conn.close()
+        by_id = {row['id']: _task_dict(row) for row in rows}
+        return [by_id[task_id] for task_id in task_ids if task_id in by_id]
+
+    @staticmethod
+    def get_filtered_tasks(difficulty=None, skills=None, min_credits=None, max_credits=None,
+                           fields=None, page=None):
+        """Available tasks, newest first. ``fields`` projects columns; ``page`` paginates."""
+        select = _select_list(TASK_COLUMNS, fields, required=('id', 'created_at'))
         conn = get_db_connection()
         
-        query = 'SELECT * FROM tasks WHERE status = "available"'
+        query = f'SELECT {select} FROM tasks t WHERE status = "available"'
         params = []
         
+        # Skill filter: match any requested skill via the normalized task_skills table
+        tokens = _skill_tokens(skills)
+        if tokens and skill_index is not None:
+            task_ids = skill_index.task_ids(conn, tokens)
+            if not task_ids:
+                conn.close()
+                return []
+            query += ' AND id IN (SELECT value FROM json_each(?))'
+            params.append(json.dumps(sorted(task_ids)))
+        elif tokens:
+            query += f' AND id IN (SELECT task_id FROM task_skills WHERE skill IN ({", ".join("?" * len(tokens))}))'
+            params.extend(tokens)
+        
         if difficulty:
             query += ' AND difficulty = ?'
             params.append(difficulty)
@@ -342,49 +881,33 @@ class TaskDB:
             query += ' AND reward_credits <= ?'
             params.append(max_credits)
         
-        query += ' ORDER BY created_at DESC'
-        
-        tasks = conn.execute(query, params).fetchall()
-        conn.close()
-        
-        # Parse skills JSON and filter by skills if specified
-        result = []
-        for task in tasks:
-            task_dict = dict(task)
-            task_dict['skills'] = json.loads(task_dict['skills'])
-            
-            # Filter by skills if specified
-            if skills:
-                task_skills_lower = [skill.lower() for skill in task_dict['skills']]
-                filter_skills_lower = [skill.lower().strip() for skill in skills]
-                if any(skill in task_skills_lower for skill in filter_skills_lower):
-                    result.append(task_dict)
-            else:
-                result.append(task_dict)
+        try:
+            tasks = _paged_fetch(conn, query, params, ('t.created_at', 't.id'), ('created_at', 'id'), page)
+        finally:
+            conn.close()
         
-        return result
+        # Parse skills JSON
+        return [_task_dict(task) for task in tasks]
 
     @staticmethod
     def create_application(task_id, user_id, applicant_name, applicant_email, application_message):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            '''INSERT INTO task_applications 
-               (task_id, user_id, applicant_name, applicant_email, application_message) 
-               VALUES (?, ?, ?, ?, ?)''',
-            (task_id, user_id, applicant_name, applicant_email, application_message)
-        )
-        application_id = cursor.lastrowid
-        
-        # Update applicants count
-        cursor.execute(
-            'UPDATE tasks SET applicants_count = applicants_count + 1 WHERE id = ?',
-            (task_id,)
-        )
-        
-        conn.commit()
-        conn.close()
-        return application_id
+        def write(conn):
+            cursor = conn.cursor()
+            cursor.execute(
+                '''INSERT INTO task_applications 
+                   (task_id, user_id, applicant_name, applicant_email, application_message) 
+                   VALUES (?, ?, ?, ?, ?)''',
+                (task_id, user_id, applicant_name, applicant_email, application_message)
+            )
+            application_id = cursor.lastrowid
+            
+            # Update applicants count
+            cursor.execute(
+                'UPDATE tasks SET applicants_count = applicants_count + 1 WHERE id = ?',
+                (task_id,)
+            )
+            return application_id
+        return run_write(write)
 
     @staticmethod
     def get_user_application(task_id, user_id):
@@ -397,70 +920,23 @@ class TaskDB:
         return dict(application) if application else None
 
     @staticmethod
-    def get_user_assigned_tasks(user_id):
-        conn = get_db_connection()
-        tasks = conn.execute(
-            '''SELECT t.*, ta.status as application_status, ta.created_at as applied_at
-               FROM tasks t 
-               JOIN task_applications ta ON t.id = ta.task_id 
-               WHERE ta.user_id = ? AND ta.status IN ('accepted', 'pending')
-               ORDER BY ta.created_at DESC''',
-            (user_id,)
-        ).fetchall()
-        conn.close()
-        
-        result = []
-        for task in tasks:
-            task_dict = dict(task)
-            task_dict['skills'] = json.loads(task_dict['skills'])
-            result.append(task_dict)
-        return result
+    def get_user_assigned_tasks(user_id, fields=None, page=None):
+        return _fetch_section('assigned', user_id, fields, page)
 
     @staticmethod
-    def get_user_completed_tasks(user_id):
-        conn = get_db_connection()
-        tasks = conn.execute(
-            '''SELECT t.*, ta.status as application_status, ta.created_at as applied_at
-               FROM tasks t 
-               JOIN task_applications ta ON t.id = ta.task_id 
-               WHERE ta.user_id = ? AND t.status = 'completed'
-               ORDER BY t.created_at DESC''',
-            (user_id,)
-        ).fetchall()
-        conn.close()
-        
-        result = []
-        for task in tasks:
-            task_dict = dict(task)
-            task_dict['skills'] = json.loads(task_dict['skills'])
-            result.append(task_dict)
-        return result
+    def get_user_completed_tasks(user_id, fields=None, page=None):
+        return _fetch_section('completed', user_id, fields, page)
 
     @staticmethod
-    def get_user_created_tasks(user_id):
-        conn = get_db_connection()
-        tasks = conn.execute(
-            '''SELECT t.* FROM tasks t 
-               JOIN projects p ON t.project_id = p.id 
-               WHERE p.user_id = ?
-               ORDER BY t.created_at DESC''',
-            (user_id,)
-        ).fetchall()
-        conn.close()
-        
-        result = []
-        for task in tasks:
-            task_dict = dict(task)
-            task_dict['skills'] = json.loads(task_dict['skills'])
-            result.append(task_dict)
-        return result
+    def get_user_created_tasks(user_id, fields=None, page=None):
+        return _fetch_section('created', user_id, fields, page)
 
     @staticmethod
     def user_can_update_task(task_id, user_id):
         conn = get_db_connection()
         # Check if user has applied for this task and it's assigned to them
         application = conn.execute(
-            'SELECT * FROM task_applications WHERE task_id = ? AND user_id = ? AND status = "accepted"',
+            'SELECT 1 FROM task_applications WHERE task_id = ? AND user_id = ? AND status = "accepted"',
             (task_id, user_id)
         ).fetchone()
         conn.close()
@@ -468,57 +944,22 @@ class TaskDB:
 
     @staticmethod
     def update_task_status(task_id, new_status):
-        conn = get_db_connection()
-        conn.execute(
-            'UPDATE tasks SET status = ? WHERE id = ?',
-            (new_status, task_id)
-        )
-        conn.commit()
-        conn.close()
+        def write(conn):
+            conn.execute(
+                'UPDATE tasks SET status = ? WHERE id = ?',
+                (new_status, task_id)
+            )
+        run_write(write)
 
     @staticmethod
-    def get_user_sent_applications(user_id):
+    def get_user_sent_applications(user_id, fields=None, page=None):
         """Get applications sent by a specific user"""
-        conn = get_db_connection()
-        applications = conn.execute(
-            '''SELECT ta.*, t.title as task_title, t.description as task_description, 
-                      t.reward_credits, u.username as task_creator
-               FROM task_applications ta 
-               JOIN tasks t ON ta.task_id = t.id 
-               JOIN projects p ON t.project_id = p.id
-               JOIN users u ON p.user_id = u.id
-               WHERE ta.user_id = ? 
-               ORDER BY ta.created_at DESC''',
-            (user_id,)
-        ).fetchall()
-        conn.close()
-        
-        result = []
-        for app in applications:
-            result.append(dict(app))
-        return result
+        return _fetch_section('sent', user_id, fields, page)
 
     @staticmethod
-    def get_user_received_applications(user_id):
+    def get_user_received_applications(user_id, fields=None, page=None):
         """Get applications received for tasks created by a specific user"""
-        conn = get_db_connection()
-        applications = conn.execute(
-            '''SELECT ta.*, t.title as task_title, t.description as task_description, 
-                      u.username as applicant_username
-               FROM task_applications ta 
-               JOIN tasks t ON ta.task_id = t.id 
-               JOIN projects p ON t.project_id = p.id
-               JOIN users u ON ta.user_id = u.id
-               WHERE p.user_id = ? 
-               ORDER BY ta.created_at DESC''',
-            (user_id,)
-        ).fetchall()
-        conn.close()
-        
-        result = []
-        for app in applications:
-            result.append(dict(app))
-        return result
+        return _fetch_section('received', user_id, fields, page)
 
     @staticmethod
     def get_application(application_id):
@@ -534,59 +975,132 @@ class TaskDB:
     @staticmethod
     def update_application_status(application_id, new_status):
         """Update the status of an application"""
+        def write(conn):
+            conn.execute(
+                'UPDATE task_applications SET status = ? WHERE id = ?',
+                (new_status, application_id)
+            )
+        run_write(write)
+
+class DashboardDB:
+    @staticmethod
+    def query(names):
+        """One UNION ALL statement over the USER_SECTIONS in ``names``.
+
+        Every branch selects (section, sort_at, sort_id) and then the same
+        column list, with NULL for columns its section lacks. Returns
+        (sql, positions) where positions maps SQL expression -> column index.
+        Rows are unordered; sorting the few rows in Python is cheaper than
+        SQLite sorting every branch of the compound select.
+        """
+        exprs = list(dict.fromkeys(
+            expr for name in names for expr in USER_SECTIONS[name]['columns'].values()))
+        branches = []
+        for name in names:
+            section = USER_SECTIONS[name]
+            own = set(section['columns'].values())
+            select = ', '.join(expr if expr in own else 'NULL' for expr in exprs)
+            sort_at, sort_id = section['sort']
+            branches.append(f"SELECT '{name}', {sort_at}, {sort_id}, {select} {section['source']}")
+        return ' UNION ALL '.join(branches), {expr: 3 + i for i, expr in enumerate(exprs)}
+
+    @staticmethod
+    def get_sections(user_id, names=None):
+        """Full (unpaginated) USER_SECTIONS listings for a user in one round trip.
+
+        Returns {name: rows} shaped and ordered exactly like the per-section
+        TaskDB helpers. A task listed in several sections has its skills
+        parsed once.
+        """
+        names = list(names or USER_SECTIONS)
+        unknown = [name for name in names if name not in USER_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown section(s): {', '.join(unknown)}")
+        sql, positions = DashboardDB.query(names)
         conn = get_db_connection()
+        try:
+            rows = conn.execute(sql, [user_id] * len(names)).fetchall()
+        finally:
+            conn.close()
+        # Newest first, as ORDER BY sort_at DESC, sort_id DESC (NULLs last)
+        rows.sort(key=lambda row: (row[1] or '', row[2]), reverse=True)
+
+        layouts = {name: [(column, positions[expr]) for column, expr in USER_SECTIONS[name]['columns'].items()]
+                   for name in names}
+        result = {name: [] for name in names}
+        skills = {}  # task id -> parsed skills
+        for row in rows:
+            item = {column: row[index] for column, index in layouts[row[0]]}
+            if 'skills' in item:
+                if item['id'] not in skills:
+                    skills[item['id']] = json.loads(item['skills'])
+                item['skills'] = skills[item['id']]
+            result[row[0]].append(item)
+        return result
+
+def _record_score(conn, user_id, missions=0, squads=0, credits=0, baseline=False):
+    """Append a leaderboard score change for user_id (inside the caller's write)"""
+    if baseline or missions or squads or credits:
         conn.execute(
-            'UPDATE task_applications SET status = ? WHERE id = ?',
-            (new_status, application_id)
+            'INSERT INTO score_events (user_id, missions, squads, credits, created_at) VALUES (?, ?, ?, ?, ?)',
+            (user_id, missions, squads, credits, time.time())
         )
-        conn.commit()
-        conn.close()
+
+def _copy_user(user):
+    """Copy of a cached user dict, so callers can't mutate the cached entry"""
+    user = dict(user)
+    if isinstance(user.get('skills'), list):
+        user['skills'] = list(user['skills'])
+    return user
 
 class UserDB:
+    cache = MemoryCache(max_entries=USER_CACHE_SIZE, ttl=USER_CACHE_TTL) if USER_CACHE_TTL > 0 else None
+
+    @staticmethod
+    def invalidate(user_id):
+        """Drop a user from the get_user cache after changing their row"""
+        if UserDB.cache is not None:
+            UserDB.cache.delete(user_id)
+
     @staticmethod
     def hash_password(password):
-        """Hash a password for storing in the database"""
-        salt = secrets.token_hex(16)
-        pwdhash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
-        return salt + pwdhash.hex()
+        """Hash a password for storing in the database (on the password worker pool)"""
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(stored_password, provided_password):
         """Verify a stored password against provided password"""
-        salt = stored_password[:32]
-        stored_hash = stored_password[32:]
-        pwdhash = hashlib.pbkdf2_hmac('sha256', provided_password.encode('utf-8'), salt.encode('utf-8'), 100000)
-        return stored_hash == pwdhash.hex()
+        return password_hasher.verify(stored_password, provided_password)
     
     @staticmethod
     def create_user(username, email, password, full_name=None):
         """Create a new user account"""
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         # Check if username or email already exists
-        existing = cursor.execute(
+        existing = conn.execute(
             'SELECT id FROM users WHERE username = ? OR email = ?',
             (username, email)
         ).fetchone()
+        conn.close()
         
         if existing:
-            conn.close()
             return None, "Username or email already exists"
         
         password_hash = UserDB.hash_password(password)
         
-        try:
-            cursor.execute(
+        def write(conn):
+            cursor = conn.execute(
                 'INSERT INTO users (username, email, password_hash, full_name) VALUES (?, ?, ?, ?)',
                 (username, email, password_hash, full_name)
             )
-            user_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            return user_id, None
+            # Zero baseline so new users appear on the all-time leaderboard
+            _record_score(conn, cursor.lastrowid, baseline=True)
+            return cursor.lastrowid
+        
+        try:
+            return run_write(write), None
         except sqlite3.IntegrityError as e:
-            conn.close()
             return None, str(e)
     
     @staticmethod
@@ -600,6 +1114,9 @@ class UserDB:
         conn.close()
         
         if user and UserDB.verify_password(user['password_hash'], password):
+            if password_hasher.needs_rehash(user['password_hash']):
+                # Legacy format or outdated cost: store a fresh hash now that we know the password
+                UserDB.set_password_hash(user['id'], UserDB.hash_password(password))
             # Update last login
             UserDB.update_last_login(user['id'])
             user_dict = dict(user)
@@ -610,7 +1127,12 @@ class UserDB:
     
     @staticmethod
     def get_user(user_id):
-        """Get user by ID"""
+        """Get user by ID (served from the short-TTL user cache when possible)"""
+        if UserDB.cache is not None:
+            cached = UserDB.cache.get(user_id)
+            if cached is not None:
+                return _copy_user(cached)
+
         conn = get_db_connection()
         user = conn.execute(
             'SELECT * FROM users WHERE id = ?', (user_id,)
@@ -622,6 +1144,8 @@ class UserDB:
             del user_dict['password_hash']  # Don't return password hash
             if user_dict['skills']:
                 user_dict['skills'] = json.loads(user_dict['skills'])
+            if UserDB.cache is not None:
+                UserDB.cache.set(user_id, _copy_user(user_dict))
             return user_dict
         return None
     
@@ -642,23 +1166,27 @@ class UserDB:
             return user_dict
         return None
     
+    @staticmethod
+    def set_password_hash(user_id, password_hash):
+        def write(conn):
+            conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_id))
+        run_write(write, wait=False, after_commit=lambda: UserDB.invalidate(user_id))
+
     @staticmethod
     def update_last_login(user_id):
         """Update user's last login timestamp"""
-        conn = get_db_connection()
-        conn.execute(
-            'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?',
-            (user_id,)
-        )
-        conn.commit()
-        conn.close()
+        def write(conn):
+            conn.execute(
+                'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?',
+                (user_id,)
+            )
+        # Login doesn't need to wait for this; the writer commits it with the next batch.
+        # Invalidating before the commit would let a concurrent get_user cache the old row.
+        run_write(write, wait=False, after_commit=lambda: UserDB.invalidate(user_id))
     
     @staticmethod
     def update_user_profile(user_id, full_name=None, bio=None, skills=None, avatar_url=None):
         """Update user profile information"""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         updates = []
         values = []
         
@@ -684,15 +1212,20 @@ class UserDB:
         if updates:
             values.append(user_id)
             query = f"UPDATE users SET {', '.join(updates)} WHERE id = ?"
-            cursor.execute(query, values)
-            conn.commit()
-        
-        conn.close()
+            def write(conn):
+                conn.execute(query, values)
+                if skills is not None:
+                    # Keep the normalized user_skills rows in step with the JSON column
+                    conn.execute('DELETE FROM user_skills WHERE user_id = ?', (user_id,))
+                    conn.executemany(
+                        'INSERT INTO user_skills (user_id, skill) VALUES (?, ?)',
+                        [(user_id, token) for token in _skill_tokens(skills)]
+                    )
+            run_write(write)
+            UserDB.invalidate(user_id)
 
     @staticmethod
     def update_user_extra(user_id, status=None, missions_completed=None, squads_led=None):
-        conn = get_db_connection()
-        cursor = conn.cursor()
         updates = []
         values = []
         if status is not None:
@@ -706,35 +1239,50 @@ class UserDB:
             values.append(int(squads_led))
         if updates:
             values.append(user_id)
-            cursor.execute(f"UPDATE users SET {', '.join(updates)} WHERE id = ?", values)
-            conn.commit()
-        conn.close()
+            query = f"UPDATE users SET {', '.join(updates)} WHERE id = ?"
+            def write(conn):
+                before = conn.execute(
+                    'SELECT COALESCE(missions_completed, 0), COALESCE(squads_led, 0) FROM users WHERE id = ?',
+                    (user_id,)
+                ).fetchone()
+                conn.execute(query, values)
+                if before:
+                    _record_score(
+                        conn, user_id,
+                        missions=int(missions_completed) - before[0] if missions_completed is not None else 0,
+                        squads=int(squads_led) - before[1] if squads_led is not None else 0
+                    )
+            run_write(write)
+            UserDB.invalidate(user_id)
 
     @staticmethod
-    def leaderboard(limit=50):
+    def get_public_users(user_ids):
+        """Public profile fields for the given ids, as {id: user}"""
+        if not user_ids:
+            return {}
         conn = get_db_connection()
         rows = conn.execute(
             '''SELECT id, username, full_name, avatar_url, credits, status,
                       COALESCE(missions_completed,0) AS missions_completed,
                       COALESCE(squads_led,0) AS squads_led,
                       created_at
-               FROM users
-               ORDER BY missions_completed DESC, squads_led DESC, credits DESC, created_at ASC
-               LIMIT ?''', (limit,)
+               FROM users WHERE id IN (SELECT value FROM json_each(?))''',
+            (json.dumps(list(user_ids)),)
         ).fetchall()
         conn.close()
-        return [dict(r) for r in rows]
+        return {row['id']: dict(row) for row in rows}
 
     @staticmethod
     def add_credits(user_id, credits):
         """Add credits to user account"""
-        conn = get_db_connection()
-        conn.execute(
-            'UPDATE users SET credits = credits + ? WHERE id = ?',
-            (credits, user_id)
-        )
-        conn.commit()
-        conn.close()
+        def write(conn):
+            conn.execute(
+                'UPDATE users SET credits = credits + ? WHERE id = ?',
+                (credits, user_id)
+            )
+            _record_score(conn, user_id, credits=credits)
+        run_write(write)
+        UserDB.invalidate(user_id)
 
     @staticmethod
     def seed_mock_users(n=15):
@@ -745,54 +1293,115 @@ class UserDB:
             'Builder Aurora','Builder Titan','Builder Aster','Builder Zenith','Builder Polaris',
             'Builder Kepler','Builder Sirius','Builder Rigel','Builder Bellatrix','Builder Procyon'
         ]
-        for i in range(min(n, len(names))):
-            username = f"builder{i+1}"
-            email = f"{username}@example.com"
-            full_name = names[i]
-            user_id, err = UserDB.create_user(username, email, "password123", full_name)
-            if user_id:
-                # Set status and lightweight metrics
-                missions = random.randint(0, 3)
-                squads = random.randint(0, 1)
-                UserDB.update_user_extra(user_id, status='Builder', missions_completed=missions, squads_led=squads)
-                # Give a small amount of credits to diversify ordering
-                UserDB.add_credits(user_id, random.choice([25, 50, 75, 100]))
-            else:
-                # Ignore if already exists
+        wanted = [(f"builder{i+1}", names[i]) for i in range(min(n, len(names)))]
+        conn = get_db_connection()
+        existing = {row['username'] for row in conn.execute(
+            'SELECT username FROM users WHERE username IN (SELECT value FROM json_each(?))',
+            (json.dumps([username for username, _ in wanted]),)
+        ).fetchall()}
+        conn.close()
+
+        rows = []
+        for username, full_name in wanted:
+            if username in existing:
                 continue
+            # Lightweight status, metrics and credits to diversify leaderboard ordering
+            rows.append((
+                username, f"{username}@example.com", UserDB.hash_password("password123"), full_name,
+                'Builder', random.randint(0, 3), random.randint(0, 1), random.choice([25, 50, 75, 100])
+            ))
+        if rows:
+            def write(conn):
+                for row in rows:
+                    cursor = conn.execute(
+                        '''INSERT OR IGNORE INTO users
+                           (username, email, password_hash, full_name, status, missions_completed, squads_led, credits)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                        row
+                    )
+                    if cursor.rowcount:
+                        _record_score(conn, cursor.lastrowid, *row[5:], baseline=True)
+            run_write(write)
+        return len(rows)
+
+class ScoreDB:
+    """Reads over the score_events log that backs leaderboard.py"""
 
-class LearningPlanDB:
     @staticmethod
-    def save_plan(user_id, title, plan_data, inputs):
-        """Save a learning plan for a user"""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            '''INSERT INTO learning_plans (user_id, title, plan_data, inputs) 
-               VALUES (?, ?, ?, ?)''',
-            (user_id, title, json.dumps(plan_data), json.dumps(inputs))
+    def totals(window_starts=()):
+        """Per-user score sums over all events and over each window start, read
+        in one statement so they agree with the returned newest event id.
+
+        Returns ({user_id: [all-time sums, sums per window...]}, last_id); sums
+        are (missions, squads, credits), or None for no events in that window.
+        """
+        window_sums = ''.join(
+            ''', SUM(CASE WHEN created_at >= ? THEN missions ELSE 0 END),
+                 SUM(CASE WHEN created_at >= ? THEN squads ELSE 0 END),
+                 SUM(CASE WHEN created_at >= ? THEN credits ELSE 0 END),
+                 SUM(created_at >= ?)'''
+            for _ in window_starts
         )
-        plan_id = cursor.lastrowid
-        conn.commit()
+        conn = get_db_connection()
+        rows = conn.execute(
+            f'''SELECT user_id, (SELECT MAX(id) FROM score_events), SUM(missions), SUM(squads), SUM(credits)
+                       {window_sums}
+                FROM score_events GROUP BY user_id''',
+            [start for start in window_starts for _ in range(4)]
+        ).fetchall()
         conn.close()
-        return plan_id
+        totals = {}
+        for row in rows:
+            sums = [tuple(row[2:5])]
+            for i in range(len(window_starts)):
+                missions, squads, credits, events = row[5 + 4 * i:9 + 4 * i]
+                sums.append((missions, squads, credits) if events else None)
+            totals[row[0]] = sums
+        return totals, (rows[0][1] if rows else 0)
 
     @staticmethod
-    def get_user_plans(user_id):
-        """Get all learning plans for a user"""
+    def events_after(event_id):
         conn = get_db_connection()
-        plans = conn.execute(
-            'SELECT * FROM learning_plans WHERE user_id = ? ORDER BY created_at DESC',
-            (user_id,)
+        rows = conn.execute(
+            'SELECT id, user_id, missions, squads, credits, created_at FROM score_events WHERE id > ? ORDER BY id',
+            (event_id,)
         ).fetchall()
         conn.close()
+        return [tuple(row) for row in rows]
+
+class LearningPlanDB:
+    @staticmethod
+    def save_plan(user_id, title, plan_data, inputs):
+        """Save a learning plan for a user"""
+        def write(conn):
+            cursor = conn.execute(
+                '''INSERT INTO learning_plans (user_id, title, plan_data, inputs) 
+                   VALUES (?, ?, ?, ?)''',
+                (user_id, title, json.dumps(plan_data), json.dumps(inputs))
+            )
+            return cursor.lastrowid
+        return run_write(write)
+
+    @staticmethod
+    def get_user_plans(user_id, fields=None, page=None):
+        """Get all learning plans for a user"""
+        select = _select_list(PLAN_COLUMNS, fields, required=('id', 'created_at'))
+        conn = get_db_connection()
+        try:
+            plans = _paged_fetch(
+                conn,
+                f'SELECT {select} FROM learning_plans WHERE user_id = ?',
+                (user_id,), ('created_at', 'id'), ('created_at', 'id'), page
+            )
+        finally:
+            conn.close()
         
         result = []
         for plan in plans:
             plan_dict = dict(plan)
-            plan_dict['plan_data'] = json.loads(plan_dict['plan_data'])
-            plan_dict['inputs'] = json.loads(plan_dict['inputs'])
-            plan_dict['progress'] = json.loads(plan_dict['progress'])
+            for key in ('plan_data', 'inputs', 'progress'):
+                if key in plan_dict:
+                    plan_dict[key] = json.loads(plan_dict[key])
             result.append(plan_dict)
         return result
 
@@ -817,189 +1426,160 @@ class LearningPlanDB:
     @staticmethod
     def update_progress(plan_id, progress_data):
         """Update progress for a learning plan"""
-        conn = get_db_connection()
-        conn.execute(
-            'UPDATE learning_plans SET progress = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-            (json.dumps(progress_data), plan_id)
-        )
-        conn.commit()
-        conn.close()
+        def write(conn):
+            conn.execute(
+                'UPDATE learning_plans SET progress = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                (json.dumps(progress_data), plan_id)
+            )
+        run_write(write)
 
     @staticmethod
     def delete_plan(plan_id, user_id):
         """Delete a learning plan (only by owner)"""
+        def write(conn):
+            conn.execute(
+                'DELETE FROM learning_plans WHERE id = ? AND user_id = ?',
+                (plan_id, user_id)
+            )
+        run_write(write)
+
+class JobDB:
+    """Storage for the background job queue (jobs.py runs the workers)"""
+
+    @staticmethod
+    def enqueue(kind, payload, idempotency_key=None, max_attempts=3, user_id=None, unique_active=False):
+        """Insert a queued job and return its id.
+
+        A job with the same idempotency key is returned instead of creating a
+        duplicate; if that job had permanently failed it is queued again. With
+        ``unique_active`` a queued or running job of the same kind and payload
+        is returned instead, so repeated requests share one run.
+        """
+        def write(conn):
+            if unique_active:
+                active = conn.execute(
+                    '''SELECT id FROM jobs WHERE status IN ('queued', 'running') AND kind = ? AND payload = ?
+                       ORDER BY id LIMIT 1''',
+                    (kind, json.dumps(payload))
+                ).fetchone()
+                if active:
+                    return active['id']
+            cursor = conn.execute(
+                '''INSERT INTO jobs (kind, payload, idempotency_key, max_attempts, run_after, user_id)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (idempotency_key) DO NOTHING''',
+                (kind, json.dumps(payload), idempotency_key, max_attempts, time.time(), user_id)
+            )
+            if cursor.rowcount:
+                return cursor.lastrowid
+            job = conn.execute(
+                'SELECT id, status FROM jobs WHERE idempotency_key = ?', (idempotency_key,)
+            ).fetchone()
+            if job['status'] == 'failed':
+                conn.execute(
+                    '''UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, run_after = ?,
+                       updated_at = CURRENT_TIMESTAMP WHERE id = ?''',
+                    (time.time(), job['id'])
+                )
+            return job['id']
+        return run_write(write)
+
+    @staticmethod
+    def get_job(job_id):
         conn = get_db_connection()
-        conn.execute(
-            'DELETE FROM learning_plans WHERE id = ? AND user_id = ?',
-            (plan_id, user_id)
-        )
-        conn.commit()
+        job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
         conn.close()
+        return JobDB._row_to_dict(job) if job else None
 
-class EnvTemplateDB:
     @staticmethod
-    def default_software_templates():
-        """Return three software templates (low/medium/high abstraction)."""
-        return [
-            {
-                'name': 'Software • Python • Low Abstraction',
-                'category': 'software',
-                'tier': 'low',
-                'runtime': 'python3.11',
-                'deps': ['pytest'],
-                'scaffold': {
-                    'README.md': '# Low abstraction\nImplement from scratch. Run tests with: pytest -q',
-                    'main.py': 'def solve(x):\n    # implement\n    raise NotImplementedError\n',
-                    'test_main.py': 'import pytest\nfrom main import solve\n\n@pytest.mark.parametrize("x", [0,1,2,42])\ndef test_identity(x):\n    assert solve(x) == x\n'
-                },
-                'eval_config': {'command': 'pytest -q'},
-                'ui_config': {'panes': ['editor','tests','logs'], 'default_open': 'editor'},
-                'version': '1.0.0',
-                'status': 'active'
-            },
-            {
-                'name': 'Software • Python • Medium Abstraction',
-                'category': 'software',
-                'tier': 'medium',
-                'runtime': 'python3.11',
-                'deps': ['pytest'],
-                'scaffold': {
-                    'README.md': '# Medium abstraction\nComplete functions per spec. Run tests with: pytest -q',
-                    'main.py': '"""Implement solve to satisfy tests.\nArgs: x (Any) -> Any\n"""\n\ndef solve(x):\n    return x\n',
-                    'test_main.py': 'from main import solve\n\ndef test_identity():\n    assert solve(42) == 42\n\ndef test_string():\n    assert solve("nova") == "nova"\n'
-                },
-                'eval_config': {'command': 'pytest -q'},
-                'ui_config': {'panes': ['editor','tests','logs'], 'default_open': 'tests'},
-                'version': '1.0.0',
-                'status': 'active'
-            },
-            {
-                'name': 'Software • Python • High Abstraction',
-                'category': 'software',
-                'tier': 'high',
-                'runtime': 'python3.11',
-                'deps': ['pytest'],
-                'scaffold': {
-                    'README.md': '# High abstraction\nFollow the checklist and prompts below to implement the solution.\n- Step 1: Read tests\n- Step 2: Sketch solution\n- Step 3: Implement\n- Step 4: Refactor\n- Step 5: Pass tests',
-                    'prompts.md': 'Goal: Implement solve(x) per tests.\nHints: start simple, keep pure, add types later.',
-                    'main.py': 'def solve(x):\n    """Return input unchanged. Replace with task-specific logic."""\n    return x\n',
-                    'test_main.py': 'from main import solve\n\ndef test_sample():\n    assert solve(1) == 1\n'
-                },
-                'eval_config': {'command': 'pytest -q'},
-                'ui_config': {'panes': ['editor','ai','tests','logs'], 'default_open': 'ai'},
-                'version': '1.0.0',
-                'status': 'active'
-            }
-        ]
+    def has_runnable(kinds=None):
+        """Read-only check for a job claim_next would find, so idle polls skip the writer"""
+        kind_filter = 'AND kind IN (SELECT value FROM json_each(?))' if kinds is not None else ''
+        params = (time.time(),) + ((json.dumps(list(kinds)),) if kinds is not None else ())
+        conn = get_db_connection()
+        row = conn.execute(
+            f"SELECT 1 FROM jobs WHERE status = 'queued' AND run_after <= ? {kind_filter} LIMIT 1",
+            params
+        ).fetchone()
+        conn.close()
+        return row is not None
 
     @staticmethod
-    def default_hardware_templates():
-        """Three tiers for hardware-style tasks (simulation-first scaffolds)."""
-        base_readme = (
-            '# Hardware Task\n'
-            'Work with simple digital logic problems using Python for simulation.\n'
-            'Evaluate with: pytest -q\n'
-        )
-        return [
-            {
-                'name': 'Hardware • Digital Logic • Low Abstraction',
-                'category': 'hardware',
-                'tier': 'low',
-                'runtime': 'python3.11',
-                'deps': ['pytest'],
-                'scaffold': {
-                    'README.md': base_readme + '\nImplement primitive gates and a combinational module from spec.',
-                    'logic.py': 'def nand(a,b):\n    raise NotImplementedError\n\n# implement xor using only nand\ndef xor(a,b):\n    raise NotImplementedError\n',
-                    'test_logic.py': 'from logic import nand, xor\n\nimport pytest\n\n@pytest.mark.parametrize("a,b", [(0,0),(0,1),(1,0),(1,1)])\ndef test_nand_truth(a,b):\n    out = nand(a,b)\n    assert out in (0,1)\n    assert out == (0 if (a==1 and b==1) else 1)\n\n@pytest.mark.parametrize("a,b,exp", [(0,0,0),(0,1,1),(1,0,1),(1,1,0)])\ndef test_xor(a,b,exp):\n    assert xor(a,b) == exp\n'
-                },
-                'eval_config': {'command': 'pytest -q'},
-                'ui_config': {'panes': ['editor','tests','logs','ai'], 'default_open': 'tests'}
-            },
-            {
-                'name': 'Hardware • Microcontroller • Medium Abstraction',
-                'category': 'hardware',
-                'tier': 'medium',
-                'runtime': 'python3.11',
-                'deps': ['pytest'],
-                'scaffold': {
-                    'README.md': base_readme + '\nSimulate a simple PWM controller in Python.',
-                    'pwm.py': 'class PWM:\n    def __init__(self, freq_hz: int, duty: float):\n        self.freq_hz = freq_hz\n        self.duty = duty  # 0..1\n\n    def tick(self, t_s: float) -> int:\n        """Return 1 when high else 0 at time t (seconds)."""\n        # TODO: implement using period = 1/freq_hz and duty fraction\n        return 0\n',
-                    'test_pwm.py': 'from pwm import PWM\n\ndef test_pwm_half_duty():\n    p = PWM(100, 0.5)\n    period = 1/100\n    assert p.tick(0.0) in (0,1)\n    highs = sum(p.tick(i*period/10) for i in range(10))\n    assert 3 <= highs <= 7\n'
-                },
-                'eval_config': {'command': 'pytest -q'},
-                'ui_config': {'panes': ['editor','tests','logs','ai'], 'default_open': 'editor'}
-            },
-            {
-                'name': 'Hardware • High Abstraction (Guided)',
-                'category': 'hardware',
-                'tier': 'high',
-                'runtime': 'python3.11',
-                'deps': ['pytest'],
-                'scaffold': {
-                    'README.md': base_readme,
-                    'prompts.md': 'Goal: implement xor via nand; add PWM.tick simulation. Steps: (1) write truth tables, (2) sketch, (3) test-driven.',
-                    'logic.py': 'def nand(a,b):\n    return 0 if (a==1 and b==1) else 1\n\ndef xor(a,b):\n    # Replace with nand-only version if you wish\n    return (a + b) % 2\n',
-                    'test_logic.py': 'from logic import nand, xor\n\nimport pytest\n\n@pytest.mark.parametrize("a,b,exp", [(0,0,0),(0,1,1),(1,0,1),(1,1,0)])\ndef test_xor(a,b,exp):\n    assert xor(a,b) == exp\n'
-                },
-                'eval_config': {'command': 'pytest -q'},
-                'ui_config': {'panes': ['editor','ai','tests','logs'], 'default_open': 'ai'}
-            }
-        ]
+    def claim_next(kinds=None):
+        """Atomically mark the oldest runnable job (of one of ``kinds``) as running and return it"""
+        kind_filter = 'AND kind IN (SELECT value FROM json_each(?))' if kinds is not None else ''
+        params = (time.time(), time.time()) + ((json.dumps(list(kinds)),) if kinds is not None else ())
+        def write(conn):
+            job = conn.execute(
+                f'''UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_at = ?,
+                   updated_at = CURRENT_TIMESTAMP
+                   WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ? {kind_filter}
+                               ORDER BY run_after, id LIMIT 1)
+                   RETURNING *''',
+                params
+            ).fetchall()
+            return JobDB._row_to_dict(job[0]) if job else None
+        return run_write(write)
 
     @staticmethod
-    def default_logistics_templates():
-        """Three tiers for logistics/optimization tasks (LP-style)."""
-        base_readme = (
-            '# Logistics Task\n'
-            'Solve a small optimization/scheduling problem.\n'
-            'Evaluate with: pytest -q\n'
-        )
-        return [
-            {
-                'name': 'Logistics • Routing • Low Abstraction',
-                'category': 'logistics',
-                'tier': 'low',
-                'runtime': 'python3.11',
-                'deps': ['pytest'],
-                'scaffold': {
-                    'README.md': base_readme + '\nImplement a greedy nearest-neighbor route length function.',
-                    'routing.py': 'def route_length(points):\n    """Return total path length visiting points in given order and back to start."""\n    raise NotImplementedError\n\n',
-                    'test_routing.py': 'from routing import route_length\n\nimport math\n\ndef test_triangle():\n    pts = [(0,0),(1,0),(0,1)]\n    total = route_length(pts)\n    assert total == pytest.approx(1 + math.sqrt(2) + 1 + math.sqrt(2))\n'
-                },
-                'eval_config': {'command': 'pytest -q'},
-                'ui_config': {'panes': ['editor','tests','logs','ai'], 'default_open': 'tests'}
-            },
-            {
-                'name': 'Logistics • Simple LP • Medium Abstraction',
-                'category': 'logistics',
-                'tier': 'medium',
-                'runtime': 'python3.11',
-                'deps': ['pytest'],
-                'scaffold': {
-                    'README.md': base_readme + '\nImplement a tiny linear assignment solver stub (no external deps).',
-                    'assign.py': 'def assign(costs):\n    """Given a square cost matrix (list of lists), return a permutation list.\n    Implement a naive search for n<=5."""\n    # TODO\n    return list(range(len(costs)))\n',
-                    'test_assign.py': 'from assign import assign\n\nimport itertools\n\ndef cost_of(costs, perm):\n    return sum(costs[i][perm[i]] for i in range(len(perm)))\n\ndef test_2x2():\n    costs = [[1,5],[5,1]]\n    perm = assign(costs)\n    assert cost_of(costs, perm) == 2\n'
-                },
-                'eval_config': {'command': 'pytest -q'},
-                'ui_config': {'panes': ['editor','tests','logs','ai'], 'default_open': 'editor'}
-            },
-            {
-                'name': 'Logistics • High Abstraction (Guided)',
-                'category': 'logistics',
-                'tier': 'high',
-                'runtime': 'python3.11',
-                'deps': ['pytest'],
-                'scaffold': {
-                    'README.md': base_readme,
-                    'prompts.md': 'Goal: implement route_length(points) and a naive assignment. Steps with checks: (1) write helper distance, (2) sum edges incl. return, (3) brute-force n<=5.',
-                    'routing.py': 'def route_length(points):\n    import math\n    if not points: return 0.0\n    total = 0.0\n    for i in range(len(points)):\n        a = points[i]\n        b = points[(i+1)%len(points)]\n        total += math.dist(a,b)\n    return total\n',
-                    'test_routing.py': 'from routing import route_length\n\ndef test_square():\n    pts = [(0,0),(1,0),(1,1),(0,1)]\n    assert round(route_length(pts),3) == 4.0\n'
-                },
-                'eval_config': {'command': 'pytest -q'},
-                'ui_config': {'panes': ['editor','ai','tests','logs'], 'default_open': 'ai'}
-            }
-        ]
+    def renew(job_ids):
+        """Extend the lease of jobs still running here"""
+        def write(conn):
+            conn.execute(
+                '''UPDATE jobs SET locked_at = ?
+                   WHERE id IN (SELECT value FROM json_each(?)) AND status = 'running' ''',
+                (time.time(), json.dumps(list(job_ids)))
+            )
+        run_write(write)
+
+    @staticmethod
+    def complete(job_id, result):
+        def write(conn):
+            conn.execute(
+                '''UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, locked_at = NULL,
+                   updated_at = CURRENT_TIMESTAMP WHERE id = ?''',
+                (json.dumps(result), job_id)
+            )
+        run_write(write)
+
+    @staticmethod
+    def fail(job_id, error, retry_delay):
+        """Record a failed attempt: requeue after ``retry_delay`` seconds or give up"""
+        def write(conn):
+            conn.execute(
+                '''UPDATE jobs SET
+                       status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                       run_after = ?, error = ?, locked_at = NULL, updated_at = CURRENT_TIMESTAMP
+                   WHERE id = ?''',
+                (time.time() + retry_delay, error, job_id)
+            )
+        run_write(write)
+
+    @staticmethod
+    def requeue_stale(lease_seconds):
+        """Recover jobs whose worker died mid-run (lease expired): the lost run
+        counts as an attempt, so jobs out of attempts fail instead of rerunning"""
+        def write(conn):
+            cursor = conn.execute(
+                '''UPDATE jobs SET
+                       status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                       error = CASE WHEN attempts < max_attempts THEN error
+                                    ELSE 'Worker stopped before the job finished' END,
+                       locked_at = NULL, updated_at = CURRENT_TIMESTAMP
+                   WHERE status = 'running' AND locked_at < ?''',
+                (time.time() - lease_seconds,)
+            )
+            return cursor.rowcount
+        return run_write(write)
 
+    @staticmethod
+    def _row_to_dict(row):
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+class EnvTemplateDB:
     @staticmethod
     def list_templates(category=None):
         conn = get_db_connection()
@@ -1044,5 +1624,105 @@ class EnvTemplateDB:
                 pass
         return d
 
+def capture_hot_queries():
+    """Call every query helper once and return [(caller, sql, params)], one
+    entry per distinct statement, for EXPLAIN checks (migrations.py
+    --check-plans, tests). It writes sample rows, so only run it on a
+    scratch database."""
+    from querylog import EXPLAINABLE, find_caller
+    captured = {}
+
+    def record(sql, params, seconds, rows, error=None):
+        words = sql.split(None, 1)
+        if sql in captured or sql == 'SELECT 1' or not words or words[0].upper() not in EXPLAINABLE:
+            return
+        if isinstance(params, list) and params and isinstance(params[0], (tuple, list, dict)):
+            params = params[0]
+        captured[sql] = (find_caller(), sql, tuple(params))
+
+    add_statement_hook(record)
+    try:
+        username = f'plan-check-{time.time_ns()}'
+        user_id, _ = UserDB.create_user(username, f'{username}@example.com', 'plan-check', 'Plan Check')
+        UserDB.get_public_users([user_id])
+        UserDB.authenticate_user(username, 'plan-check')
+        UserDB.get_user_by_username(username)
+        UserDB.invalidate(user_id)
+        UserDB.get_user(user_id)
+        UserDB.update_user_profile(user_id, bio='', skills=['Python'])
+        UserDB.update_user_extra(user_id, status='active', missions_completed=1, squads_led=1)
+        UserDB.add_credits(user_id, 10)
+        UserDB.set_password_hash(user_id, UserDB.hash_password('plan-check'))
+        UserDB.update_last_login(user_id)
+
+        project_id = ProjectDB.create_project('Plan check', '', user_id)
+        ProjectDB.get_project(project_id)
+        QuestionDB.add_questions(project_id, ['Why?'])
+        question_id = QuestionDB.get_questions(project_id)[0]['id']
+        AnswerDB.add_answer(project_id, question_id, 'Because')
+        AnswerDB.get_answers(project_id)
+
+        task_id = TaskDB.create_tasks(project_id, [{
+            'title': 'Plan check', 'description': '', 'difficulty': 'Beginner',
+            'estimated_hours': 1, 'skills': ['Python', 'SQL'],
+        }])[0]
+        TaskDB.get_all_tasks()
+        TaskDB.get_task(task_id)
+        TaskDB.get_tasks([task_id])
+        TaskDB.get_filtered_tasks('Beginner', ['python', 'sql'], 0, 500)
+        TaskDB.get_filtered_tasks(fields=['id', 'title'], page=Page(10, encode_cursor('9999-12-31', task_id + 1)))
+        conn = get_db_connection()
+        try:
+            SkillIndex().task_ids(conn, ['python'])
+        finally:
+            conn.close()
+        application_id = TaskDB.create_application(task_id, user_id, 'Plan Check', 'plan@example.com', '')
+        TaskDB.get_user_application(task_id, user_id)
+        TaskDB.get_application(application_id)
+        TaskDB.update_application_status(application_id, 'accepted')
+        TaskDB.user_can_update_task(task_id, user_id)
+        TaskDB.update_task_status(task_id, 'completed')
+        for listing in (TaskDB.get_user_assigned_tasks, TaskDB.get_user_completed_tasks,
+                        TaskDB.get_user_created_tasks, TaskDB.get_user_sent_applications,
+                        TaskDB.get_user_received_applications):
+            listing(user_id)
+            listing(user_id, page=Page(10, encode_cursor('9999-12-31', 1 << 30)))
+        DashboardDB.get_sections(user_id)
+
+        plan_id = LearningPlanDB.save_plan(user_id, 'Plan check', {}, {})
+        LearningPlanDB.get_user_plans(user_id, page=Page(10))
+        LearningPlanDB.get_plan(plan_id)
+        LearningPlanDB.update_progress(plan_id, {})
+        LearningPlanDB.delete_plan(plan_id, user_id)
+
+        ScoreDB.totals((0,))
+        ScoreDB.events_after(0)
+
+        job_id = JobDB.enqueue('plan_check', {}, username)
+        JobDB.enqueue('plan_check', {}, unique_active=True)
+        JobDB.get_job(job_id)
+        JobDB.claim_next()
+        JobDB.has_runnable()
+        JobDB.has_runnable(['plan_check'])
+        JobDB.claim_next(['plan_check'])
+        JobDB.renew([job_id])
+        JobDB.fail(job_id, 'plan check', 0)
+        JobDB.complete(job_id, {})
+        JobDB.requeue_stale(60)
+
+        EnvTemplateDB.list_templates('software')
+        EnvTemplateDB.list_templates()
+        EnvTemplateDB.get_template(1)
+        EnvTemplateDB.get_by_category_and_tier('software', 'medium')
+        # Flush the fire-and-forget writes queued above
+        run_write(lambda conn: None)
+    finally:
+        _statement_hooks.remove(record)
+    return list(captured.values())
+
 if __name__ == "__main__":
+    # python database.py [--seed-users N]: migrate, then optionally add demo users
+    import sys
     init_database()
+    if '--seed-users' in sys.argv:
+        seed_demo_data(int(sys.argv[sys.argv.index('--seed-users') + 1]))
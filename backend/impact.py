@@ -0,0 +1,168 @@
+"""Test-impact selection for workspace re-evaluation.
+
+Static import analysis (ast) maps every test file in a submission to the
+workspace modules it imports, directly or transitively. Given the previous
+submission's file hashes and per-test outcomes for the same (task, user),
+only the tests whose dependencies changed are re-run and the other outcomes
+are carried over. Changes the analysis cannot see through (conftest.py,
+non-Python files, deleted files, syntax errors) fall back to a full run.
+"""
+import ast
+import hashlib
+import os
+
+from cache import MemoryCache, make_key
+from sandbox import safe_path
+
+IMPACT_STATE_ENTRIES = int(os.getenv('IMPACT_STATE_ENTRIES', '4096'))
+
+
+def is_test_file(path):
+    name = os.path.basename(path)
+    return name.endswith('.py') and (name.startswith('test_') or name.endswith('_test.py'))
+
+
+def module_name(path):
+    """'pkg/mod.py' -> 'pkg.mod', 'pkg/__init__.py' -> 'pkg'"""
+    name = path[:-3].replace('/', '.')
+    return name[:-len('.__init__')] if name.endswith('.__init__') else name
+
+
+def imported_modules(source, module):
+    """Dotted names imported by ``source``; relative imports resolved against ``module``"""
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                parent = module.split('.')[:-node.level]
+                base = '.'.join(parent + ([base] if base else []))
+            if base:
+                names.add(base)
+            # "from pkg import mod" may import a submodule
+            names.update(f'{base}.{alias.name}' if base else alias.name for alias in node.names)
+    return names
+
+
+def dependencies(files):
+    """{path: set of workspace .py paths it imports, transitively}"""
+    modules = {module_name(path): path for path in files if path.endswith('.py')}
+    direct = {}
+    for module, path in modules.items():
+        deps = set()
+        for name in imported_modules(files[path], module):
+            # Importing a.b.c also executes a/__init__.py and a/b/__init__.py
+            parts = name.split('.')
+            for i in range(1, len(parts) + 1):
+                target = modules.get('.'.join(parts[:i]))
+                if target and target != path:
+                    deps.add(target)
+        direct[path] = deps
+
+    closure = {}
+    for path in direct:
+        seen, stack = set(), list(direct[path])
+        while stack:
+            dep = stack.pop()
+            if dep not in seen:
+                seen.add(dep)
+                stack.extend(direct.get(dep, ()))
+        closure[path] = seen
+    return closure
+
+
+class Selection:
+    """Which test files to run for one evaluation"""
+
+    def __init__(self, mode, run=(), skipped=(), carried=None, reason=None):
+        self.mode = mode  # 'full', 'affected' or 'none' (nothing to run)
+        self.run = list(run)
+        self.skipped = list(skipped)
+        self.carried = carried or {}
+        self.reason = reason
+
+    @property
+    def args(self):
+        """Extra pytest arguments selecting the affected test files"""
+        return self.run if self.mode == 'affected' else []
+
+    def as_dict(self):
+        return {'mode': self.mode, 'ran': self.run, 'skipped': self.skipped, 'reason': self.reason}
+
+
+class ImpactTracker:
+    """Remembers the last evaluated submission per (task, user)"""
+
+    def __init__(self, max_entries=IMPACT_STATE_ENTRIES):
+        self.state = MemoryCache(max_entries=max_entries)
+
+    @staticmethod
+    def _hashes(files):
+        return {safe_path(path): hashlib.sha256(content.encode('utf-8')).hexdigest()
+                for path, content in files.items()}
+
+    def plan(self, task_id, user_id, files, full=False):
+        files = {safe_path(path): content for path, content in files.items()}
+        previous = self.state.get(make_key(task_id, user_id))
+        if full:
+            return Selection('full', reason='full run requested')
+        if previous is None or not previous.get('tests'):
+            return Selection('full', reason='no previous run')
+
+        hashes = self._hashes(files)
+        changed = {path for path in set(hashes) | set(previous['hashes'])
+                   if hashes.get(path) != previous['hashes'].get(path)}
+        if not changed:
+            return Selection('full', reason='unchanged')
+        if any(path not in hashes or not path.endswith('.py') or os.path.basename(path) == 'conftest.py'
+               for path in changed):
+            return Selection('full', reason='change outside import analysis')
+        try:
+            deps = dependencies(files)
+        except SyntaxError:
+            return Selection('full', reason='syntax error')
+
+        run, skipped, carried = [], [], {}
+        for test in sorted(path for path in files if is_test_file(path)):
+            outcomes = {nodeid: outcome for nodeid, outcome in previous['tests'].items()
+                        if nodeid.split('::')[0] == test}
+            if test in changed or deps[test] & changed or not outcomes:
+                run.append(test)
+            else:
+                skipped.append(test)
+                carried.update(outcomes)
+        return Selection('affected' if run else 'none', run, skipped, carried)
+
+    def merge(self, selection, result):
+        """Fold carried-over outcomes into a run's result"""
+        if selection.mode == 'full':
+            return dict(result, selection=selection.as_dict())
+        tests = dict(selection.carried)
+        tests.update(result.get('tests') or {})
+        carried_ok = all(outcome != 'failed' for outcome in selection.carried.values())
+        exit_code = result['exit_code']
+        if exit_code == 0 and not carried_ok:
+            exit_code = 1
+        return dict(result, success=exit_code == 0, exit_code=exit_code, tests=tests,
+                    selection=selection.as_dict())
+
+    def skipped_result(self, selection):
+        """Result for a change that affects no tests: everything is carried over"""
+        ok = all(outcome != 'failed' for outcome in selection.carried.values())
+        stdout = (f"No tests affected by this change; {len(selection.carried)} result(s) "
+                  f"carried over from the previous run\n")
+        return self.merge(selection, {'success': ok, 'exit_code': 0 if ok else 1, 'stdout': stdout,
+                                      'stderr': '', 'tests': {}, 'cached': False})
+
+    def record(self, task_id, user_id, files, result):
+        """Remember this submission, or forget it if the run has no usable outcomes"""
+        key = make_key(task_id, user_id)
+        if result.get('tests') is None or result['exit_code'] in (124, 130):
+            self.state.delete(key)
+            return
+        self.state.set(key, {'hashes': self._hashes(files), 'tests': result['tests']})
+
+
+impact_tracker = ImpactTracker()
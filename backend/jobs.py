@@ -0,0 +1,138 @@
+"""Persistent background job queue backed by the SQLite ``jobs`` table.
+
+Handlers are registered per job kind and run on worker threads in every
+process that calls start(); claiming a job is a single atomic UPDATE, so
+several processes can share one database. Failed attempts are retried with
+exponential backoff up to the job's max_attempts. Running jobs hold a lease
+(locked_at) that their process renews; a job whose lease lapsed is recovered
+on the next start(), counting the lost run as an attempt.
+
+    @job_queue.handler('generate_tasks')
+    def run(payload): ...                 # returns a JSON-serializable result
+
+    job = job_queue.enqueue('generate_tasks', {'project_id': 1}, idempotency_key='...')
+"""
+import os
+import threading
+import traceback
+
+from database import JobDB
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # 0 = enqueue only, no workers here
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_BASE = float(os.getenv('JOB_RETRY_BASE', '2.0'))  # seconds, doubled per attempt
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '600'))
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.handlers = {}
+        self.local_kinds = set()
+        self._threads = []
+        self._running = set()  # ids of jobs this process is running, kept leased
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def handler(self, kind, run_here=True):
+        """Decorator registering the function that runs jobs of ``kind``.
+        With run_here=False this process can enqueue such jobs but leaves
+        them for workers in other processes."""
+        def register(fn):
+            self.handlers[kind] = fn
+            if run_here:
+                self.local_kinds.add(kind)
+            else:
+                self.local_kinds.discard(kind)
+            return fn
+        return register
+
+    def enqueue(self, kind, payload, idempotency_key=None, max_attempts=JOB_MAX_ATTEMPTS, user_id=None,
+                unique_active=False):
+        """Queue a job (or find the existing one for the key) and return it.
+        ``user_id`` records who may read the job's status and result;
+        ``unique_active`` returns a queued or running job with the same payload."""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = JobDB.enqueue(kind, payload, idempotency_key, max_attempts, user_id, unique_active)
+        self._wake.set()
+        return JobDB.get_job(job_id)
+
+    def get(self, job_id):
+        return JobDB.get_job(job_id)
+
+    def start(self):
+        """Recover stale jobs and start the worker threads (idempotent)"""
+        with self._lock:
+            if self._threads or self.workers <= 0 or not self.local_kinds:
+                return
+            recovered = JobDB.requeue_stale(JOB_LEASE_SECONDS)
+            if recovered:
+                print(f"Recovered {recovered} stale job(s)")
+            self._stopping.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'nova-job-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name='nova-job-lease', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _heartbeat(self):
+        """Renew the lease of running jobs so a restarting sibling process
+        doesn't take them for abandoned and run them again"""
+        while not self._stopping.wait(JOB_LEASE_SECONDS / 3):
+            with self._lock:
+                running = sorted(self._running)
+            if running:
+                try:
+                    JobDB.renew(running)
+                except Exception as e:
+                    print(f"Job lease renewal error: {e}")
+
+    def _work(self):
+        kinds = sorted(self.local_kinds)
+        while not self._stopping.is_set():
+            try:
+                # Look before claiming: an idle poll stays a read instead of an
+                # empty transaction on the single writer
+                job = JobDB.claim_next(kinds) if JobDB.has_runnable(kinds) else None
+            except Exception as e:
+                print(f"Job claim error: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        handler = self.handlers.get(job['kind'])
+        with self._lock:
+            self._running.add(job['id'])
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind: {job['kind']}")
+            result = handler(job['payload'])
+        except Exception as e:
+            print(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed: {e}")
+            traceback.print_exc()
+            JobDB.fail(job['id'], str(e), JOB_RETRY_BASE * 2 ** (job['attempts'] - 1))
+        else:
+            JobDB.complete(job['id'], result)
+        finally:
+            with self._lock:
+                self._running.discard(job['id'])
+
+
+job_queue = JobQueue()
@@ -0,0 +1,154 @@
+"""In-memory ranked leaderboards kept current from the score_events log.
+
+Every change to missions_completed, squads_led or credits appends a row to
+score_events (see UserDB). Each process folds the log into sorted arrays of
+rank keys: the all-time board plus calendar windows (ISO week and month,
+UTC). Top-N pages, a user's rank and the users around it are bisect lookups.
+
+Boards are built from SQLite on first use and then topped up by reading only
+events newer than the last one seen, so writes from other processes show up
+on the next query. A window is rebuilt when its period rolls over.
+"""
+import datetime
+import os
+import threading
+from bisect import bisect_left, insort
+
+from database import ScoreDB, UserDB
+
+LEADERBOARD_MAX_LIMIT = int(os.getenv('LEADERBOARD_MAX_LIMIT', '100'))
+WINDOWS = ('all', 'week', 'month')
+
+
+def window_start(window, now=None):
+    """Unix time at which the current period of ``window`` began (0 for 'all')"""
+    if window == 'all':
+        return 0.0
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == 'week':
+        start = day - datetime.timedelta(days=day.weekday())
+    elif window == 'month':
+        start = day.replace(day=1)
+    else:
+        raise ValueError(f"Unknown leaderboard window: {window}")
+    return start.timestamp()
+
+
+class RankedBoard:
+    """Users ordered by missions, squads led, then credits (all descending);
+    earlier accounts (lower ids) win ties."""
+
+    def __init__(self, start=0.0):
+        self.start = start
+        self._keys = []     # sorted (-missions, -squads, -credits, user_id)
+        self._scores = {}   # user_id -> (missions, squads, credits)
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def _key(user_id, scores):
+        return (-scores[0], -scores[1], -scores[2], user_id)
+
+    def set(self, user_id, scores):
+        old = self._scores.get(user_id)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, self._key(user_id, old))]
+        self._scores[user_id] = scores
+        insort(self._keys, self._key(user_id, scores))
+
+    def add(self, user_id, missions, squads, credits):
+        old = self._scores.get(user_id, (0, 0, 0))
+        self.set(user_id, (old[0] + missions, old[1] + squads, old[2] + credits))
+
+    def _entry(self, index):
+        user_id = self._keys[index][3]
+        missions, squads, credits = self._scores[user_id]
+        return {'rank': index + 1, 'user_id': user_id,
+                'score': {'missions_completed': missions, 'squads_led': squads, 'credits': credits}}
+
+    def page(self, limit, offset=0):
+        return [self._entry(i) for i in range(offset, min(offset + limit, len(self._keys)))]
+
+    def rank(self, user_id):
+        """1-based rank, or None if the user is not on this board"""
+        scores = self._scores.get(user_id)
+        if scores is None:
+            return None
+        return bisect_left(self._keys, self._key(user_id, scores)) + 1
+
+    def around(self, user_id, radius):
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        lo = max(0, rank - 1 - radius)
+        return self.page(rank + radius - lo, lo)
+
+
+class Leaderboard:
+    def __init__(self, windows=WINDOWS):
+        self.windows = windows
+        self.boards = None
+        self._last_event_id = 0
+        self._lock = threading.Lock()
+
+    def _rebuild(self):
+        starts = {window: window_start(window) for window in self.windows}
+        timed = [window for window in self.windows if window != 'all']
+        totals, last_id = ScoreDB.totals([starts[window] for window in timed])
+        boards = {window: RankedBoard(starts[window]) for window in self.windows}
+        for user_id, sums in totals.items():
+            boards['all'].set(user_id, sums[0])
+            for window, window_sums in zip(timed, sums[1:]):
+                if window_sums is not None:
+                    boards[window].set(user_id, window_sums)
+        self.boards = boards
+        self._last_event_id = last_id
+
+    def refresh(self):
+        """Bring every board up to date with the score_events log"""
+        with self._lock:
+            if self.boards is None or any(
+                    board.start != window_start(window) for window, board in self.boards.items()):
+                self._rebuild()
+                return
+            for event_id, user_id, missions, squads, credits, created_at in ScoreDB.events_after(self._last_event_id):
+                for board in self.boards.values():
+                    if created_at >= board.start:
+                        board.add(user_id, missions, squads, credits)
+                self._last_event_id = event_id
+
+    def _board(self, window):
+        if window not in self.windows:
+            raise ValueError(f"Unknown leaderboard window: {window}")
+        self.refresh()
+        return self.boards[window]
+
+    @staticmethod
+    def _with_profiles(entries):
+        """Attach public profile fields to board entries (one query)"""
+        users = UserDB.get_public_users([entry['user_id'] for entry in entries])
+        return [dict(users[entry['user_id']], rank=entry['rank'], score=entry['score'])
+                for entry in entries if entry['user_id'] in users]
+
+    def top(self, limit=50, offset=0, window='all'):
+        limit = max(1, min(int(limit), LEADERBOARD_MAX_LIMIT))
+        board = self._board(window)
+        with self._lock:
+            entries = board.page(limit, max(0, int(offset)))
+            total = len(board)
+        return {'window': window, 'total': total, 'users': self._with_profiles(entries)}
+
+    def me(self, user_id, window='all', radius=5):
+        """A user's rank plus the ``radius`` users on either side of them"""
+        radius = max(0, min(int(radius), LEADERBOARD_MAX_LIMIT // 2))
+        board = self._board(window)
+        with self._lock:
+            rank = board.rank(user_id)
+            entries = board.around(user_id, radius)
+            total = len(board)
+        return {'window': window, 'total': total, 'rank': rank, 'neighbors': self._with_profiles(entries)}
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,190 @@
+"""Process-local metrics in the Prometheus text exposition format.
+
+Counters and histograms are recorded where the work happens (HTTP requests
+in app.py/asgi.py, SQL statements via database.add_statement_hook, LLM calls
+in ai_service.py, sandbox runs in sandbox.py). Gauges that are cheaper to read
+on demand are registered as collectors and evaluated on each scrape of
+/metrics. Metrics are per process; with several workers, scrape each one or
+aggregate in Prometheus. METRICS=0 turns recording into no-ops.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+METRICS = os.getenv('METRICS', '1') == '1'
+
+# Seconds; tuned for API latencies from sub-millisecond SQL up to LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        if not METRICS:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f'{self.name}{_labels(self.label_names, key)} {value}' for key, value in items]
+        return lines
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, seconds, *labels):
+        if not METRICS:
+            return
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += seconds
+            entry[2] += 1
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, key, [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_labels(self.label_names, key, [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, key)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, key)} {count}')
+        return lines
+
+
+class Gauge(Metric):
+    """Value(s) read from ``collect()`` at scrape time: a number, or {label values: number}"""
+    kind = 'gauge'
+
+    def __init__(self, name, help, collect, labels=()):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def render(self):
+        lines = self.header()
+        try:
+            values = self.collect()
+        except Exception as e:
+            print(f"Metrics collector {self.name} failed: {e}")
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines += [f'{self.name}{_labels(self.label_names, key)} {value}' for key, value in sorted(values.items())]
+        return lines
+
+
+REGISTRY = []
+
+
+def render():
+    """All metrics in Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return '\n'.join(lines) + '\n'
+
+
+HTTP_REQUESTS = Counter('nova_http_requests_total', 'HTTP requests by route and status',
+                        ('method', 'route', 'status'))
+HTTP_LATENCY = Histogram('nova_http_request_duration_seconds', 'Time to produce the response (first byte for streams)',
+                         ('method', 'route'))
+SQL_QUERIES = Counter('nova_sql_queries_total', 'SQL statements executed', ('operation',))
+SQL_ERRORS = Counter('nova_sql_errors_total', 'SQL statements that raised', ('operation',))
+SQL_LATENCY = Histogram('nova_sql_query_duration_seconds', 'SQL statement time including row fetches', ('operation',))
+SQL_ROWS = Counter('nova_sql_rows_total', 'Rows returned or changed by SQL statements', ('operation',))
+LLM_REQUESTS = Counter('nova_llm_requests_total', 'LLM completions by outcome (ok, error, cache_hit, fallback)',
+                       ('model', 'outcome'))
+LLM_LATENCY = Histogram('nova_llm_request_duration_seconds', 'LLM completion latency', ('model', 'mode'))
+LLM_TOKENS = Counter('nova_llm_tokens_total', 'LLM tokens used', ('model', 'type'))
+SANDBOX_RUNS = Counter('nova_sandbox_runs_total', 'Workspace evaluations by outcome', ('outcome',))
+SANDBOX_LATENCY = Histogram('nova_sandbox_run_duration_seconds', 'Workspace test run time (cache misses)', ('outcome',))
+
+
+def sql_operation(sql):
+    """First keyword of a statement: SELECT, INSERT, UPDATE, ..."""
+    words = sql.split(None, 1)
+    return words[0].upper() if words else ''
+
+
+def observe_sql(sql, params, seconds, rows, error=None):
+    """Statement hook for database.add_statement_hook"""
+    operation = sql_operation(sql)
+    SQL_QUERIES.inc(operation)
+    SQL_LATENCY.observe(seconds, operation)
+    if error is not None:
+        SQL_ERRORS.inc(operation)
+    elif rows:
+        SQL_ROWS.inc(operation, amount=rows)
+
+
+def observe_request(method, route, status, seconds):
+    HTTP_REQUESTS.inc(method, route, str(status))
+    HTTP_LATENCY.observe(seconds, method, route)
+
+
+def init_app(app):
+    """Time every Flask request by its URL rule and serve GET /metrics"""
+    from flask import Response, g, request
+
+    if not METRICS:
+        return
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            observe_request(request.method, route, response.status_code, time.perf_counter() - started)
+        return response
+
+    @app.get('/metrics')
+    def metrics_endpoint():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,100 @@
+"""Password hashing off the request threads.
+
+PBKDF2 runs on a small process pool so a burst of logins or registrations
+can't stall the web workers. At most PASSWORD_WORKERS + PASSWORD_MAX_QUEUE
+hashes are pending at once; further requests fail fast with PasswordBusy.
+
+Stored format: pbkdf2_sha256$<iterations>$<salt>$<hex digest>. Raising
+PASSWORD_ITERATIONS only affects new hashes: older ones, including the
+legacy "<32 hex salt><hex digest>" format, verify with their own parameters
+and are rehashed on the next successful login (see PasswordHasher.needs_rehash).
+"""
+import atexit
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+PASSWORD_ALGORITHM = 'pbkdf2_sha256'
+PASSWORD_ITERATIONS = int(os.getenv('PASSWORD_ITERATIONS', '100000'))
+PASSWORD_WORKERS = int(os.getenv('PASSWORD_WORKERS', str(min(2, os.cpu_count() or 1)) if hasattr(os, 'fork') else '0'))
+PASSWORD_MAX_QUEUE = int(os.getenv('PASSWORD_MAX_QUEUE', '32'))  # waiting hashes beyond busy workers
+LEGACY_ITERATIONS = 100000
+
+
+class PasswordBusy(Exception):
+    """Too many password hashes are already pending"""
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations).hex()
+
+
+def parse_hash(stored):
+    """(iterations, salt, hex digest) of a stored hash in either format"""
+    if stored.startswith(PASSWORD_ALGORITHM + '$'):
+        _, iterations, salt, digest = stored.split('$', 3)
+        return int(iterations), salt, digest
+    return LEGACY_ITERATIONS, stored[:32], stored[32:]
+
+
+class PasswordHasher:
+    def __init__(self, workers=PASSWORD_WORKERS, max_queue=PASSWORD_MAX_QUEUE, iterations=PASSWORD_ITERATIONS):
+        self.workers = workers
+        self.iterations = iterations
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers > 0 else None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Fork the worker processes now; call before the app starts its own threads"""
+        if self.workers > 0:
+            self._executor().submit(int).result()
+
+    def stop(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('fork'))
+            return self._pool
+
+    def _derive(self, password, salt, iterations):
+        if self.workers <= 0:
+            return _pbkdf2(password, salt, iterations)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordBusy("Too many password checks in progress")
+        try:
+            return self._executor().submit(_pbkdf2, password, salt, iterations).result()
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool next time and answer inline now
+            self.stop()
+            return _pbkdf2(password, salt, iterations)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        salt = secrets.token_hex(16)
+        digest = self._derive(password, salt, self.iterations)
+        return f"{PASSWORD_ALGORITHM}${self.iterations}${salt}${digest}"
+
+    def verify(self, stored, password):
+        iterations, salt, digest = parse_hash(stored)
+        return hmac.compare_digest(digest, self._derive(password, salt, iterations))
+
+    def needs_rehash(self, stored):
+        """True for legacy hashes and hashes made with a different iteration count"""
+        return not stored.startswith(PASSWORD_ALGORITHM + '$') or parse_hash(stored)[0] != self.iterations
+
+
+password_hasher = PasswordHasher()
+atexit.register(password_hasher.stop)
@@ -0,0 +1,212 @@
+"""On-demand sampling profiler producing flamegraph collapsed stacks.
+
+A background thread samples Python stacks with sys._current_frames() every
+PROFILE_INTERVAL_MS and counts identical stacks. Output is one
+``frame;frame;...;leaf count`` line per stack, as read by flamegraph.pl,
+speedscope and similar tools. Profiles are written to PROFILE_DIR (newest
+PROFILE_KEEP kept).
+
+Two ways to capture, both gated on the PROFILE_KEY shared secret:
+  - one request: send ``X-Profile-Key: <key>`` with it; only the thread
+    serving it is sampled and the response carries ``X-Profile-File``
+  - a time window: POST /api/debug/profile?seconds=N samples every thread
+    in the process for N seconds
+
+GET /api/debug/profiles lists captures, GET /api/debug/profiles/<name>
+returns one. The same key guards app.py's /api/debug/queries. Without PROFILE_KEY nothing is registered, so requests pay no
+profiling cost at all. Async routes served by asgi.py are not covered by the
+per-request header; use a window for those.
+"""
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_KEY = os.getenv('PROFILE_KEY', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '2'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+PROFILE_MAX_SECONDS = 300
+
+
+def key_matches(value):
+    """True when ``value`` is the configured PROFILE_KEY (never when none is set)"""
+    return bool(PROFILE_KEY) and hmac.compare_digest(value.encode(), PROFILE_KEY.encode())
+
+
+def frame_name(code):
+    return f"{os.path.basename(code.co_filename).rsplit('.', 1)[0]}:{code.co_qualname}"
+
+
+def collapse(frame, root=None):
+    """Semicolon-joined stack from the outermost frame to ``frame``"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    if root:
+        names.append(root)
+    return ';'.join(reversed(names))
+
+
+class Sampler:
+    """Counts the stacks of ``thread_ids`` (all other threads when None)"""
+
+    def __init__(self, thread_ids=None, interval=PROFILE_INTERVAL_MS / 1000):
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self.started = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            # Label stacks with the thread name when sampling the whole process
+            names = {} if self.thread_ids else {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id == own or (self.thread_ids and thread_id not in self.thread_ids):
+                    continue
+                self.counts[collapse(frame, names.get(thread_id))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+
+class ProfileStore:
+    def __init__(self, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def save(self, sampler, label):
+        """Write a capture; returns its file name"""
+        label = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'profile'
+        now = time.time()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + f'{now % 1:.3f}'[1:]
+        name = f"{stamp}-{label[:60]}.collapsed"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write(sampler.collapsed())
+            for old in self.names()[self.keep:]:
+                os.remove(os.path.join(self.directory, old))
+        return name
+
+    def names(self):
+        """Capture file names, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((n for n in os.listdir(self.directory) if n.endswith('.collapsed')), reverse=True)
+
+    def path(self, name):
+        """Path of a capture, or None for unknown names (no path traversal)"""
+        return os.path.join(self.directory, name) if name in self.names() else None
+
+
+class WindowProfiler:
+    """At most one process-wide capture at a time"""
+
+    def __init__(self, store):
+        self.store = store
+        self.current = None
+        self._lock = threading.Lock()
+
+    def start(self, seconds, label='window'):
+        with self._lock:
+            if self.current is not None:
+                return False
+            self.current = Sampler().start()
+        timer = threading.Timer(seconds, self._finish, (label,))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _finish(self, label):
+        sampler = self.current.stop()
+        try:
+            name = self.store.save(sampler, label)
+            print(f"Profile window saved: {name} ({sampler.samples} samples)")
+        finally:
+            with self._lock:
+                self.current = None
+
+
+profile_store = ProfileStore()
+window_profiler = WindowProfiler(profile_store)
+
+
+def init_app(app):
+    """Register the per-request header hooks and /api/debug/profile* routes"""
+    if not PROFILE_KEY:
+        return
+    from flask import Response, g, jsonify, request
+
+    def authorized():
+        return key_matches(request.headers.get('X-Profile-Key', ''))
+
+    @app.before_request
+    def _start_profile():
+        if 'X-Profile-Key' in request.headers and not request.path.startswith('/api/debug/') and authorized():
+            g.profile_sampler = Sampler({threading.get_ident()}).start()
+
+    @app.after_request
+    def _save_profile(response):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is not None:
+            sampler.stop()
+            route = request.url_rule.rule if request.url_rule is not None else request.path
+            response.headers['X-Profile-File'] = profile_store.save(sampler, f'{request.method}-{route}')
+            response.headers['X-Profile-Samples'] = str(sampler.samples)
+        return response
+
+    @app.post('/api/debug/profile')
+    def start_profile_window():
+        """Sample every thread for ?seconds=N (default 10)"""
+        if not authorized():
+            return jsonify(error="Invalid profile key"), 403
+        try:
+            seconds = float(request.args.get('seconds', 10))
+        except ValueError:
+            return jsonify(error="seconds must be a number"), 400
+        seconds = max(0.1, min(seconds, PROFILE_MAX_SECONDS))
+        if not window_profiler.start(seconds):
+            return jsonify(error="A profile window is already running"), 409
+        return jsonify(message="Profiling started", seconds=seconds), 202
+
+    @app.get('/api/debug/profiles')
+    def list_profiles():
+        if not authorized():
+            return jsonify(error="Invalid profile key"), 403
+        return jsonify(profiles=profile_store.names(), running=window_profiler.current is not None)
+
+    @app.get('/api/debug/profiles/<name>')
+    def get_profile(name):
+        if not authorized():
+            return jsonify(error="Invalid profile key"), 403
+        path = profile_store.path(name)
+        if path is None:
+            return jsonify(error="Profile not found"), 404
+        with open(path) as f:
+            return Response(f.read(), mimetype='text/plain')
@@ -0,0 +1,175 @@
+"""Opt-in SQL tracer and slow-query log.
+
+With QUERY_TRACE=1 every statement run on a database.py connection is
+attributed to the ``*DB`` method that issued it (UserDB.get_user,
+TaskDB.get_user_received_applications, ...) and aggregated per method and
+statement: calls, total/max time and rows. Statements slower than
+QUERY_SLOW_MS are appended to a rotating JSON-lines log (QUERY_LOG_PATH) with
+their parameter shape and EXPLAIN QUERY PLAN, so full table scans show up
+before they hurt production. Parameter values are never logged.
+
+When QUERY_TRACE is off nothing is installed and connections run untraced.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+QUERY_TRACE = os.getenv('QUERY_TRACE', '0') == '1'
+QUERY_SLOW_MS = float(os.getenv('QUERY_SLOW_MS', '50'))
+QUERY_LOG_PATH = os.getenv('QUERY_LOG_PATH', 'slow_queries.log')
+QUERY_LOG_MAX_BYTES = int(os.getenv('QUERY_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+QUERY_LOG_BACKUPS = int(os.getenv('QUERY_LOG_BACKUPS', '5'))
+
+# Statements worth explaining; transaction control and PRAGMAs have no plan
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+PLAN_CACHE_SIZE = 512
+MAX_TRACKED_STATEMENTS = 5000
+
+# Frames of the tracing machinery itself (database._notify, TracedCursor, ...)
+_TRACING_NAMES = ('_notify', 'TracedCursor.', 'TracedConnection.', 'QueryTracer.', 'find_caller',
+                  'capture_hot_queries.')
+
+
+def param_shape(params):
+    """Types (or names) of bound parameters, never their values"""
+    if isinstance(params, dict):
+        return {name: type(value).__name__ for name, value in params.items()}
+    if isinstance(params, list) and params and isinstance(params[0], (tuple, list, dict)):
+        return {'rows': len(params), 'each': param_shape(params[0])}
+    return [type(value).__name__ for value in params]
+
+
+def find_caller():
+    """The ``*DB`` method on the stack, else the innermost frame outside the tracing code"""
+    frame = sys._getframe(1)
+    outside = None
+    while frame is not None:
+        code = frame.f_code
+        qualname = code.co_qualname
+        owner = qualname.split('.', 1)[0]
+        if owner.endswith('DB') and owner != 'DB' and '.' in qualname:
+            return qualname.split('.<locals>', 1)[0]
+        if outside is None and not qualname.startswith(_TRACING_NAMES):
+            outside = f"{os.path.basename(code.co_filename)[:-3]}.{qualname}:{frame.f_lineno}"
+        frame = frame.f_back
+    return outside or 'unknown'
+
+
+class QueryTracer:
+    def __init__(self, slow_ms=QUERY_SLOW_MS, log_path=QUERY_LOG_PATH,
+                 max_bytes=QUERY_LOG_MAX_BYTES, backups=QUERY_LOG_BACKUPS):
+        self.slow_seconds = slow_ms / 1000
+        self.log_path = log_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.database_path = None
+        self._stats = {}   # (caller, sql) -> [calls, total seconds, max seconds, rows, errors]
+        self._plans = {}   # sql -> plan lines
+        self._lock = threading.Lock()
+        self._log = None
+
+    def install(self, database_path=None):
+        """Register the tracer as a statement hook on database.py connections"""
+        import database
+        self.database_path = database_path or database.DATABASE_PATH
+        database.add_statement_hook(self)
+        print(f"Query tracing on: statements over {self.slow_seconds * 1000:g} ms go to {self.log_path}")
+
+    def __call__(self, sql, params, seconds, rows, error=None):
+        caller = find_caller()
+        with self._lock:
+            entry = self._stats.get((caller, sql))
+            if entry is None:
+                # Statements built with inlined values would grow this without bound
+                if len(self._stats) >= MAX_TRACKED_STATEMENTS:
+                    entry = [0, 0.0, 0.0, 0, 0]
+                else:
+                    entry = self._stats[(caller, sql)] = [0, 0.0, 0.0, 0, 0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] += rows or 0
+            entry[4] += error is not None
+        if seconds >= self.slow_seconds:
+            self.log_slow(caller, sql, params, seconds, rows, error)
+
+    def _logger(self):
+        if self._log is None:
+            with self._lock:
+                if self._log is None:
+                    handler = logging.handlers.RotatingFileHandler(
+                        self.log_path, maxBytes=self.max_bytes, backupCount=self.backups)
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    log = logging.getLogger('nova.slow_queries')
+                    log.setLevel(logging.INFO)
+                    log.propagate = False
+                    log.addHandler(handler)
+                    self._log = log
+        return self._log
+
+    def log_slow(self, caller, sql, params, seconds, rows, error=None):
+        record = {
+            'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'ms': round(seconds * 1000, 3),
+            'caller': caller,
+            'rows': rows,
+            'params': param_shape(params),
+            'sql': ' '.join(sql.split()),
+            'plan': self.explain(sql, params),
+        }
+        if error is not None:
+            record['error'] = str(error)
+        self._logger().info(json.dumps(record))
+
+    def explain(self, sql, params):
+        """EXPLAIN QUERY PLAN details for ``sql``, cached per statement"""
+        words = sql.split(None, 1)
+        if not words or words[0].upper() not in EXPLAINABLE:
+            return None
+        plan = self._plans.get(sql)
+        if plan is not None:
+            return plan
+        if isinstance(params, list) and params and isinstance(params[0], (tuple, list, dict)):
+            params = params[0]
+        # A separate plain connection: untraced, and outside the caller's transaction
+        try:
+            conn = sqlite3.connect(f'file:{self.database_path}?mode=ro', uri=True)
+            try:
+                plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            return [f'unavailable: {e}']
+        with self._lock:
+            if len(self._plans) >= PLAN_CACHE_SIZE:
+                self._plans.clear()
+            self._plans[sql] = plan
+        return plan
+
+    def summary(self, limit=20):
+        """Slowest traced statements by total time"""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [{
+            'caller': caller,
+            'sql': ' '.join(sql.split()),
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'avg_ms': round(total * 1000 / calls, 3),
+            'max_ms': round(longest * 1000, 3),
+            'rows': rows,
+            'errors': errors,
+        } for (caller, sql), (calls, total, longest, rows, errors) in items]
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._plans = {}
+
+
+query_tracer = QueryTracer()
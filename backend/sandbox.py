@@ -0,0 +1,689 @@
+"""Warm worker pool for running workspace test suites.
+
+Starting a fresh ``python -m pytest`` per evaluation spends most of its time
+on interpreter startup and importing pytest. Instead, SANDBOX_WORKERS
+long-lived "zygote" processes (``python sandbox.py --zygote``) import pytest
+once and wait for jobs on stdin. For each job a zygote writes the files to a
+fresh temp directory and forks a child that runs pytest there, so every
+evaluation still gets a clean module state and its own working directory.
+
+Jobs, streamed events and results are newline-delimited JSON; a
+``{"cancel": true}`` line kills the running job. When fork() is unavailable, the
+pool is disabled (SANDBOX_WORKERS=0) or a zygote dies, evaluate() falls back
+to the one-subprocess-per-run path.
+"""
+import atexit
+import contextlib
+import json
+import os
+import queue
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import cache_from_env, make_key
+from metrics import SANDBOX_RUNS, SANDBOX_LATENCY
+
+SANDBOX_WORKERS = int(os.getenv('SANDBOX_WORKERS', '2' if hasattr(os, 'fork') else '0'))
+SANDBOX_MAX_QUEUE = int(os.getenv('SANDBOX_MAX_QUEUE', '16'))  # waiting evaluations beyond busy workers
+SANDBOX_TIMEOUT = float(os.getenv('SANDBOX_TIMEOUT', '25'))  # seconds per test run
+SANDBOX_BATCH_MAX = int(os.getenv('SANDBOX_BATCH_MAX', '50'))  # submissions per batch request
+SANDBOX_BASE_SLOTS = 8  # shared base file sets kept materialized per zygote
+PYTEST_ARGS = ['-q']
+
+# Results of identical submissions: EVAL_CACHE=memory|sqlite|off, EVAL_CACHE_TTL, _SIZE, _PATH
+EVAL_CACHE_DEFAULT_TTL = 7 * 24 * 60 * 60
+
+
+class SandboxBusy(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+def safe_path(relpath):
+    """Workspace-relative path with leading slashes and '..' removed"""
+    return relpath.strip().lstrip('/').replace('..', '')
+
+
+def write_files(root, files):
+    """Materialize {relpath: content} under root, refusing paths that escape it"""
+    for relpath, content in files.items():
+        abspath = os.path.join(root, safe_path(relpath))
+        os.makedirs(os.path.dirname(abspath), exist_ok=True)
+        with open(abspath, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+
+_OUTCOME_RANK = {'passed': 0, 'skipped': 1, 'failed': 2}
+
+
+def worse_outcome(a, b):
+    """Combine phase outcomes of one test: failed > skipped > passed"""
+    if a is None:
+        return b
+    return a if _OUTCOME_RANK.get(a, 2) >= _OUTCOME_RANK.get(b, 2) else b
+
+
+def timeout_result(stdout, stderr, timeout):
+    return {'success': False, 'exit_code': 124, 'stdout': stdout,
+            'stderr': stderr + f"\nTIMEOUT: evaluation exceeded {timeout:g}s"}
+
+
+def run_subprocess(files, timeout=SANDBOX_TIMEOUT, args=()):
+    """Cold path: write files to a temp dir and run ``python -m pytest -q`` there.
+    Per-test outcomes are not reported (``tests`` is None)."""
+    tempdir = tempfile.mkdtemp(prefix="nova_ws_")
+    try:
+        write_files(tempdir, files)
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "pytest", *PYTEST_ARGS, *args],
+            cwd=tempdir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            stdout, stderr = proc.communicate()
+            return timeout_result(stdout, stderr, timeout)
+        return {'success': proc.returncode == 0, 'exit_code': proc.returncode,
+                'stdout': stdout, 'stderr': stderr, 'tests': None}
+    finally:
+        shutil.rmtree(tempdir, ignore_errors=True)
+
+
+# --- Zygote side -------------------------------------------------------------
+
+def _warm_up():
+    """Import pytest and run one throwaway session so plugins, assertion
+    rewriting and entry points are loaded before any child is forked"""
+    import io
+    import pytest
+    warmdir = tempfile.mkdtemp(prefix="nova_warm_")
+    try:
+        write_files(warmdir, {'test_nova_warmup.py': 'def test_warmup():\n    assert True\n'})
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            pytest.main(['-q', '-p', 'no:cacheprovider', warmdir])
+    finally:
+        shutil.rmtree(warmdir, ignore_errors=True)
+
+
+class _LineReader:
+    """Unbuffered-at-the-edges line reader over a raw fd, safe to mix with select()"""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.buf = b''
+
+    def pending(self):
+        return b'\n' in self.buf
+
+    def readline(self, timeout=None):
+        """Next line without its newline; '' on EOF. Raises TimeoutError."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while b'\n' not in self.buf:
+            if deadline is not None:
+                ready, _, _ = select.select([self.fd], [], [], max(0, deadline - time.monotonic()))
+                if not ready:
+                    raise TimeoutError("sandbox worker did not respond")
+            chunk = os.read(self.fd, 65536)
+            if not chunk:
+                line, self.buf = self.buf, b''
+                return line.decode('utf-8', 'replace')
+            self.buf += chunk
+        line, self.buf = self.buf.split(b'\n', 1)
+        return line.decode('utf-8', 'replace')
+
+
+class _EventReporter:
+    """pytest plugin loaded in the forked child: one JSON line per test outcome"""
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def _write(self, event):
+        os.write(self.fd, (json.dumps(event) + '\n').encode('utf-8'))
+
+    def pytest_collection_finish(self, session):
+        self._write({'type': 'collected', 'count': len(session.items)})
+
+    def pytest_runtest_logreport(self, report):
+        # Every call-phase result, plus setup/teardown errors and skips
+        if report.when == 'call' or report.outcome != 'passed':
+            self._write({'type': 'test', 'nodeid': report.nodeid, 'when': report.when,
+                         'outcome': report.outcome, 'duration': round(report.duration, 4)})
+
+
+def _parse_event(text):
+    """A reporter event, rebuilt from its known fields; None for anything else.
+    Test code can write to the events pipe too, so lines are not trusted."""
+    try:
+        event = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(event, dict):
+        return None
+    if event.get('type') == 'collected' and isinstance(event.get('count'), int):
+        return {'type': 'collected', 'count': event['count']}
+    if event.get('type') == 'test' and isinstance(event.get('nodeid'), str) and event.get('outcome') in _OUTCOME_RANK:
+        duration = event.get('duration')
+        return {'type': 'test', 'nodeid': event['nodeid'], 'when': str(event.get('when')),
+                'outcome': event['outcome'], 'duration': duration if isinstance(duration, (int, float)) else None}
+    return None
+
+
+_bases = {}  # base hash -> directory holding the materialized shared files
+
+
+def _base_dir(job):
+    """Directory with the job's shared base files, written on first use.
+    The pool decides which bases a zygote keeps and tells it what to drop."""
+    for key in job.get('drop_bases', []):
+        shutil.rmtree(_bases.pop(key, ''), ignore_errors=True)
+    key = job['base']
+    if key not in _bases:
+        path = tempfile.mkdtemp(prefix="nova_base_")
+        write_files(path, job['base_files'])
+        _bases[key] = path
+    return _bases[key]
+
+
+def _run_forked(job, emit=None, control=None):
+    """Run one job in a forked child and return the result dict, including
+    ``tests``: {nodeid: passed|failed|skipped}.
+
+    With ``emit`` set, output lines and per-test events are passed to it as
+    they happen. A "cancel" line on ``control`` (a _LineReader) kills the run.
+    """
+    timeout = job.get('timeout', SANDBOX_TIMEOUT)
+    workdir = tempfile.mkdtemp(prefix="nova_ws_")
+    try:
+        if job.get('base'):
+            shutil.copytree(_base_dir(job), workdir, dirs_exist_ok=True)
+        write_files(workdir, job['files'])
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        ev_r, ev_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+                os.dup2(out_w, 1)
+                os.dup2(err_w, 2)
+                # Nothing but stdio and the events pipe: test code must not reach the
+                # zygote's protocol channel or the pipes' read ends
+                os.closerange(3, ev_w)
+                os.closerange(ev_w + 1, os.sysconf('SC_OPEN_MAX'))
+                if emit:
+                    sys.stdout.reconfigure(line_buffering=True)
+                os.chdir(workdir)
+                sys.path.insert(0, workdir)  # as ``python -m pytest`` does for cwd
+                import pytest
+                code = int(pytest.main(PYTEST_ARGS + job.get('args', []), plugins=[_EventReporter(ev_w)]))
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+
+        for fd in (out_w, err_w, ev_w):
+            os.close(fd)
+        streams = {out_r: 'stdout', err_r: 'stderr', ev_r: 'event'}
+        chunks = {out_r: [], err_r: []}
+        partial = {fd: b'' for fd in streams}
+        tests = {}
+
+        def emit_line(fd, raw):
+            text = raw.decode('utf-8', 'replace')
+            if streams[fd] != 'event':
+                if emit:
+                    emit({'type': streams[fd], 'line': text})
+                return
+            event = _parse_event(text)
+            if event is None:
+                return
+            if event['type'] == 'test':
+                tests[event['nodeid']] = worse_outcome(tests.get(event['nodeid']), event['outcome'])
+            if emit:
+                emit(event)
+
+        deadline = time.monotonic() + timeout
+        stopped = None  # 'timeout' or 'cancelled'
+        open_fds = set(streams)
+        while open_fds:
+            if stopped is None and time.monotonic() > deadline:
+                stopped = 'timeout'
+                os.kill(pid, signal.SIGKILL)
+                deadline = time.monotonic() + 1  # drain what is left, briefly
+            elif stopped is not None and time.monotonic() > deadline:
+                break
+            watch = list(open_fds)
+            if control is not None and stopped is None:
+                if control.pending():
+                    ready = [control.fd]
+                else:
+                    watch.append(control.fd)
+                    ready, _, _ = select.select(watch, [], [], 0.5)
+            else:
+                ready, _, _ = select.select(watch, [], [], 0.5)
+            for fd in ready:
+                if control is not None and fd == control.fd:
+                    line = control.readline()
+                    if stopped is None and (not line or json.loads(line).get('cancel')):
+                        stopped = 'cancelled'
+                        os.kill(pid, signal.SIGKILL)
+                        deadline = time.monotonic() + 1
+                    continue
+                data = os.read(fd, 65536)
+                if fd in chunks:
+                    chunks[fd].append(data)
+                if not data:
+                    open_fds.discard(fd)
+                    if partial[fd]:
+                        emit_line(fd, partial[fd])
+                    continue
+                if emit or fd == ev_r:
+                    lines = (partial[fd] + data).split(b'\n')
+                    partial[fd] = lines.pop()
+                    for raw in lines:
+                        emit_line(fd, raw)
+        for fd in streams:
+            os.close(fd)
+        _, status = os.waitpid(pid, 0)
+
+        stdout = b''.join(chunks[out_r]).decode('utf-8', 'replace')
+        stderr = b''.join(chunks[err_r]).decode('utf-8', 'replace')
+        if stopped == 'timeout':
+            return timeout_result(stdout, stderr, timeout)
+        if stopped == 'cancelled':
+            return {'success': False, 'exit_code': 130, 'stdout': stdout,
+                    'stderr': stderr + "\nCANCELLED: evaluation stopped by request", 'cancelled': True}
+        exit_code = os.waitstatus_to_exitcode(status)
+        return {'success': exit_code == 0, 'exit_code': exit_code, 'stdout': stdout, 'stderr': stderr,
+                'tests': tests}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _forget_backend():
+    """Drop the backend's modules (cache, metrics, ...) and its directory from
+    the import system, so forked test runs import a workspace's own cache.py
+    exactly as the cold ``python -m pytest`` path would"""
+    backend = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != backend]
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if name != '__main__' and path and os.path.dirname(os.path.abspath(path)) == backend:
+            del sys.modules[name]
+
+
+def zygote_main():
+    # Keep the protocol channel private; stray prints go to stderr
+    channel = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    os.dup2(2, 1)
+    _forget_backend()
+    _warm_up()
+
+    def send(message):
+        channel.write(json.dumps(message) + '\n')
+        channel.flush()
+
+    send({'ready': True})
+    control = _LineReader(0)
+    while True:
+        line = control.readline()
+        if not line:
+            return
+        job = json.loads(line)
+        if 'files' not in job:
+            continue  # a cancel that arrived after its job finished
+        try:
+            result = _run_forked(job, emit=send if job.get('stream') else None, control=control)
+        except Exception as e:
+            result = {'success': False, 'exit_code': 1, 'stdout': '', 'stderr': f"Sandbox error: {e}"}
+        send({'type': 'result', 'result': result})
+    for path in _bases.values():
+        shutil.rmtree(path, ignore_errors=True)
+
+
+# --- Pool side ---------------------------------------------------------------
+
+class _Zygote:
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--zygote'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+        self.reader = _LineReader(self.proc.stdout.fileno())
+        self.ready = False
+        self.bases = OrderedDict()  # base hashes this zygote has materialized, LRU order
+        self._write_lock = threading.Lock()
+
+    def _send(self, message):
+        with self._write_lock:
+            self.proc.stdin.write((json.dumps(message) + '\n').encode('utf-8'))
+            self.proc.stdin.flush()
+
+    def _read(self, timeout):
+        line = self.reader.readline(timeout)
+        if not line:
+            raise EOFError("sandbox worker exited")
+        return json.loads(line)
+
+    def messages(self, files, timeout, stream=False, args=(), base=None):
+        """Send a job now and return an iterator over the zygote's messages,
+        ending with the result. Sending eagerly means a cancel() issued after
+        this returns reaches the zygote behind the job, never ahead of it.
+        ``base`` is (hash, files) of shared files laid down before ``files``."""
+        if not self.ready:
+            self._read(30)
+            self.ready = True
+        job = {'files': files, 'timeout': timeout, 'stream': stream, 'args': list(args)}
+        if base:
+            key, base_files = base
+            job['base'] = key
+            if key in self.bases:
+                self.bases.move_to_end(key)
+            else:
+                # Only the first job on this zygote carries the shared files
+                job['base_files'] = base_files
+                self.bases[key] = True
+                job['drop_bases'] = []
+                while len(self.bases) > SANDBOX_BASE_SLOTS:
+                    job['drop_bases'].append(self.bases.popitem(last=False)[0])
+        self._send(job)
+        return self._replies(timeout)
+
+    def _replies(self, timeout):
+        while True:
+            # The zygote enforces the timeout itself; the margin covers file I/O
+            message = self._read(timeout + 5)
+            yield message
+            if message.get('type') == 'result':
+                return
+
+    def run(self, files, timeout, args=(), base=None):
+        for message in self.messages(files, timeout, args=args, base=base):
+            if message.get('type') == 'result':
+                return message['result']
+
+    def cancel(self):
+        try:
+            self._send({'cancel': True})
+        except OSError:
+            pass
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def stop(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(2)
+        except Exception:
+            self.proc.kill()
+
+
+class SandboxPool:
+    def __init__(self, workers=SANDBOX_WORKERS, max_queue=SANDBOX_MAX_QUEUE, timeout=SANDBOX_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._zygotes = []
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers > 0 else None
+        self._lock = threading.Lock()
+        self._started = False
+        self.cache = cache_from_env('EVAL', default_ttl=EVAL_CACHE_DEFAULT_TTL, default_path='eval_cache.db')
+        self._saved_seconds = 0.0
+        self._runs = {}  # run_id -> zygote, for streaming runs
+        self._waiting = 0  # callers holding a slot but no zygote yet
+        self._busy = 0
+
+    def start(self):
+        """Spawn the zygotes (idempotent); they warm up in the background"""
+        with self._lock:
+            if self._started or self.workers <= 0:
+                return
+            for _ in range(self.workers):
+                zygote = _Zygote()
+                self._zygotes.append(zygote)
+                self._idle.put(zygote)
+            self._started = True
+
+    def stop(self):
+        with self._lock:
+            for zygote in self._zygotes:
+                zygote.stop()
+            self._zygotes = []
+            self._idle = queue.Queue()
+            self._started = False
+
+    def _replace(self, zygote):
+        zygote.proc.kill()
+        fresh = _Zygote()
+        with self._lock:
+            self._zygotes = [fresh if z is zygote else z for z in self._zygotes]
+        return fresh
+
+    @contextlib.contextmanager
+    def _checkout(self, wait=False):
+        """Borrow an idle zygote; broken ones are replaced and the error re-raised.
+        Without ``wait`` a full queue raises SandboxBusy instead of blocking."""
+        if not self._slots.acquire(blocking=wait):
+            raise SandboxBusy("evaluation queue is full")
+        try:
+            self.start()
+            with self._lock:
+                self._waiting += 1
+            try:
+                zygote = self._idle.get()
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+                    self._busy += 1
+            try:
+                if not zygote.alive():
+                    zygote = self._replace(zygote)
+                yield zygote
+            except (EOFError, TimeoutError, OSError, ValueError) as e:
+                print(f"Sandbox worker failed ({e}); restarting it")
+                zygote = self._replace(zygote)
+                raise
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                self._idle.put(zygote)
+        finally:
+            self._slots.release()
+
+    def _cache_key(self, files, runtime, args):
+        return make_key('pytest', runtime, PYTEST_ARGS + list(args), sorted(files.items()))
+
+    def _cached(self, key):
+        if self.cache is None:
+            return None
+        hit = self.cache.get(key)
+        if hit is None:
+            return None
+        with self._lock:
+            self._saved_seconds += hit['duration']
+        SANDBOX_RUNS.inc('cached')
+        return dict(hit['result'], cached=True)
+
+    @staticmethod
+    def _outcome(result):
+        return {0: 'passed', 124: 'timeout', 130: 'cancelled'}.get(result['exit_code'], 'failed')
+
+    def _store(self, key, result, started):
+        duration = time.perf_counter() - started
+        outcome = self._outcome(result)
+        SANDBOX_RUNS.inc(outcome)
+        SANDBOX_LATENCY.observe(duration, outcome)
+        # Timeouts depend on load as much as on the code, and cancelled runs are partial
+        if self.cache is not None and outcome not in ('timeout', 'cancelled'):
+            self.cache.set(key, {'result': result, 'duration': duration})
+
+    def evaluate(self, files, timeout=None, runtime='python', args=()):
+        """Run the test suite in ``files``; returns {success, exit_code, stdout, stderr, tests, cached}.
+
+        ``args`` are extra pytest arguments (e.g. the test files to select).
+        Results are cached by the content of ``files`` plus runtime and pytest
+        command, so resubmitting unchanged files does not re-run the suite.
+        """
+        timeout = timeout or self.timeout
+        key = self._cache_key(files, runtime, args)
+        hit = self._cached(key)
+        if hit is not None:
+            return hit
+
+        started = time.perf_counter()
+        result = self._execute(files, timeout, args)
+        self._store(key, result, started)
+        return dict(result, cached=False)
+
+    def _execute(self, files, timeout, args=()):
+        if self.workers <= 0:
+            return run_subprocess(files, timeout, args)
+        try:
+            with self._checkout() as zygote:
+                return zygote.run(files, timeout, args)
+        except (EOFError, TimeoutError, OSError, ValueError):
+            return run_subprocess(files, timeout, args)
+
+    def evaluate_stream(self, files, timeout=None, runtime='python', run_id=None, args=()):
+        """Yield events while the suite runs: {'type': 'stdout'|'stderr', 'line'},
+        {'type': 'collected', 'count'}, {'type': 'test', 'nodeid', 'outcome', ...}
+        and finally {'type': 'result', ...same fields as evaluate()}.
+
+        Closing the generator early (client went away) cancels the run, as
+        does cancel(run_id) from another thread. Without warm workers only
+        the final result event is produced.
+        """
+        timeout = timeout or self.timeout
+        key = self._cache_key(files, runtime, args)
+        hit = self._cached(key)
+        if hit is not None:
+            yield dict(hit, type='result')
+            return
+
+        started = time.perf_counter()
+        if self.workers <= 0:
+            result = run_subprocess(files, timeout, args)
+            self._store(key, result, started)
+            yield dict(result, type='result', cached=False)
+            return
+
+        with self._checkout() as zygote:
+            messages = zygote.messages(files, timeout, stream=True, args=args)
+            finished = False
+            # Registered only once the job is written, so a cancel can't overtake it
+            if run_id:
+                self._runs[run_id] = zygote
+            try:
+                for message in messages:
+                    if message.get('type') == 'result':
+                        finished = True
+                        result = message['result']
+                        self._store(key, result, started)
+                        yield dict(result, type='result', cached=False)
+                    else:
+                        yield message
+            finally:
+                self._runs.pop(run_id, None)
+                if not finished:
+                    # Stop the child and consume the rest so the zygote can be reused
+                    zygote.cancel()
+                    for _ in messages:
+                        pass
+
+    def evaluate_batch(self, submissions, base_files=None, timeout=None, runtime='python'):
+        """Evaluate many file sets against shared ``base_files`` (e.g. template tests).
+
+        ``submissions`` is a list of {'id', 'files'}. Base files win over
+        submission files at the same path, so a submission can't replace the
+        tests it is graded against. Runs fan out over the warm workers (waiting for free slots
+        rather than failing) and each zygote writes the base files only once.
+        Returns per-submission results in input order plus an aggregate summary.
+        """
+        timeout = timeout or self.timeout
+        base_files = base_files or {}
+        base = (make_key('base', sorted(base_files.items())), base_files) if base_files else None
+
+        base_paths = {os.path.normpath(safe_path(path)) for path in base_files}
+
+        def run_one(submission):
+            own = {path: content for path, content in submission['files'].items()
+                   if os.path.normpath(safe_path(path)) not in base_paths}
+            files = dict(own, **base_files)
+            key = self._cache_key(files, runtime, ())
+            started = time.perf_counter()
+            hit = self._cached(key)
+            if hit is not None:
+                return dict(hit, id=submission.get('id'), duration=0.0)
+            result = None
+            if self.workers > 0:
+                try:
+                    with self._checkout(wait=True) as zygote:
+                        result = zygote.run(own, timeout, base=base)
+                except (EOFError, TimeoutError, OSError, ValueError):
+                    result = None
+            if result is None:
+                result = run_subprocess(files, timeout)
+            self._store(key, result, started)
+            return dict(result, id=submission.get('id'), cached=False,
+                        duration=round(time.perf_counter() - started, 4))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            results = list(executor.map(run_one, submissions))
+        return {
+            'results': results,
+            'summary': {
+                'total': len(results),
+                'passed': sum(1 for r in results if r['success']),
+                'failed': sum(1 for r in results if not r['success']),
+                'cached': sum(1 for r in results if r['cached']),
+                'wall_seconds': round(time.perf_counter() - started, 4),
+                'sandbox_seconds': round(sum(r['duration'] for r in results), 4),
+            },
+        }
+
+    def cancel(self, run_id):
+        """Cancel a streaming run started with this run_id; False if not running"""
+        zygote = self._runs.get(run_id)
+        if zygote is None:
+            return False
+        zygote.cancel()
+        return True
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'idle': self._idle.qsize(),
+            'busy': self._busy,
+            'waiting': self._waiting,
+            'max_queue': self.max_queue,
+            'cache': dict(self.cache.info(), saved_seconds=round(self._saved_seconds, 3))
+                     if self.cache is not None else {'backend': 'off'},
+        }
+
+
+sandbox_pool = SandboxPool()
+atexit.register(sandbox_pool.stop)
+
+
+if __name__ == '__main__' and '--zygote' in sys.argv:
+    zygote_main()
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+# Point the app at a scratch database and keep background pools out of the
+# test process; these are read when the backend modules are first imported.
+_scratch = tempfile.mkdtemp(prefix='nova-tests-')
+os.environ['DATABASE_PATH'] = os.path.join(_scratch, 'nova.db')
+os.environ.setdefault('PASSWORD_ITERATIONS', '1000')
+os.environ.setdefault('PASSWORD_WORKERS', '0')
+os.environ.setdefault('SANDBOX_WORKERS', '0')
+os.environ.setdefault('JOB_WORKERS', '0')
+os.environ.setdefault('NOVA_SEED_ON_STARTUP', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    import database
+    database.init_database()
+    return database
@@ -0,0 +1,55 @@
+from database import JobDB
+
+
+def test_job_enqueue_is_idempotent_and_claims_once():
+    first = JobDB.enqueue('test_claim', {'n': 1}, idempotency_key='test-claim-1', max_attempts=2)
+    assert JobDB.enqueue('test_claim', {'n': 2}, idempotency_key='test-claim-1') == first
+
+    job = JobDB.claim_next(['test_claim'])
+    assert (job['id'], job['status'], job['attempts'], job['payload']) == (first, 'running', 1, {'n': 1})
+    assert JobDB.claim_next(['test_claim']) is None
+
+    # A failed attempt under max_attempts is queued again, the last one gives up
+    JobDB.fail(first, 'first try', 0)
+    assert JobDB.claim_next(['test_claim'])['attempts'] == 2
+    JobDB.fail(first, 'second try', 0)
+    assert JobDB.get_job(first)['status'] == 'failed'
+    assert JobDB.claim_next(['test_claim']) is None
+
+    # Enqueueing the key again revives a permanently failed job
+    assert JobDB.enqueue('test_claim', {'n': 1}, idempotency_key='test-claim-1') == first
+    job = JobDB.claim_next(['test_claim'])
+    assert (job['id'], job['attempts']) == (first, 1)
+    JobDB.complete(first, {'ok': True})
+    job = JobDB.get_job(first)
+    assert (job['status'], job['result'], job['error']) == ('succeeded', {'ok': True}, None)
+
+
+def test_stale_jobs_are_recovered_only_while_attempts_remain():
+    retry = JobDB.enqueue('test_lease', {}, max_attempts=2)
+    once = JobDB.enqueue('test_lease', {}, max_attempts=1)
+    assert JobDB.has_runnable(['test_lease'])
+    JobDB.claim_next(['test_lease'])
+    JobDB.claim_next(['test_lease'])
+    assert not JobDB.has_runnable(['test_lease'])
+
+    # A renewed lease is not stale; a lapsed one is
+    JobDB.renew([retry, once])
+    assert JobDB.requeue_stale(60) == 0
+    assert JobDB.requeue_stale(-1) == 2
+    assert JobDB.get_job(retry)['status'] == 'queued'
+    job = JobDB.get_job(once)
+    assert (job['status'], job['error']) == ('failed', 'Worker stopped before the job finished')
+
+
+def test_unique_active_enqueue_shares_the_running_job():
+    first = JobDB.enqueue('test_unique', {'project_id': 1}, unique_active=True)
+    assert JobDB.enqueue('test_unique', {'project_id': 1}, unique_active=True) == first
+    assert JobDB.enqueue('test_unique', {'project_id': 2}, unique_active=True) != first
+
+    JobDB.claim_next(['test_unique'])
+    assert JobDB.enqueue('test_unique', {'project_id': 1}, unique_active=True) == first
+
+    # Once it has finished, the next request starts a new run
+    JobDB.complete(first, {})
+    assert JobDB.enqueue('test_unique', {'project_id': 1}, unique_active=True) != first
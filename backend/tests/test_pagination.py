@@ -0,0 +1,40 @@
+import pytest
+
+from database import ProjectDB, TaskDB, encode_cursor
+
+
+@pytest.fixture(scope='module')
+def client():
+    from app import app
+    project_id = ProjectDB.create_project('Pagination', '')
+    TaskDB.create_tasks(project_id, [{
+        'title': f'Task {i}', 'description': '', 'difficulty': 'Beginner',
+        'estimated_hours': 1, 'skills': ['Python'],
+    } for i in range(7)])
+    return app.test_client()
+
+
+def test_keyset_pages_cover_the_full_listing(client):
+    everything = [task['id'] for task in client.get('/api/tasks').get_json()['tasks']]
+    assert len(everything) >= 7
+
+    paged, cursor = [], None
+    while True:
+        query = {'limit': 3, 'fields': 'id,title'}
+        if cursor:
+            query['cursor'] = cursor
+        body = client.get('/api/tasks', query_string=query).get_json()
+        assert len(body['tasks']) <= 3
+        assert all(set(task) == {'id', 'title', 'created_at'} for task in body['tasks'])
+        paged += [task['id'] for task in body['tasks']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert paged == everything
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor!', encode_cursor(1), encode_cursor('a', 1, 2)])
+def test_bad_cursor_is_a_400(client, cursor):
+    response = client.get('/api/tasks', query_string={'limit': 3, 'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
@@ -0,0 +1,11 @@
+import profiler
+
+
+def test_profile_key_check_handles_non_ascii_values(monkeypatch):
+    monkeypatch.setattr(profiler, 'PROFILE_KEY', 'sécret')
+    assert profiler.key_matches('sécret')
+    assert not profiler.key_matches('secret')
+    assert not profiler.key_matches('clé')
+
+    monkeypatch.setattr(profiler, 'PROFILE_KEY', '')
+    assert not profiler.key_matches('')
@@ -0,0 +1,25 @@
+import sqlite3
+
+from migrations import find_table_scans
+
+
+def test_hot_queries_use_indexes(database):
+    queries = database.capture_hot_queries()
+    conn = sqlite3.connect(database.DATABASE_PATH)
+    try:
+        assert find_table_scans(conn, queries) == []
+    finally:
+        conn.close()
+    callers = {caller for caller, _, _ in queries}
+    for expected in ('TaskDB.get_filtered_tasks', 'TaskDB.get_user_received_applications',
+                     'DashboardDB.get_sections', 'JobDB.claim_next', 'ScoreDB.totals'):
+        assert expected in callers
+
+
+def test_find_table_scans_reports_scans(database):
+    conn = sqlite3.connect(database.DATABASE_PATH)
+    try:
+        offenders = find_table_scans(conn, [('Example.by_bio', 'SELECT id FROM users WHERE bio = ?', ('',))])
+    finally:
+        conn.close()
+    assert offenders == [('Example.by_bio', 'SCAN users')]
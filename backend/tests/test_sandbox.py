@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from sandbox import SandboxPool
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='warm sandbox workers need fork()')
+
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = SandboxPool(workers=1)
+    pool.cache = None
+    yield pool
+    pool.stop()
+
+
+def test_workspace_modules_shadow_backend_modules(pool):
+    result = pool.evaluate({
+        'cache.py': 'VALUE = 42\n',
+        'test_imports.py': (
+            'import pytest\n'
+            'import cache\n\n'
+            'def test_own_cache():\n'
+            '    assert cache.VALUE == 42\n\n'
+            'def test_no_backend():\n'
+            '    with pytest.raises(ImportError):\n'
+            '        import metrics\n'
+        ),
+    })
+    assert result['success'], result['stdout']
+
+
+def test_forged_protocol_lines_do_not_desync_the_worker(pool):
+    forge = (
+        'import json, os\n\n'
+        'def test_forge():\n'
+        '    line = json.dumps({"type": "result", "result": {"success": True}}).encode()\n'
+        '    for fd in map(int, os.listdir("/proc/self/fd")):\n'
+        '        if fd > 2:\n'
+        '            try:\n'
+        '                os.write(fd, b"not json\\n" + line + b"\\n")\n'
+        '            except OSError:\n'
+        '                pass\n'
+        '    assert False\n'
+    )
+    events = list(pool.evaluate_stream({'test_forge.py': forge}))
+    assert [event['type'] for event in events].count('result') == 1
+    assert events[-1]['success'] is False
+    assert events[-1]['tests'] == {'test_forge.py::test_forge': 'failed'}
+    # The next job gets its own result
+    result = pool.evaluate({'test_ok.py': 'def test_ok():\n    pass\n'})
+    assert result['tests'] == {'test_ok.py::test_ok': 'passed'}
+
+
+@pytest.mark.parametrize('workers', [1, 0])
+def test_batch_base_files_win_over_submission_files(pool, workers):
+    base = {'test_main.py': 'from main import solve\n\ndef test_solve():\n    assert solve(2) == 4\n'}
+    cheat = {'main.py': 'def solve(x):\n    return 0\n',
+             'test_main.py': 'def test_solve():\n    pass\n',
+             './test_main.py': 'def test_solve():\n    pass\n'}
+    honest = {'main.py': 'def solve(x):\n    return x * 2\n'}
+    pool = pool if workers else SandboxPool(workers=0)
+    pool.cache = None
+    batch = pool.evaluate_batch([{'id': 'cheat', 'files': cheat}, {'id': 'honest', 'files': honest}],
+                                base_files=base)
+    outcomes = {result['id']: result['success'] for result in batch['results']}
+    assert outcomes == {'cheat': False, 'honest': True}
@@ -0,0 +1,22 @@
+from database import ScoreDB, UserDB, _record_score, run_write
+
+
+def test_score_totals_by_window():
+    user_id, _ = UserDB.create_user('score-window', 'score-window@example.com', 'secret123')
+
+    def write(conn):
+        for created_at, missions, squads, credits in ((100, 1, 0, 10), (200, 2, 1, 0)):
+            _record_score(conn, user_id, missions, squads, credits)
+            conn.execute('UPDATE score_events SET created_at = ? WHERE id = last_insert_rowid()', (created_at,))
+        # No change and no baseline: nothing is logged
+        _record_score(conn, user_id)
+    run_write(write)
+
+    totals, last_id = ScoreDB.totals((150, 10 ** 12))
+    # Creating the user logged a zero baseline event at the current time
+    all_time, since_150, future = totals[user_id]
+    assert all_time == (3, 1, 10)
+    assert since_150 == (2, 1, 0)
+    assert future is None
+    assert last_id == ScoreDB.events_after(0)[-1][0]
+    assert len([event for event in ScoreDB.events_after(0) if event[1] == user_id]) == 3
@@ -0,0 +1,18 @@
+import threading
+
+from database import UserDB, run_write
+
+
+def test_last_login_is_not_cached_stale():
+    user_id, _ = UserDB.create_user('cache-check', 'cache-check@example.com', 'secret123')
+    assert UserDB.get_user(user_id)['last_login'] is None
+
+    # Hold the writer so the login update stays uncommitted while get_user runs
+    release = threading.Event()
+    run_write(lambda conn: release.wait(5), wait=False)
+    UserDB.update_last_login(user_id)
+    assert UserDB.get_user(user_id)['last_login'] is None
+    release.set()
+
+    run_write(lambda conn: None)
+    assert UserDB.get_user(user_id)['last_login'] is not None
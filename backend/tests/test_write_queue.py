@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+import database
+from database import WriteQueue
+
+
+@pytest.fixture
+def writer():
+    conn = database.get_db_connection()
+    conn.execute('CREATE TABLE IF NOT EXISTS write_queue_test (value TEXT)')
+    conn.execute('DELETE FROM write_queue_test')
+    conn.commit()
+    conn.close()
+    queue = WriteQueue(database.DATABASE_PATH)
+    yield queue
+    queue.stop()
+
+
+def blocked(queue):
+    """Hold the writer thread until the returned event is set, so the jobs
+    submitted meanwhile are committed together in the next batch"""
+    release, started = threading.Event(), threading.Event()
+    queue.submit(lambda conn: started.set() or release.wait(5), wait=False)
+    started.wait(5)
+    return release
+
+
+def stored_values():
+    conn = database.get_db_connection()
+    try:
+        return sorted(row[0] for row in conn.execute('SELECT value FROM write_queue_test'))
+    finally:
+        conn.close()
+
+
+def insert(value):
+    return lambda conn: conn.execute('INSERT INTO write_queue_test (value) VALUES (?)', (value,)).lastrowid
+
+
+def test_write_queue_group_commits(writer):
+    commits = []
+    hook = lambda sql, *args, **kwargs: sql == 'COMMIT' and commits.append(sql)
+    database.add_statement_hook(hook)
+    try:
+        release = blocked(writer)
+        futures = [writer.submit(insert(str(i)), wait=False) for i in range(10)]
+        release.set()
+        row_ids = [future.result(5) for future in futures]
+    finally:
+        database._statement_hooks.remove(hook)
+    assert row_ids == sorted(row_ids)
+    assert stored_values() == sorted(str(i) for i in range(10))
+    # One commit for the blocking batch, one for all ten queued jobs
+    assert len(commits) == 2
+
+
+def test_write_queue_rolls_back_only_the_failing_job(writer):
+    def failing(conn):
+        insert('b')(conn)
+        raise ValueError('boom')
+
+    release = blocked(writer)
+    first = writer.submit(insert('a'), wait=False)
+    second = writer.submit(failing, wait=False)
+    third = writer.submit(insert('c'), wait=False)
+    release.set()
+    first.result(5)
+    third.result(5)
+    with pytest.raises(ValueError):
+        second.result(5)
+    assert stored_values() == ['a', 'c']
@@ -47,7 +47,7 @@ export default function IDEChatbot({ project, currentStep, currentCode, activeFi
         file_name: activeFile
       }
 
-      const response = await fetch('/api/education/chat', {
+      const response = await fetch('/api/education/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -59,18 +59,39 @@ export default function IDEChatbot({ project, currentStep, currentCode, activeFi
         })
       })
 
-      const data = await response.json()
+      if (!response.ok) {
+        const data = await response.json()
+        throw new Error(data.error || 'Failed to get response')
+      }
 
-      if (response.ok) {
-        const aiMessage = {
-          id: Date.now() + 1,
-          text: data.response,
-          sender: 'ai',
-          timestamp: new Date()
+      // Show the reply as tokens arrive; the final 'done' event has the full text
+      const aiId = Date.now() + 1
+      let text = ''
+      const showText = (value) => setMessages(prev => {
+        const others = prev.filter(m => m.id !== aiId)
+        return [...others, { id: aiId, text: value, sender: 'ai', timestamp: new Date() }]
+      })
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const frames = buffer.split('\n\n')
+        buffer = frames.pop()
+        for (const frame of frames) {
+          const event = (frame.match(/^event: (.*)$/m) || [])[1]
+          const data = JSON.parse((frame.match(/^data: (.*)$/m) || [])[1] || '{}')
+          if (event === 'token') {
+            text += data.text
+            showText(text)
+          } else if (event === 'done') {
+            showText(data.response)
+          } else if (event === 'error') {
+            throw new Error(data.error)
+          }
         }
-        setMessages(prev => [...prev, aiMessage])
-      } else {
-        throw new Error(data.error || 'Failed to get response')
       }
     } catch (error) {
       console.error('Chat error:', error)
@@ -119,7 +119,8 @@ export default function Tasks() {
       const response = await fetch(`/api/projects/${projectId}/generate-tasks`, {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json'
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token}`
         }
       })
       
@@ -127,8 +128,23 @@ export default function Tasks() {
         throw new Error('Failed to generate operations')
       }
       
-      const data = await response.json()
-      setGeneratedTasks(data.tasks)
+      // Generation runs as a background job; poll until it finishes
+      let job = await response.json()
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1500))
+        const poll = await fetch(`/api/jobs/${job.job_id}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        })
+        if (!poll.ok) {
+          throw new Error('Failed to check operation status')
+        }
+        job = await poll.json()
+      }
+      if (job.status !== 'succeeded') {
+        throw new Error(job.error || 'Failed to generate operations')
+      }
+      
+      setGeneratedTasks(job.result.tasks)
       setCurrentQuestion(null) // Clear current question
       setIsProcessing(false)
       